@@ -0,0 +1,149 @@
+"""
+Throughput of batched vs single-receipt classification runs.
+
+Runs the real root_agent (needs google-adk and the pipeline's requirements) with a
+fake model: every LLM call sleeps --base-ms plus --prefill-ms per 1k prompt tokens
+plus --decode-ms per output token (tokens estimated as characters / 4), then
+answers with "Groceries" for every item. Receipts are consistent with their
+totals, so neither mode needs the refinement loop; the comparison is the
+classifier calls themselves. Firebase gets an anonymous app and saves are no-ops.
+
+  single : one run per receipt ({"line_items" | "parsed_items", ...})
+  batched: one run per --batch-size receipts ({"receipts": [...]})
+both with --concurrency runs in flight.
+
+    python benchmarks/bench_batch.py --receipts 40 --batch-size 8 --parsed
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NAMES = ["Coffee", "Blue Moon Tap", "Fren Onion Soup", "Pork Chop", "Bread", "Milk 2L", "Bananas",
+         "USB-C Cable", "T-Shirt", "Shampoo", "Chicken Breast", "Tomatoes", "Rice 5kg", "Toothpaste"]
+
+def make_receipt(rng, receipt_id, parsed):
+    items = [{'item': f"{rng.choice(NAMES)} {rng.randint(1, 60)}", 'quantity': '1', 'price': f"{rng.randint(99, 2999) / 100:.2f}"}
+             for _ in range(rng.randint(3, 15))]
+    net = f"{sum(float(x['price']) for x in items):.2f}"
+    receipt = {'receipt_id': receipt_id, 'receipt_total_value': {'total_amount': net, 'net_amount': net, 'total_tax_amount': '0.00'},
+               'grouped': {'supplier_name': ["Nancy"]}}
+    if parsed:
+        receipt['parsed_items'] = items
+    else:
+        receipt['line_items'] = [f"{x['quantity']} {x['item']} {x['price']}" for x in items]
+    return receipt
+
+def _after(text, marker):
+    return json.loads(text[text.rindex(marker) + len(marker):].strip())
+
+def answer(instruction, contents):
+    """Canned answer for each classifier, shaped like the real one's output."""
+    if 'for several receipts at once' in instruction:
+        receipts = _after(instruction, 'Receipts:')
+        return {'receipts': [{'receipt_id': r['receipt_id'], 'classified': [
+            {'item': line.split(' ', 1)[1].rsplit(' ', 1)[0], 'quantity': line.split(' ', 1)[0], 'price': line.rsplit(' ', 1)[1],
+             'category': 'Groceries'} for line in r['line_items']]} for r in receipts]}
+    if 'Receipt Item Categorizer' in instruction:
+        return {'categories': ['Groceries'] * len(_after(instruction, 'Items:'))}
+    if 'You are a Receipt Classifier.' in instruction:
+        request = json.loads(contents[-1]['parts'][0]['text'])
+        return {'classified': [{'item': line.split(' ', 1)[1].rsplit(' ', 1)[0], 'quantity': line.split(' ', 1)[0],
+                                'price': line.rsplit(' ', 1)[1], 'category': 'Groceries'} for line in request['line_items']],
+                'total_values_dict': request['receipt_total_value']}
+    raise ValueError(f"Unexpected LLM call: {instruction[:80]}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--receipts', type=int, default=40)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=2, help="ADK runs in flight (UPLOAD_CLASSIFY_CONCURRENCY)")
+    parser.add_argument('--parsed', action='store_true', help="Send parsed_items (category-only) instead of raw lines")
+    parser.add_argument('--base-ms', type=float, default=400, help="Fixed latency per LLM call")
+    parser.add_argument('--prefill-ms', type=float, default=60, help="Latency per 1k prompt tokens")
+    parser.add_argument('--decode-ms', type=float, default=8, help="Latency per output token")
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(HERE, '..'))
+    import firebase_admin
+    import google.auth.credentials
+    from firebase_admin import credentials
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.agents import LlmAgent
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    class AnonymousCredential(credentials.Base):
+        def get_credential(self):
+            return google.auth.credentials.AnonymousCredentials()
+
+    calls = []
+    class FakeLlm(BaseLlm):
+        model: str = 'fake'
+
+        async def generate_content_async(self, llm_request, stream=False):
+            instruction = str(llm_request.config.system_instruction or '')
+            contents = [c.model_dump(mode='json', exclude_none=True) for c in llm_request.contents]
+            text = json.dumps(answer(instruction, contents))
+            prompt_tokens, output_tokens = (len(instruction) + len(json.dumps(contents))) // 4, len(text) // 4
+            calls.append((prompt_tokens, output_tokens))
+            await asyncio.sleep((args.base_ms + prompt_tokens / 1000 * args.prefill_ms + output_tokens * args.decode_ms) / 1000)
+            yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=text)]))
+
+    firebase_admin.initialize_app(AnonymousCredential(), {'projectId': 'bench'})
+    from receipt_classifier.agent import root_agent
+    for module in ('classification_response', 'batch_classification'):
+        sys.modules[f'receipt_classifier.subagents.{module}.agent'].save_summarised_data = lambda *a: None
+    pending = [root_agent]
+    while pending:
+        agent = pending.pop()
+        if isinstance(agent, LlmAgent):
+            agent.model = FakeLlm()
+        pending.extend(agent.sub_agents)
+
+    rng = random.Random(args.seed)
+    receipts = [make_receipt(rng, f"receipt-{i}", args.parsed) for i in range(args.receipts)]
+    singles = [json.dumps({k: v for k, v in r.items() if k != 'receipt_id'}) for r in receipts]
+    batches = [json.dumps({'receipts': receipts[i:i + args.batch_size]}) for i in range(0, len(receipts), args.batch_size)]
+
+    async def run_all(prompts):
+        service = InMemorySessionService()
+        runner = Runner(agent=root_agent, app_name='bench', session_service=service)
+        limit = asyncio.Semaphore(args.concurrency)
+        saved = []
+        async def run_one(prompt):
+            async with limit:
+                session = await service.create_session(app_name='bench', user_id='user')
+                message = types.Content(role='user', parts=[types.Part(text=prompt)])
+                async for event in runner.run_async(user_id='user', session_id=session.id, new_message=message):
+                    delta = event.actions.state_delta if event.actions else {}
+                    if 'firebase_save_result' in delta:
+                        saved.append(1)
+                    saved.extend(1 for r in (delta.get('batch_results') or {}).values() if r.get('firebase_save_result'))
+        await asyncio.gather(*(run_one(p) for p in prompts))
+        return len(saved)
+
+    results = {}
+    for mode, prompts in (('single', singles), ('batched', batches)):
+        calls.clear()
+        start = time.perf_counter()
+        saved = asyncio.run(run_all(prompts))
+        results[mode] = (len(prompts), len(calls), sum(p for p, _ in calls), sum(o for _, o in calls), time.perf_counter() - start, saved)
+
+    print(f"{args.receipts} receipts ({'parsed items' if args.parsed else 'raw lines'}), batch size {args.batch_size}, concurrency {args.concurrency}")
+    for mode, (runs, llm_calls, prompt_tokens, output_tokens, seconds, saved) in results.items():
+        print(f"{mode:8}: {runs:3d} runs, {llm_calls:3d} LLM calls, {prompt_tokens:7d} prompt + {output_tokens:6d} output tokens (est.), "
+              f"{seconds:6.2f}s wall, {args.receipts / seconds:5.1f} receipts/s, {saved} saved")
+    single, batched = results['single'], results['batched']
+    print(f"batched vs single: {batched[1] / single[1]:.0%} of the LLM calls, {(batched[2] + batched[3]) / (single[2] + single[3]):.0%} of the tokens, "
+          f"x{single[4] / batched[4]:.1f} throughput")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Classification latency against receipt length: one InitialClassifier call vs
+concurrent chunk classifiers (classifier_init/chunking.py).
+
+Runs the real root_agent (needs google-adk and the pipeline's requirements) with a
+fake model that sleeps --base-ms plus --decode-ms per output token (tokens
+estimated as characters / 4), so latency grows with the length of the answer as
+it does with the real model. Receipts are consistent with their totals, so the
+refinement loop is skipped; the time until `stage_init_classification` is set is
+the classification latency. Firebase gets an anonymous app and the save is a no-op.
+
+Each mode runs in a subprocess (the chunk settings are read at import); "whole"
+sets CLASSIFY_CHUNK_WORKERS=1.
+
+    python benchmarks/bench_chunked.py --items 20,40,80,120,160,200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+NAMES = ["Bananas", "Milk 2L", "Bread", "Tomatoes", "Rice 5kg", "Chicken Breast", "Shampoo", "Toothpaste", "Coffee", "T-Shirt"]
+
+def make_line_items(count, seed):
+    rng = random.Random(seed)
+    return [f"1 {rng.choice(NAMES)} {i} {rng.randint(99, 2999) / 100:.2f}" for i in range(count)]
+
+def classify_lines(lines):
+    return [{'item': line.split(' ', 1)[1].rsplit(' ', 1)[0], 'quantity': line.split(' ', 1)[0],
+             'price': line.rsplit(' ', 1)[1], 'category': 'Groceries'} for line in lines]
+
+def run_mode(item_counts, base_ms, decode_ms):
+    """Classifies one receipt per item count in this process; returns {count: [classify seconds, run seconds, LLM calls]}."""
+    sys.path.insert(0, os.path.join(HERE, '..'))
+    import firebase_admin
+    import google.auth.credentials
+    from firebase_admin import credentials
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.agents import LlmAgent
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    class AnonymousCredential(credentials.Base):
+        def get_credential(self):
+            return google.auth.credentials.AnonymousCredentials()
+
+    calls = []
+    class SlowLlm(BaseLlm):
+        model: str = 'fake'
+
+        async def generate_content_async(self, llm_request, stream=False):
+            instruction = str(llm_request.config.system_instruction or '')
+            if 'Receipt Chunk Classifier' in instruction:
+                lines = json.loads(instruction[instruction.rindex('Line items:') + len('Line items:'):].strip())
+                answer = {'classified': classify_lines(lines)}
+            elif 'You are a Receipt Classifier.' in instruction:
+                request = json.loads(llm_request.contents[-1].parts[0].text)
+                answer = {'classified': classify_lines(request['line_items']), 'total_values_dict': request['receipt_total_value']}
+            else:
+                raise ValueError(f"Unexpected LLM call: {instruction[:80]}")
+            text = json.dumps(answer)
+            calls.append(len(text) // 4)
+            await asyncio.sleep((base_ms + len(text) // 4 * decode_ms) / 1000)
+            yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=text)]))
+
+    firebase_admin.initialize_app(AnonymousCredential(), {'projectId': 'bench'})
+    from receipt_classifier.agent import root_agent
+    sys.modules['receipt_classifier.subagents.classification_response.agent'].save_summarised_data = lambda *args: None
+    pending = [root_agent]
+    while pending:
+        agent = pending.pop()
+        if isinstance(agent, LlmAgent):
+            agent.model = SlowLlm()
+        pending.extend(agent.sub_agents)
+
+    async def run(count):
+        service = InMemorySessionService()
+        runner = Runner(agent=root_agent, app_name='bench', session_service=service)
+        session = await service.create_session(app_name='bench', user_id='user')
+        line_items = make_line_items(count, count)
+        total = f"{sum(float(line.rsplit(' ', 1)[1]) for line in line_items):.2f}"
+        prompt = json.dumps({'line_items': line_items, 'receipt_total_value': {'total_amount': total, 'net_amount': total, 'total_tax_amount': '0.00'}})
+        message = types.Content(role='user', parts=[types.Part(text=prompt)])
+        calls.clear()
+        start, classified = time.perf_counter(), None
+        async for event in runner.run_async(user_id='user', session_id=session.id, new_message=message):
+            if classified is None and event.actions and 'stage_init_classification' in (event.actions.state_delta or {}):
+                classified = time.perf_counter() - start
+        return [classified, time.perf_counter() - start, len(calls)]
+
+    return {count: asyncio.run(run(count)) for count in item_counts}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', default='20,40,80,120,160,200', help="Comma-separated line item counts")
+    parser.add_argument('--base-ms', type=float, default=400, help="Fixed latency per LLM call")
+    parser.add_argument('--decode-ms', type=float, default=8, help="Latency per output token")
+    parser.add_argument('--mode', help=argparse.SUPPRESS) # child process: run one mode, print JSON
+    args = parser.parse_args()
+    counts = [int(c) for c in args.items.split(',')]
+    if args.mode:
+        print(json.dumps(run_mode(counts, args.base_ms, args.decode_ms)))
+        return
+
+    results = {}
+    for mode, env in (('whole', {'CLASSIFY_CHUNK_WORKERS': '1'}), ('chunked', {})):
+        out = subprocess.run([sys.executable, __file__, '--mode', mode, '--items', args.items,
+                              '--base-ms', str(args.base_ms), '--decode-ms', str(args.decode_ms)],
+                             env=dict(os.environ, PIPELINE_LLM_SUMMARY='False', **env), capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+    print(f"{'items':>5} | {'whole':>16} | {'chunked':>16} | speedup")
+    for count in counts:
+        whole, chunked = results['whole'][str(count)], results['chunked'][str(count)]
+        print(f"{count:5d} | {whole[0]:6.2f}s {whole[2]:2d} calls | {chunked[0]:6.2f}s {chunked[2]:2d} calls | x{whole[0] / chunked[0]:.1f}")
+
+if __name__ == '__main__':
+    main()
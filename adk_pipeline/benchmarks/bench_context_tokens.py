@@ -0,0 +1,117 @@
+"""
+Prompt size per LLM call in the refinement loop: PIPELINE_CONTEXT_MODE=history vs state.
+
+Runs the real root_agent (needs google-adk and the pipeline's requirements) with a
+fake model that records the size of every request, on a receipt whose gap nothing
+can reconcile, so the refinement loop runs --iterations times (the fake validator
+never passes). Prompt tokens are estimated as characters / 4 of the system
+instruction plus contents. Firebase gets an anonymous app and the save is a no-op.
+
+Each mode runs in a subprocess (the mode is read at import). Exits non-zero when
+the last validator prompt in state mode is more than --max-growth times the first,
+i.e. when prompts grow with the history again.
+
+    python benchmarks/bench_context_tokens.py --iterations 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLASSIFIED = [
+    {'item': 'Coffee', 'quantity': '1', 'price': '3.50', 'category': 'Fast Food'},
+    {'item': 'Glass House Wine', 'quantity': '1', 'price': '9.95', 'category': 'Others'},
+    {'item': 'Jumbo Coctail Shrimp', 'quantity': '1', 'price': '12.95', 'category': 'Fast Food'},
+    {'item': 'Veal Zingaria', 'quantity': '1', 'price': '23.95', 'category': 'Fast Food'},
+]
+TOTALS = {'total_amount': '57.77', 'net_amount': '57.77', 'total_tax_amount': '0'} # 7.42 nobody can explain
+GROUPED = [
+    {'category': 'Fast Food', 'items': ['Coffee', 'Jumbo Coctail Shrimp', 'Veal Zingaria'], 'total_price': '40.40'},
+    {'category': 'Others', 'items': ['Glass House Wine'], 'total_price': '9.95'},
+]
+RESPONSES = { # instruction marker -> canned answer
+    'You are a Receipt Classifier.': json.dumps({'classified': CLASSIFIED, 'total_values_dict': TOTALS}),
+    'Validation Agent': json.dumps({'status': 0, 'details': 'Computed total is 50.35, but expected 57.77.'}),
+    'Refiner Agent': json.dumps(GROUPED),
+}
+
+def run_mode(iterations):
+    """Runs the pipeline once in this process; returns [(agent marker, estimated prompt tokens)]."""
+    sys.path.insert(0, os.path.join(HERE, '..'))
+    import firebase_admin
+    import google.auth.credentials
+    from firebase_admin import credentials
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.agents import LlmAgent
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    class AnonymousCredential(credentials.Base):
+        def get_credential(self):
+            return google.auth.credentials.AnonymousCredentials()
+
+    calls = []
+    class RecordingLlm(BaseLlm):
+        model: str = 'fake'
+
+        async def generate_content_async(self, llm_request, stream=False):
+            instruction = str(llm_request.config.system_instruction or '')
+            marker = next(m for m in RESPONSES if m in instruction)
+            contents = json.dumps([c.model_dump(mode='json', exclude_none=True) for c in llm_request.contents])
+            calls.append((marker, (len(instruction) + len(contents)) // 4))
+            yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=RESPONSES[marker])]))
+
+    firebase_admin.initialize_app(AnonymousCredential(), {'projectId': 'bench'})
+    from receipt_classifier.agent import root_agent, refinement_loop
+    sys.modules['receipt_classifier.subagents.classification_response.agent'].save_summarised_data = lambda *args: None
+    refinement_loop.max_iterations = iterations
+    pending = [root_agent]
+    while pending:
+        agent = pending.pop()
+        if isinstance(agent, LlmAgent):
+            agent.model = RecordingLlm()
+        pending.extend(agent.sub_agents)
+
+    async def run():
+        service = InMemorySessionService()
+        runner = Runner(agent=root_agent, app_name='bench', session_service=service)
+        session = await service.create_session(app_name='bench', user_id='user')
+        prompt = json.dumps({'line_items': [f"1 {x['item']} {x['price']}" for x in CLASSIFIED], 'receipt_total_value': TOTALS})
+        message = types.Content(role='user', parts=[types.Part(text=prompt)])
+        async for _ in runner.run_async(user_id='user', session_id=session.id, new_message=message):
+            pass
+    asyncio.run(run())
+    return calls
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=4, help="Refinement loop iterations")
+    parser.add_argument('--max-growth', type=float, default=1.2)
+    parser.add_argument('--mode', help=argparse.SUPPRESS) # child process: run one mode, print JSON
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(run_mode(args.iterations)))
+        return
+
+    results = {}
+    for mode in ('history', 'state'):
+        env = dict(os.environ, PIPELINE_CONTEXT_MODE=mode, PIPELINE_LLM_SUMMARY='False')
+        out = subprocess.run([sys.executable, __file__, '--mode', mode, '--iterations', str(args.iterations)],
+                             env=env, capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+    for mode, calls in results.items():
+        print(f"{mode:8}: {len(calls)} LLM calls, {sum(t for _, t in calls)} prompt tokens (est.)")
+        print("          " + ", ".join(f"{marker.split()[-1].rstrip('.')}={tokens}" for marker, tokens in calls))
+    validator = [tokens for marker, tokens in results['state'] if marker == 'Validation Agent']
+    growth = validator[-1] / validator[0]
+    print(f"state mode validator prompt growth over {len(validator)} iterations: x{growth:.2f} (limit x{args.max_growth})")
+    if growth > args.max_growth:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Deterministic grouping vs the recorded grouping_classification LLM output.
+
+For every fixture in evals/recorded_grouping.json this checks that the Python
+grouping produces the same categories and items as the LLM did, reports the
+category totals where they differ (the LLM's arithmetic vs exact Decimal sums)
+and the per-receipt latency and tokens saved.
+
+    python benchmarks/bench_grouping.py
+Exits non-zero when categories or items differ.
+"""
+import json
+import logging
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'receipt_classifier', 'subagents', 'classification_grouper'))
+
+from grouping import group_classified_items # plain module import, no ADK needed
+
+FIXTURES = os.path.join(HERE, '..', 'evals', 'recorded_grouping.json')
+
+def by_category(grouped):
+    return {group['category']: group for group in grouped}
+
+def main():
+    logging.disable(logging.WARNING) # missing-price warnings would repeat on every timing iteration
+    with open(FIXTURES) as f:
+        fixtures = json.load(f)
+    failures = 0
+    for fixture in fixtures:
+        classified = fixture['stage_init_classification']['classified']
+        iterations = 1000
+        start = time.perf_counter()
+        for _ in range(iterations):
+            grouped = group_classified_items(classified)
+        python_seconds = (time.perf_counter() - start) / iterations
+        expected = by_category(fixture['llm_grouped_classification']['grouped'])
+        actual = by_category(grouped)
+        print(f"{fixture['name']}:")
+        if set(expected) != set(actual):
+            failures += 1
+            print(f"  category mismatch: llm={sorted(expected)} python={sorted(actual)}")
+        for category in sorted(set(expected) & set(actual)):
+            if expected[category]['items'] != actual[category]['items']:
+                failures += 1
+                print(f"  {category}: items differ llm={expected[category]['items']} python={actual[category]['items']}")
+            if expected[category]['total_price'] != actual[category]['total_price']:
+                print(f"  {category}: total llm={expected[category]['total_price']} python={actual[category]['total_price']} (exact sum)")
+        if 'llm_seconds' not in fixture:
+            print(f"  python {python_seconds * 1e6:.1f} us (no recorded LLM latency)")
+            continue
+        usage = fixture.get('llm_usage', {})
+        print(f"  latency: llm {fixture['llm_seconds'] * 1000:.0f} ms, python {python_seconds * 1e6:.1f} us; "
+              f"tokens saved: {usage.get('totalTokenCount', 'n/a')}")
+    print(f"{len(fixtures)} fixtures, {failures} grouping mismatches")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
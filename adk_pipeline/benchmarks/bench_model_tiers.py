@@ -0,0 +1,144 @@
+"""
+Per-tier latency of the pipeline: model tiering (fast first, escalate on failure)
+vs running every agent on the strong model.
+
+Runs the real root_agent (needs google-adk and the pipeline's requirements) with a
+fake model that answers like the real agents and sleeps --fast-ms or --strong-ms
+per call depending on the model the request was routed to (llm_request.model).
+Three receipts:
+  clean    : the classification matches the totals (no refinement loop);
+  invalid  : the fast model returns malformed JSON once, the call is retried on the strong model;
+  mismatch : a gap nothing can reconcile, so exit_function reports a mismatch and the
+             refinement loop (--iterations) runs on the strong model.
+Firebase gets an anonymous app and the save is a no-op.
+
+Each mode runs in a subprocess (models are read at import); "strong" sets
+MODEL_FAST to the strong model.
+
+    python benchmarks/bench_model_tiers.py --fast-ms 300 --strong-ms 1500
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STRONG_MODEL = 'gemini-2.5-flash'
+CLASSIFIED = [
+    {'item': 'Coffee', 'quantity': '1', 'price': '3.50', 'category': 'Fast Food'},
+    {'item': 'Glass House Wine', 'quantity': '1', 'price': '9.95', 'category': 'Others'},
+    {'item': 'Jumbo Coctail Shrimp', 'quantity': '1', 'price': '12.95', 'category': 'Fast Food'},
+    {'item': 'Veal Zingaria', 'quantity': '1', 'price': '23.95', 'category': 'Fast Food'},
+]
+TOTALS = {
+    'clean': {'total_amount': '50.35', 'net_amount': '50.35', 'total_tax_amount': '0'},
+    'invalid': {'total_amount': '50.35', 'net_amount': '50.35', 'total_tax_amount': '0'},
+    'mismatch': {'total_amount': '57.77', 'net_amount': '57.77', 'total_tax_amount': '0'}, # 7.42 nobody can explain
+}
+GROUPED = [
+    {'category': 'Fast Food', 'items': ['Coffee', 'Jumbo Coctail Shrimp', 'Veal Zingaria'], 'total_price': '40.40'},
+    {'category': 'Others', 'items': ['Glass House Wine'], 'total_price': '9.95'},
+]
+
+def run_mode(iterations, fast_ms, strong_ms):
+    """Runs each scenario once in this process; returns {scenario: {'seconds', 'calls': [[agent, tier, seconds]], 'tier'}}."""
+    sys.path.insert(0, os.path.join(HERE, '..'))
+    import firebase_admin
+    import google.auth.credentials
+    from firebase_admin import credentials
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.agents import LlmAgent
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+
+    class AnonymousCredential(credentials.Base):
+        def get_credential(self):
+            return google.auth.credentials.AnonymousCredentials()
+
+    current = {'scenario': None, 'calls': []}
+    class TieredLlm(BaseLlm):
+        async def generate_content_async(self, llm_request, stream=False):
+            instruction = str(llm_request.config.system_instruction or '')
+            tier = 'strong' if llm_request.model == STRONG_MODEL else 'fast'
+            scenario = current['scenario']
+            part = types.Part(text='{}')
+            if 'You are a Receipt Classifier.' in instruction:
+                agent = 'classifier'
+                text = json.dumps({'classified': CLASSIFIED, 'total_values_dict': TOTALS[scenario]})
+                part = types.Part(text=text[:len(text) // 2] if scenario == 'invalid' and tier == 'fast' else text)
+            elif 'Validation Agent' in instruction:
+                agent = 'validator'
+                last = llm_request.contents[-1].parts if llm_request.contents else []
+                if any(p.function_response for p in last):
+                    part = types.Part(text=json.dumps({'status': 0, 'details': 'Computed total is 50.35, but expected 57.77.'}))
+                else:
+                    part = types.Part(function_call=types.FunctionCall(name='exit_function', args={
+                        'final_total': 50.35, 'data': {'total_values_dict': TOTALS[scenario]}}))
+            elif 'Refiner Agent' in instruction:
+                agent = 'refiner'
+                part = types.Part(text=json.dumps(GROUPED))
+            else:
+                raise ValueError(f"Unexpected LLM call: {instruction[:80]}")
+            seconds = (strong_ms if tier == 'strong' else fast_ms) / 1000
+            current['calls'].append([agent, tier, seconds])
+            await asyncio.sleep(seconds)
+            yield LlmResponse(content=types.Content(role='model', parts=[part]))
+
+    firebase_admin.initialize_app(AnonymousCredential(), {'projectId': 'bench'})
+    from receipt_classifier.agent import root_agent, refinement_loop
+    sys.modules['receipt_classifier.subagents.classification_response.agent'].save_summarised_data = lambda *args: None
+    refinement_loop.max_iterations = iterations
+    pending = [root_agent]
+    while pending:
+        agent = pending.pop()
+        if isinstance(agent, LlmAgent):
+            agent.model = TieredLlm(model=agent.model) # keeps the configured model name, which the tier is read from
+        pending.extend(agent.sub_agents)
+
+    async def run(scenario):
+        service = InMemorySessionService()
+        runner = Runner(agent=root_agent, app_name='bench', session_service=service)
+        session = await service.create_session(app_name='bench', user_id='user')
+        prompt = json.dumps({'line_items': [f"1 {x['item']} {x['price']}" for x in CLASSIFIED], 'receipt_total_value': TOTALS[scenario]})
+        message = types.Content(role='user', parts=[types.Part(text=prompt)])
+        current['scenario'], current['calls'] = scenario, []
+        start, tier = time.perf_counter(), None
+        async for event in runner.run_async(user_id='user', session_id=session.id, new_message=message):
+            tier = (event.actions.state_delta or {}).get('model_tier', tier) if event.actions else tier
+        return {'seconds': time.perf_counter() - start, 'calls': current['calls'], 'tier': tier}
+
+    return {scenario: asyncio.run(run(scenario)) for scenario in TOTALS}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2, help="Refinement loop iterations (mismatch receipt)")
+    parser.add_argument('--fast-ms', type=float, default=300, help="Latency per fast-tier call")
+    parser.add_argument('--strong-ms', type=float, default=1500, help="Latency per strong-tier call")
+    parser.add_argument('--mode', help=argparse.SUPPRESS) # child process: run one mode, print JSON
+    args = parser.parse_args()
+    if args.mode:
+        print(json.dumps(run_mode(args.iterations, args.fast_ms, args.strong_ms)))
+        return
+
+    results = {}
+    for mode, env in (('tiered', {}), ('strong', {'MODEL_FAST': STRONG_MODEL})):
+        out = subprocess.run([sys.executable, __file__, '--mode', mode, '--iterations', str(args.iterations),
+                              '--fast-ms', str(args.fast_ms), '--strong-ms', str(args.strong_ms)],
+                             env=dict(os.environ, PIPELINE_LLM_SUMMARY='False', MODEL_STRONG=STRONG_MODEL, **env),
+                             capture_output=True, text=True, check=True).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+    for scenario in TOTALS:
+        for mode, runs in results.items():
+            run = runs[scenario]
+            per_tier = {tier: [c for c in run['calls'] if c[1] == tier] for tier in ('fast', 'strong')}
+            tiers = ", ".join(f"{tier} {len(calls)} calls / {sum(c[2] for c in calls):.2f}s" for tier, calls in per_tier.items())
+            print(f"{scenario:8} {mode:6}: {run['seconds']:5.2f}s, served by {str(run['tier']):6} ({tiers}); "
+                  f"{' '.join(f'{agent}:{tier[0]}' for agent, tier, _ in run['calls'])}")
+
+if __name__ == '__main__':
+    main()
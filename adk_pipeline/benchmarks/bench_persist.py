@@ -0,0 +1,57 @@
+"""
+Deterministic persistence vs the LLM response_agent.
+
+Times the work the deterministic response_agent does besides the Firestore write,
+which is the same in both versions: picking the final categories out of the
+session state. Compares it with the LLM response_agent in the recorded trace
+(flask_api/gcp_adk_classification.py): two model calls (save_to_firebase call +
+final text), 2930 + 3145 tokens, ~1.9 s before the tool response arrived.
+
+    python benchmarks/bench_persist.py
+"""
+import importlib
+import json
+import os
+import sys
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.join(HERE, '..', 'receipt_classifier')
+
+def load_persist():
+    # Import the pure modules without executing the ADK agent packages' __init__
+    for name, path in [('rc', ''), ('rc.subagents', 'subagents'),
+                       ('rc.subagents.classification_grouper', 'subagents/classification_grouper'),
+                       ('rc.subagents.classification_response', 'subagents/classification_response')]:
+        module = types.ModuleType(name)
+        module.__path__ = [os.path.join(PACKAGE_DIR, path)]
+        sys.modules[name] = module
+    return importlib.import_module('rc.subagents.classification_response.persist')
+
+LLM_CALLS = 2
+LLM_TOKENS = 2930 + 3145
+LLM_FIRST_CALL_SECONDS = 174.434992 - 172.510478 # functionCall event -> tool response in the trace
+
+def main():
+    persist = load_persist()
+    with open(os.path.join(HERE, '..', 'evals', 'recorded_grouping.json')) as f:
+        fixture = json.load(f)[0]
+    state = {
+        'refinement_loop': 'run',
+        'grouped': '```json\n' + json.dumps(fixture['llm_grouped_classification']['grouped']) + '\n```',
+        'grouped_classification': fixture['llm_grouped_classification'],
+    }
+    iterations = 10000
+    start = time.perf_counter()
+    for _ in range(iterations):
+        categories = persist.final_categories(state)
+    seconds = (time.perf_counter() - start) / iterations
+    assert categories == fixture['llm_grouped_classification']['grouped']
+    print(f"deterministic: {seconds * 1e6:.1f} us + Firestore write, 0 model calls, 0 tokens")
+    print(f"LLM response_agent: {LLM_CALLS} model calls, {LLM_TOKENS} tokens, "
+          f">= {LLM_FIRST_CALL_SECONDS:.2f} s + Firestore write (second call not timed in the trace, "
+          f"~{LLM_CALLS * LLM_FIRST_CALL_SECONDS:.1f} s if similar)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Deterministic reconciliation vs the LLM refinement loop on mismatched receipts.
+
+Builds a corpus of receipts with one injected fault each (lost discount sign,
+quantity x unit price, duplicated line, dropped line, untaxed total, and an
+unexplainable misread price) and runs reconcile() on them. Receipts it can't
+explain still go through the LLM loop.
+
+LLM loop cost follows the recorded trace in flask_api/gcp_adk_classification.py:
+a failed validation + refine + passing validation = 2 iterations, ~3.6 s per
+validator pass and ~0.7 s per refiner call.
+
+    python benchmarks/bench_reconcile.py --receipts 600
+"""
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PACKAGE_DIR = os.path.join(HERE, '..', 'receipt_classifier')
+
+def load_reconcile():
+    # Import the pure modules without executing the ADK agent packages' __init__
+    for name, path in [('rc', ''), ('rc.subagents', 'subagents'),
+                       ('rc.subagents.classification_grouper', 'subagents/classification_grouper'),
+                       ('rc.subagents.classification_refiner', 'subagents/classification_refiner')]:
+        module = types.ModuleType(name)
+        module.__path__ = [os.path.join(PACKAGE_DIR, path)]
+        sys.modules[name] = module
+    return importlib.import_module('rc.subagents.classification_refiner.reconcile')
+
+reconcile_module = load_reconcile()
+
+LLM_ITERATIONS = 2
+VALIDATOR_SECONDS = 3.6
+REFINER_SECONDS = 0.7
+LLM_LOOP_SECONDS = LLM_ITERATIONS * VALIDATOR_SECONDS + (LLM_ITERATIONS - 1) * REFINER_SECONDS
+CATEGORIES = ["Groceries", "Fast Food", "Electronics", "Apparel", "Personal Care", "Others"]
+
+def make_receipt(rng):
+    items = []
+    for i in range(rng.randint(3, 12)):
+        quantity = rng.choice([1, 1, 1, 2, 3])
+        unit = rng.randint(99, 2999)
+        items.append({'item': f"Item {i}", 'quantity': str(quantity), 'price': f"{unit * quantity / 100:.2f}", 'category': rng.choice(CATEGORIES)})
+    line_items = [f"{x['quantity']} {x['item']} {x['price']}" for x in items]
+    net = sum(int(round(float(x['price']) * 100)) for x in items)
+    tax = net * 8 // 100
+    totals = {'total_amount': f"{(net + tax) / 100:.2f}", 'net_amount': f"{net / 100:.2f}", 'total_tax_amount': f"{tax / 100:.2f}"}
+    return items, line_items, totals
+
+def inject(fault, items, line_items, totals, rng):
+    items = [dict(x) for x in items]
+    if fault == 'discount_sign':
+        discount = rng.randint(50, 300)
+        line_items.append(f"1 Coupon -{discount / 100:.2f}")
+        items.append({'item': 'Coupon', 'quantity': '1', 'price': f"{discount / 100:.2f}", 'category': 'Others'})
+        for key in ('net_amount', 'total_amount'):
+            totals[key] = f"{float(totals[key]) - discount / 100:.2f}"
+    elif fault == 'quantity_price':
+        # The classifier reports the unit price instead of the line total
+        target = rng.choice([x for x in items if int(x['quantity']) > 1] or items[:1])
+        target['quantity'] = target['quantity'] if int(target['quantity']) > 1 else '2'
+        target['price'] = f"{float(target['price']) / int(target['quantity']):.2f}"
+    elif fault == 'duplicate':
+        items.append(dict(rng.choice(items)))
+    elif fault == 'dropped':
+        items.pop(rng.randrange(len(items)))
+    elif fault == 'tax_only':
+        totals['net_amount'] = '0'
+    elif fault == 'misread':
+        target = rng.choice(items)
+        target['price'] = f"{float(target['price']) + rng.choice([1, 10]) * 0.7:.2f}"
+    return items, line_items, totals
+
+FAULTS = ['discount_sign', 'quantity_price', 'duplicate', 'dropped', 'tax_only', 'misread']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--receipts', type=int, default=600)
+    parser.add_argument('--seed', type=int, default=11)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    per_fault = {fault: [0, 0] for fault in FAULTS} # [reconciled, total]
+    iterations_after = 0
+    python_seconds = 0.0
+    for n in range(args.receipts):
+        fault = FAULTS[n % len(FAULTS)]
+        items, line_items, totals = make_receipt(rng)
+        items, line_items, totals = inject(fault, items, line_items, totals, rng)
+        start = time.perf_counter()
+        result = reconcile_module.reconcile(items, totals, line_items)
+        python_seconds += time.perf_counter() - start
+        per_fault[fault][1] += 1
+        if result['status'] != 'residual':
+            per_fault[fault][0] += 1
+        else:
+            iterations_after += LLM_ITERATIONS
+    reconciled = sum(r for r, _ in per_fault.values())
+    for fault, (ok, total) in per_fault.items():
+        print(f"{fault:15}: {ok}/{total} reconciled")
+    residual_share = 1 - reconciled / args.receipts
+    print(f"loop iterations per receipt: before {LLM_ITERATIONS:.2f}, after {iterations_after / args.receipts:.2f}")
+    print(f"est. refinement latency per receipt: before {LLM_LOOP_SECONDS:.1f} s, "
+          f"after {residual_share * LLM_LOOP_SECONDS + python_seconds / args.receipts:.2f} s "
+          f"(reconcile() {python_seconds / args.receipts * 1e6:.0f} us)")
+
+if __name__ == '__main__':
+    main()
@@ -16,6 +16,12 @@ gcloud config set project $GOOGLE_CLOUD_PROJECT
 # echo "Authenticating with GCP..."
 # gcloud auth application-default login
 
+# The pipeline saves summaries with the API's storage layer (classification_response/firebase_store.py)
+echo "Copying the API's storage modules..."
+mkdir -p ./receipt_classifier/shared
+cp ../flask_api/storage.py ../flask_api/spend_aggregates.py ./receipt_classifier/shared/
+trap 'rm -rf ./receipt_classifier/shared' EXIT
+
 # Deploy ADK pipeline
 echo "Deploying ADK pipeline..."
 adk deploy cloud_run \
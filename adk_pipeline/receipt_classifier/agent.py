@@ -7,18 +7,25 @@ It uses a sequential agent with an initial receipt classifier followed by a refi
 
 # receipt_classifier/agent.py (Root Agent)
 from google.adk.agents import LoopAgent, SequentialAgent
-from .subagents.classifier_init import initial_classifier
+from .subagents.classifier_init import classifier_router
 from .subagents.classification_grouper import grouping_classification
 from .subagents.classification_reviewer import validate_classification
+from .subagents.classification_reviewer.callbacks import skip_refinement_if_reconciled
 from .subagents.classification_refiner import refine_classifier
-from .subagents.classification_response import response_agent
+from .subagents.classification_response import response_agent, summary_agent, PIPELINE_LLM_SUMMARY
+from .subagents.batch_classification import batch_classifier, BatchRouter
 
-# SEQUENTIAL AGENT
-    # INITIAL CLASSIFIER AGENT
+# BATCH ROUTER
+# SEQUENTIAL AGENT (one receipt)
+    # CLASSIFIER ROUTER
+        # INITIAL CLASSIFIER AGENT (raw line items)
+        # CATEGORY CLASSIFIER AGENT (parsed items: categories only)
     # LOOP AGENT
         # VALIDATION AGENT (reviewer)
         # CORRECTION AGENT (refiner)
-    # RESPONSE AGENT (final response)
+    # RESPONSE AGENT (saves the final classification, no LLM)
+    # SUMMARY AGENT (optional LLM summary, after the save)
+# BATCH CLASSIFICATION AGENT ({"receipts": [...]}: one classifier call, per-receipt reconciliation and save)
 
 refinement_loop = LoopAgent(
     name="RefineClassificationLoop",
@@ -28,16 +35,25 @@ refinement_loop = LoopAgent(
         refine_classifier,
     ],
     description="Iteratively reviews and refines a receipt classification until the Classification Totals match with Given Totals",
+    before_agent_callback=skip_refinement_if_reconciled, # Skips the loop when the grouped totals already match
 )
 
 # Create the Sequential Pipeline
-root_agent = SequentialAgent(
+receipt_pipeline = SequentialAgent(
     name="ReceiptClassificationPipeline",
     sub_agents=[
-        initial_classifier,  # Step 1: Generate initial classification
-        grouping_classification,  # Step 2: Group items by category, price, and quantity
+        classifier_router,  # Step 1: Generate initial classification (category-only when the API sent parsed items)
+        grouping_classification,  # Step 2: Group items by category and sum prices (deterministic, no LLM call)
         refinement_loop,  # Step 3: Review and refine in a loop
-        response_agent,  # Step 4: Final response agent to respond with the final classification | To Save in Firebase
-    ],
+        response_agent,  # Step 4: Save the final classification in Firebase (deterministic)
+    ] + ([summary_agent] if PIPELINE_LLM_SUMMARY else []),  # Step 5 (optional): LLM summary, off the critical path
     description="Generates and refines a receipt classification through an iterative review process",
 )
+
+# Batch requests skip the sequential pipeline
+root_agent = BatchRouter(
+    name="ReceiptClassifierRoot",
+    single_pipeline=receipt_pipeline,
+    batch_pipeline=batch_classifier,
+    description="Routes batch requests ({\"receipts\": [...]}) to the batch classifier, single receipts to the sequential pipeline",
+)
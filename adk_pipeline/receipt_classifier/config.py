@@ -0,0 +1,42 @@
+# receipt_classifier/config.py
+"""
+Pipeline-wide settings read from the environment.
+
+PIPELINE_CONTEXT_MODE controls what each LLM agent sees:
+  state   : only its instruction, the session state keys it needs (rendered into the
+            instruction) and its own current turn (tool calls/responses). Prompts stay
+            flat however many agents or loop iterations ran before.
+  history : the whole conversation so far, every earlier JSON blob, function call and
+            response included (ADK default, previous behaviour).
+"""
+import os
+
+PIPELINE_CONTEXT_MODE = os.getenv("PIPELINE_CONTEXT_MODE", "state").lower()
+STATE_CONTEXT = PIPELINE_CONTEXT_MODE == "state"
+INCLUDE_CONTENTS = "none" if STATE_CONTEXT else "default"
+
+def state_inputs(*keys):
+    """
+    Instruction section exposing the given state keys ({key?} templates, so missing keys
+    render empty) in state context mode; empty in history mode, where the agent reads
+    them from the conversation.
+    """
+    if not STATE_CONTEXT:
+        return ""
+    sections = "\n".join(f"- {key}: {{{key}?}}" for key in keys)
+    return f"\n## CURRENT STATE\n{sections}\n"
+
+# Chunked classification of long receipts (classifier_init/chunking.py)
+CLASSIFY_CHUNK_THRESHOLD = int(os.getenv("CLASSIFY_CHUNK_THRESHOLD", 40)) # lines; longer raw receipts are split
+CLASSIFY_CHUNK_ITEMS = int(os.getenv("CLASSIFY_CHUNK_ITEMS", 25)) # target lines per chunk
+CLASSIFY_CHUNK_WORKERS = int(os.getenv("CLASSIFY_CHUNK_WORKERS", 4)) # max chunks classified concurrently (1 = chunking off)
+
+# Model tiers (tiering.py): every agent starts on its fast model; the receipt is moved to
+# MODEL_STRONG when exit_function reports a totals mismatch or an output fails validation.
+MODEL_FAST = os.getenv("MODEL_FAST", "gemini-2.0-flash")
+MODEL_STRONG = os.getenv("MODEL_STRONG", "gemini-2.5-flash")
+MODEL_TIERING = os.getenv("MODEL_TIERING", "True").lower() == "true"
+
+def agent_model(name):
+    """Model of an agent: <NAME>_MODEL (e.g. REFINE_CLASSIFIER_MODEL) when set, MODEL_FAST otherwise."""
+    return os.getenv(f"{name.upper()}_MODEL", MODEL_FAST)
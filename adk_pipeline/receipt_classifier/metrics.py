@@ -0,0 +1,20 @@
+# receipt_classifier/metrics.py
+"""
+In-process counters for the pipeline (e.g. refinement loops skipped vs run).
+Every change is logged with the running totals; snapshot() returns a copy.
+"""
+import logging
+import threading
+
+_counters = {}
+_lock = threading.Lock()
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+        current = dict(_counters)
+    logging.info(f"Pipeline counters: {current}")
+
+def snapshot():
+    with _lock:
+        return dict(_counters)
@@ -0,0 +1 @@
+from .agent import batch_classifier, BatchRouter
\ No newline at end of file
@@ -0,0 +1,184 @@
+"""
+Batch Classification Agent
+
+Classifies several receipts in one invocation: one LLM call for all the parsed
+receipts (category-only) and one for all the raw ones, then grouping,
+reconciliation and saving per receipt without further LLM calls. Receipts whose
+totals still don't reconcile are not saved; the caller runs them through the
+single-receipt pipeline (refinement loop).
+"""
+
+# batch_classification/agent.py
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import AsyncGenerator, List
+from pydantic import BaseModel, Field
+from google.adk.agents import BaseAgent
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from .batch import batch_receipts, batch_item_names, split_categories, batch_line_items, split_classified, reconcile_receipt
+from ..classifier_init.agent import ReceiptClassificationBreakdown, make_category_classifier
+from ..classifier_init.assemble import CATEGORIES, assemble_classification, load_request, request_line_items
+from ..classification_grouper.grouping import load_classification
+from ... import metrics
+from ...config import agent_model
+from ...tiering import model_callbacks
+try:
+    from ..classification_response.firebase_store import save_summarised_data
+except Exception as e:
+    from firebase_store import save_summarised_data
+
+### OUTPUT SCHEMA DEFINITION ###
+class BatchReceiptClassification(BaseModel):
+    receipt_id: str = Field(..., description="The receipt_id of the receipt, unchanged.")
+    classified: List[ReceiptClassificationBreakdown] = Field(..., description="List of classified items of this receipt.")
+class BatchClassificationOutput(BaseModel):
+    receipts: List[BatchReceiptClassification] = Field(..., description="One entry per input receipt.")
+
+# Raw line items of several receipts in one call
+batch_line_classifier = LlmAgent(
+    name="BatchClassifier",
+    model=agent_model("batch_classifier"),
+    instruction="""
+    You are a Receipt Classifier for several receipts at once.
+
+    Task:
+    For every receipt below, assign each of its line items (quantity, item name, and price at the end) to ONE of these categories ONLY:
+    """ + json.dumps(CATEGORIES) + """
+
+    - Use only the item name and context to decide the best category.
+    - If an item doesn't clearly fit a category, assign it to "Others".
+    - Do not group, sum, or explain—just classify.
+    - If a line_item doesn't have a quantity default it to "1"
+    - Identify the line_items of a receipt which don't have a price, take the pending cost of that receipt (from subtracting its totals) and split it equally among them
+    - "item" is the item name only, without quantity and price (VERY IMPORTANT)
+    - Never mix items of different receipts.
+
+    Output:
+    {"receipts": [{"receipt_id": "...", "classified": [{"item", "quantity", "price", "category"}, ...]}, ...]}
+    with one entry per receipt, using the receipt_id exactly as given.
+
+    Receipts:
+    {batch_line_items}
+    """,
+    description="Classifies the raw line items of several receipts in one call",
+    include_contents="none", # sees only the receipts rendered above
+    output_schema=BatchClassificationOutput,
+    output_key="batch_classification",
+    **model_callbacks(BatchClassificationOutput),
+)
+
+class BatchClassificationAgent(BaseAgent):
+    """
+    Runs one classifier call per kind of receipt in the batch, splits the answers
+    back per receipt_id, groups and reconciles each receipt and saves the ones that
+    match their totals. Writes `batch_results`:
+    {receipt_id: {"refinement_loop", "firebase_save_result"?, "reconciliation"?}}.
+    """
+    category_classifier: LlmAgent
+    line_classifier: LlmAgent
+    output_key: str = "batch_results"
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name: str, category_classifier: LlmAgent, line_classifier: LlmAgent, **kwargs):
+        super().__init__(
+            name=name,
+            category_classifier=category_classifier,
+            line_classifier=line_classifier,
+            sub_agents=[category_classifier, line_classifier],
+            **kwargs,
+        )
+
+    def _state_event(self, ctx: InvocationContext, state_delta, text=None) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]) if text else None,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        receipts = batch_receipts(load_request(ctx.user_content))
+        parsed = [receipt for receipt in receipts if receipt.get("parsed_items")]
+        raw = [receipt for receipt in receipts if not receipt.get("parsed_items")]
+        classifications = {}
+
+        if parsed:
+            yield self._state_event(ctx, {"item_names": json.dumps(batch_item_names(parsed), ensure_ascii=False)})
+            async for event in self.category_classifier.run_async(ctx):
+                yield event
+            categories = load_classification(ctx.session.state.get(self.category_classifier.output_key)).get("categories", [])
+            for receipt, receipt_categories in zip(parsed, split_categories(parsed, categories) or [None] * len(parsed)):
+                if receipt_categories is not None:
+                    classifications[receipt["receipt_id"]] = assemble_classification(
+                        receipt["parsed_items"], receipt_categories, receipt.get("receipt_total_value"))
+
+        if raw:
+            yield self._state_event(ctx, {"batch_line_items": batch_line_items(raw)})
+            async for event in self.line_classifier.run_async(ctx):
+                yield event
+            classified = split_classified(load_classification(ctx.session.state.get(self.line_classifier.output_key)))
+            for receipt in raw:
+                classifications[receipt["receipt_id"]] = {
+                    "classified": classified.get(receipt["receipt_id"], []),
+                    "total_values_dict": receipt.get("receipt_total_value") or {},
+                }
+
+        results = {}
+        dt = datetime.now()
+        for receipt in receipts:
+            receipt_id = receipt["receipt_id"]
+            classification = classifications.get(receipt_id)
+            if classification is None:
+                results[receipt_id] = {"refinement_loop": "residual", "reconciliation": {"status": "residual", "adjustments": ["categories could not be split per receipt"]}}
+                metrics.increment("batch_receipts_residual")
+                continue
+            outcome = reconcile_receipt(classification, request_line_items(receipt))
+            grouped = outcome.pop("grouped")
+            results[receipt_id] = outcome
+            if grouped is None:
+                metrics.increment("batch_receipts_residual")
+                continue
+            metrics.increment(f"refinement_loops_{outcome['refinement_loop']}")
+            try:
+                # Firestore calls are blocking; keep them off the event loop
+                await asyncio.to_thread(save_summarised_data, dt.strftime("%Y-%m-%d"), receipt_id, grouped, dt)
+                outcome["firebase_save_result"] = {"result": "success", "message": "Data saved to Firebase.", "data": grouped}
+            except Exception as e:
+                logging.exception(f"Saving batched classification for receipt {receipt_id} failed")
+                outcome["firebase_save_result"] = {"result": "error", "message": f"Saving to Firebase failed: {e}"}
+        yield self._state_event(ctx, {self.output_key: results}, text=json.dumps(results))
+
+batch_classifier = BatchClassificationAgent(
+    name="BatchClassificationAgent",
+    category_classifier=make_category_classifier("BatchCategoryClassifier"),
+    line_classifier=batch_line_classifier,
+    description="Classifies several receipts in one LLM call and saves each one that reconciles with its totals",
+)
+
+class BatchRouter(BaseAgent):
+    """Runs the batch agent for {"receipts": [...]} requests, the single-receipt pipeline otherwise."""
+    single_pipeline: BaseAgent
+    batch_pipeline: BaseAgent
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name: str, single_pipeline: BaseAgent, batch_pipeline: BaseAgent, **kwargs):
+        super().__init__(
+            name=name,
+            single_pipeline=single_pipeline,
+            batch_pipeline=batch_pipeline,
+            sub_agents=[single_pipeline, batch_pipeline],
+            **kwargs,
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        agent = self.batch_pipeline if batch_receipts(load_request(ctx.user_content)) else self.single_pipeline
+        async for event in agent.run_async(ctx):
+            yield event
@@ -0,0 +1,90 @@
+# batch_classification/batch.py
+"""
+Batched classification: the line items of several receipts go to the classifier in
+one LLM call and the answer is split back per receipt_id. Grouping and
+reconciliation with the totals still happen per receipt, exactly as in the
+single-receipt pipeline.
+
+Request shape:
+    {"receipts": [{"receipt_id", "line_items" | "parsed_items", "receipt_total_value", "grouped"}, ...]}
+
+Pure Python (no ADK imports) so it can be reused by agents and benchmarks.
+"""
+import json
+import logging
+from ..classification_grouper.grouping import group_classified_items
+from ..classification_refiner.reconcile import reconcile
+from ..classification_reviewer.totals import grouped_total, match_receipt_total
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+def batch_receipts(request):
+    """The receipts of a batch request ([] for single-receipt requests); receipts without an id are dropped."""
+    receipts = request.get("receipts") if isinstance(request, dict) else None
+    if not isinstance(receipts, list):
+        return []
+    valid, seen = [], set()
+    for receipt in receipts:
+        receipt_id = receipt.get("receipt_id") if isinstance(receipt, dict) else None
+        if not receipt_id or receipt_id in seen:
+            logging.warning(f"Batch receipt without a unique receipt_id ignored: {str(receipt)[:200]}")
+            continue
+        seen.add(receipt_id)
+        valid.append(receipt)
+    return valid
+
+def batch_item_names(receipts):
+    """Item names of all parsed receipts, flattened in receipt order (one category classifier call)."""
+    return [item.get("item", "") for receipt in receipts for item in receipt["parsed_items"]]
+
+def split_categories(receipts, categories):
+    """
+    Split the flat category list back per receipt, by item counts.
+
+    Returns:
+        [categories of each receipt], or None when the count doesn't match the items sent
+        (the positions can't be trusted, so no receipt gets them).
+    """
+    counts = [len(receipt["parsed_items"]) for receipt in receipts]
+    if len(categories or []) != sum(counts):
+        logging.warning(f"Category classifier returned {len(categories or [])} categories for {sum(counts)} batched items")
+        return None
+    split, start = [], 0
+    for count in counts:
+        split.append(categories[start:start + count])
+        start += count
+    return split
+
+def batch_line_items(receipts):
+    """The raw receipts as rendered into the BatchClassifier instruction (compact JSON)."""
+    return _dumps([
+        {key: receipt[key] for key in ("receipt_id", "line_items", "receipt_total_value", "grouped") if receipt.get(key)}
+        for receipt in receipts
+    ])
+
+def split_classified(output):
+    """{receipt_id: classified} from the BatchClassifier output ({"receipts": [{"receipt_id", "classified"}]})."""
+    entries = output.get("receipts", []) if isinstance(output, dict) else []
+    return {entry["receipt_id"]: entry.get("classified") or [] for entry in entries if isinstance(entry, dict) and entry.get("receipt_id")}
+
+def reconcile_receipt(classification, line_items=None):
+    """
+    Group one receipt's classification and check it against its totals, like the
+    single-receipt grouper + refinement loop short-circuit.
+
+    Returns:
+        {"refinement_loop": "skipped" | "reconciled" | "residual", "grouped": [...] or None,
+         "reconciliation": {...} (when the totals didn't match as grouped)}
+        Residual receipts have no `grouped`: they need the LLM refinement loop.
+    """
+    classified = classification.get("classified")
+    totals = classification.get("total_values_dict")
+    grouped = group_classified_items(classified)
+    if grouped and match_receipt_total(grouped_total(grouped), totals) is not None:
+        return {"refinement_loop": "skipped", "grouped": grouped}
+    result = reconcile(classified, totals, line_items)
+    reconciliation = {k: result[k] for k in ("status", "target", "adjustments", "gap")}
+    if result["status"] == "residual":
+        return {"refinement_loop": "residual", "grouped": None, "reconciliation": reconciliation}
+    return {"refinement_loop": "reconciled", "grouped": result["grouped"], "reconciliation": reconciliation}
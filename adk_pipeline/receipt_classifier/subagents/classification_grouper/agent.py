@@ -1,15 +1,19 @@
 """
 Receipt Classification Grouping Agent
+
+Groups the initial classification by category without an LLM call:
+items are collected per category and prices summed exactly (see grouping.py).
 """
 
 # classifier_grouper/agent.py
-from google.adk.agents.llm_agent import LlmAgent
-from typing import List, Dict, Any
+import json
+from typing import AsyncGenerator, List
 from pydantic import BaseModel, Field
-# from .tools import group_the_classification
-
-# Constants
-GEMINI_MODEL = "gemini-2.0-flash"
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from .grouping import group_classified_items, load_classification
 
 ### OUTPUT SCHEMA DEFINITION ###
 class ReceiptGroupingBreakdown(BaseModel):
@@ -19,50 +23,27 @@ class ReceiptGroupingBreakdown(BaseModel):
 class ReceiptGroupingOutput(BaseModel):
     grouped: List[ReceiptGroupingBreakdown] = Field(..., description="List of grouped receipt items.")
 
-# Define the Initial Classifier Agent
-grouping_classification = LlmAgent(
+class ClassificationGroupingAgent(BaseAgent):
+    """
+    Reads `stage_init_classification` from the session state and writes
+    `grouped_classification` ({"grouped": [...]}) in the same shape the LLM grouper produced.
+    """
+    input_key: str = "stage_init_classification"
+    output_key: str = "grouped_classification"
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        classification = load_classification(ctx.session.state.get(self.input_key))
+        grouped = ReceiptGroupingOutput(grouped=group_classified_items(classification.get("classified", []))).model_dump()
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(grouped))]),
+            actions=EventActions(state_delta={self.output_key: grouped}),
+        )
+
+# Define the Grouping Agent
+grouping_classification = ClassificationGroupingAgent(
     name="grouping_classification",
-    model=GEMINI_MODEL,
-    instruction="""
-    Task:
-    You are given a Classification JSON with receipt items you need to group by category
-
-    Output:
-    Return a valid JSON array (no extra text). Each element should have:
-    "category": The category of the items
-    "items": A list of item names in that category
-    "total_price": The total price of all items in that category
-
-    Input Format:
-    {
-        "classified": [
-            {"item": "Apple","quantity": "1", "price":"2.50","category": "Groceries"},
-            {"item": "Fren Onion Soup","quantity": "1", "price":"5.95","category": "Fast Food"},
-            {"item": "Bread","quantity": "2", "price":"1.05","category": "Groceries"}
-        ],
-        "total_values_dict": {
-            "total_amount": "9.50",
-            "net_amount": "9.50",
-            "total_tax_amount": "0.00"
-        }
-    } # NOTE: The "classified" field is the output from the initial classifier agent, which contains the classified items with their categories, That is the Key you need to use to group the items.
-
-    Example Output:
-    [
-        {
-            "category": "Groceries", "items": ["Apple", "Bread"], "total_price": "3.55"
-        },
-        {
-            "category": "Fast Food", "items": ["Fren Onion Soup"], "total_price": "5.95"
-        }
-    ]
-
-    
-    The Input Data is in
-    {stage_init_classification}
-    """,
-    description="Generates the Grouping JSON",
-    # tools=[group_the_classification],
-    output_schema=ReceiptGroupingOutput,
-    output_key="grouped_classification",
-)
\ No newline at end of file
+    description="Groups the classified items by category and sums their prices (deterministic, no LLM call)",
+)
@@ -0,0 +1,68 @@
+# classification_grouper/grouping.py
+"""
+Deterministic grouping of classified receipt items.
+
+Pure Python (no ADK imports) so it can be reused by tools, agents and benchmarks.
+Prices are summed as Decimals so category totals are exact to the cent.
+"""
+import json
+import logging
+from decimal import Decimal, InvalidOperation
+
+def to_decimal(value):
+    """
+    Parse a price string ("3.50", "$3.50", "3,50", "1,299.00") as a Decimal; None when it
+    isn't a number. Same separator rules as the API's line_item_parser.to_decimal.
+    """
+    if value is None:
+        return None
+    text = str(value).replace('$', '').replace(' ', '').strip()
+    if ',' in text and '.' in text:
+        text = text.replace(',', '') # thousands separator
+    else:
+        text = text.replace(',', '.')
+    try:
+        return Decimal(text)
+    except (InvalidOperation, ValueError):
+        return None
+
+def load_classification(value):
+    """
+    Return a state value (dict, JSON string or ```json fenced string) as a Python object.
+    """
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith('```'):
+            text = text.split('\n', 1)[1] if '\n' in text else ''
+            text = text.rsplit('```', 1)[0]
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            logging.warning(f"Could not parse classification JSON: {value[:200]}")
+            return {}
+    return value or {}
+
+def group_classified_items(classified):
+    """
+    Group classified items by category, in order of first appearance.
+
+    Args:
+        classified: [{"item", "quantity", "price", "category"}, ...] where price is the line total.
+
+    Returns:
+        [{"category", "items": [names], "total_price": "0.00"}, ...]
+    """
+    groups = {}
+    for entry in classified or []:
+        category = entry.get('category') or 'Others'
+        group = groups.setdefault(category, {'items': [], 'total': Decimal('0')})
+        group['items'].append(entry.get('item', ''))
+        price = to_decimal(entry.get('price'))
+        if price is None:
+            logging.warning(f"Item without a valid price counted as 0: {entry}")
+            price = Decimal('0')
+        group['total'] += price
+    return [
+        {'category': category, 'items': group['items'], 'total_price': f"{group['total']:.2f}"}
+        for category, group in groups.items()
+    ]
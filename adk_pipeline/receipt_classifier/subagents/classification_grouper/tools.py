@@ -1,8 +1,7 @@
 # classification_grouper/tools.py
-## NOTE: TODO
-import json
 from typing import Dict, Any
 from google.adk.tools.tool_context import ToolContext
+from .grouping import group_classified_items, load_classification
 
 def group_the_classification(
     data: Dict[str, Any],
@@ -37,6 +36,8 @@ def group_the_classification(
         tool_context: Tool context (optional for session actions).
 
     Returns:
-        A list of dictionaries, each representing a grouped category with its items and total price.
+        {"grouped": [...]}: one dictionary per category with its items and total price.
     """
-    return {}
\ No newline at end of file
+    grouped = {"grouped": group_classified_items(load_classification(data).get("classified", []))}
+    tool_context.state["grouped_classification"] = grouped
+    return grouped
\ No newline at end of file
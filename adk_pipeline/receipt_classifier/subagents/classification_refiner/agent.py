@@ -6,13 +6,12 @@ This agent refines the grouped classification breakdown based on validation feed
 
 # classification_refiner/agent.py
 from google.adk.agents.llm_agent import LlmAgent
-
-# Constants
-GEMINI_MODEL = "gemini-2.0-flash"
+from ...config import INCLUDE_CONTENTS, state_inputs, agent_model
+from ...tiering import model_callbacks
 
 refine_classifier = LlmAgent(
     name="refine_classifier",
-    model=GEMINI_MODEL,
+    model=agent_model("refiner"),
     instruction="""
 You are a Receipt Classification Refiner Agent.
 
@@ -25,6 +24,9 @@ You receive as input:
 - "validation_result": the result from the validation agent, with:
     - "status": 1 (pass) or 0 (fail/error)
     - "details": description of the validation outcome and what might be wrong
+- "reconciliation": what the deterministic reconciliation already tried (tax, discounts, quantity x price,
+  dropped/duplicated lines) and the remaining "gap". These explanations did NOT close the gap; look for other causes.
+  {reconciliation?}
 
 ## TASK
 1. If "validation_result" status is 1:
@@ -87,7 +89,9 @@ Do NOT output explanations, comments, or anything except the grouped JSON array.
     {"category": "Groceries", "items": ["Apple", "Bread"], "total_price": "3.55"},
     {"category": "Fast Food", "items": ["Fren Onion Soup"], "total_price": "5.95"}
 ]
-""",
+""" + state_inputs("stage_init_classification", "grouped_classification", "grouped", "validation_result"),
+    include_contents=INCLUDE_CONTENTS,
     description="Refines the grouped classification breakdown based on validation feedback, outputting only the corrected grouped array.",
-    output_key="grouped"
+    output_key="grouped",
+    **model_callbacks(), # strong model once escalated; an output that isn't JSON is retried on it
 )
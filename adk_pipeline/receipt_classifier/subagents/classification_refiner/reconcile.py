@@ -0,0 +1,184 @@
+# classification_refiner/reconcile.py
+"""
+Deterministic reconciliation of a classification with the receipt totals.
+
+When the grouped totals don't match total_amount / net_amount, the gap usually
+has a mechanical explanation. Each strategy below tries one explanation and is
+kept only if it makes the totals match exactly (within a cent):
+  - discount lines whose minus sign was lost in OCR
+  - a quantity x unit-price mix-up on one line
+  - a line duplicated by the classifier
+  - a receipt line the classifier dropped
+  - tax to be allocated proportionally (when only total_amount is usable)
+Discounts are then spread proportionally over the categories they apply to.
+Anything left is a residual gap for the LLM refiner.
+"""
+import re
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from ..classification_grouper.grouping import to_decimal, group_classified_items
+
+TOLERANCE = Decimal('0.01')
+CENT = Decimal('0.01')
+DISCOUNT_RE = re.compile(r'\b(discount|disc|coupon|promo|savings?|voucher|off)\b', re.IGNORECASE)
+LINE_PRICE_RE = re.compile(r'^\s*(?:(\d+(?:\.\d+)?)\s*[xX]?\s+)?(.+?)\s+\$?(-?\d{1,3}(?:,\d{3})+\.\d{2}|-?\d+[.,]\d{1,2})\s*$')
+
+def _normalize(name):
+    return ' '.join(re.sub(r'[^\w&%+]+', ' ', str(name).lower()).split())
+
+def parse_line(line):
+    """("2 Bread 1.05") -> {'item', 'quantity', 'price': Decimal}; None when the line has no trailing price."""
+    match = LINE_PRICE_RE.match(line or '')
+    if not match:
+        return None
+    quantity, item, price = match.groups()
+    return {'item': item.strip(), 'quantity': quantity or '1', 'price': to_decimal(price)}
+
+def _items(classified):
+    items = []
+    for entry in classified or []:
+        price = to_decimal(entry.get('price'))
+        items.append({**entry, 'price': price if price is not None else Decimal('0')})
+    return items
+
+def _total(items):
+    return sum((item['price'] for item in items), Decimal('0'))
+
+def _targets(totals):
+    targets = []
+    for key in ('total_amount', 'net_amount'):
+        value = to_decimal((totals or {}).get(key))
+        if value is not None and value > 0:
+            targets.append((key, value))
+    return targets
+
+def _matched(amount, targets):
+    for key, value in targets:
+        if abs(amount - value) < TOLERANCE:
+            return key
+    return None
+
+def _money(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+def allocate(weights, amount):
+    """Split amount over the weights to the cent (largest remainder), keeping the exact sum."""
+    total_weight = sum(weights)
+    if not weights or total_weight == 0:
+        return [Decimal('0') for _ in weights]
+    raw = [amount * w / total_weight for w in weights]
+    shares = [r.quantize(CENT, rounding=ROUND_DOWN) for r in raw]
+    remainder = int(((amount - sum(shares)) / CENT).to_integral_value())
+    order = sorted(range(len(raw)), key=lambda i: raw[i] - shares[i], reverse=True)
+    step = CENT if remainder >= 0 else -CENT
+    for i in order[:abs(remainder)]:
+        shares[i] += step
+    return shares
+
+### STRATEGIES: each returns (items, description) candidates ###
+def _fix_discount_signs(items, line_items):
+    for i, item in enumerate(items):
+        if item['price'] > 0 and DISCOUNT_RE.search(str(item.get('item', ''))):
+            fixed = [dict(x) for x in items]
+            fixed[i]['price'] = -item['price']
+            yield fixed, f"'{item.get('item')}' is a discount: {item['price']} -> {-item['price']}"
+
+def _fix_quantity_price(items, line_items):
+    for i, item in enumerate(items):
+        quantity = to_decimal(item.get('quantity'))
+        if quantity is None or quantity <= 1:
+            continue
+        for price, how in ((_money(item['price'] * quantity), 'unit price x quantity'), (_money(item['price'] / quantity), 'line total / quantity')):
+            fixed = [dict(x) for x in items]
+            fixed[i]['price'] = price
+            yield fixed, f"'{item.get('item')}' price {item['price']} -> {price} ({how})"
+
+def _remove_duplicates(items, line_items):
+    raw_counts = {}
+    for parsed in filter(None, map(parse_line, line_items or [])):
+        raw_counts[parsed['price']] = raw_counts.get(parsed['price'], 0) + 1
+    seen = {}
+    for i, item in enumerate(items):
+        key = (_normalize(item.get('item', '')), item['price'])
+        seen[key] = seen.get(key, 0) + 1
+        if seen[key] > 1 and (not raw_counts or seen[key] > raw_counts.get(item['price'], 0)):
+            yield items[:i] + items[i + 1:], f"'{item.get('item')}' ({item['price']}) was duplicated"
+
+def _restore_dropped(items, line_items):
+    prices = {}
+    for item in items:
+        prices[item['price']] = prices.get(item['price'], 0) + 1
+    for parsed in filter(None, map(parse_line, line_items or [])):
+        if parsed['price'] is None:
+            continue
+        if prices.get(parsed['price'], 0) > 0:
+            prices[parsed['price']] -= 1
+            continue
+        restored = {'item': parsed['item'], 'quantity': parsed['quantity'], 'price': parsed['price'], 'category': 'Others'}
+        yield items + [restored], f"restored dropped line '{parsed['item']}' ({parsed['price']}) as Others"
+
+STRATEGIES = [_fix_discount_signs, _fix_quantity_price, _remove_duplicates, _restore_dropped]
+
+def _grouped(items):
+    return group_classified_items([{**item, 'price': f"{item['price']:.2f}"} for item in items])
+
+def _spread_discounts(items):
+    """Move negative lines out of their own category and spread them over the other items' categories."""
+    discounts = [item for item in items if item['price'] < 0]
+    if not discounts:
+        return _grouped(items), []
+    grouped = _grouped([item for item in items if item['price'] >= 0])
+    amount = _total(discounts)
+    shares = allocate([to_decimal(g['total_price']) for g in grouped], amount)
+    for group, share in zip(grouped, shares):
+        group['total_price'] = f"{to_decimal(group['total_price']) + share:.2f}"
+    return grouped, [f"discount {amount} spread proportionally over {len(grouped)} categories"]
+
+def reconcile(classified, totals, line_items=None):
+    """
+    Try to explain the gap between the classified items and the receipt totals.
+
+    Args:
+        classified: [{"item", "quantity", "price", "category"}, ...] (prices are line totals).
+        totals: {"total_amount", "net_amount", "total_tax_amount"}.
+        line_items: the original OCR line strings, used to detect dropped/duplicated lines.
+
+    Returns:
+        {"status": "matched" | "reconciled" | "residual", "target": key or None,
+         "grouped": [...], "adjustments": [str], "gap": "0.00"}
+    """
+    items = _items(classified)
+    targets = _targets(totals)
+    adjustments = []
+    target = _matched(_total(items), targets)
+    status = 'matched' if target else None
+    if not target:
+        for strategy in STRATEGIES:
+            for candidate, description in strategy(items, line_items):
+                target = _matched(_total(candidate), targets)
+                if target:
+                    items, status = candidate, 'reconciled'
+                    adjustments.append(description)
+                    break
+            if target:
+                break
+    grouped, spread = _spread_discounts(items)
+    adjustments += spread
+    if not target:
+        # Tax not itemised: allocate it proportionally when only total_amount can be matched
+        tax = to_decimal((totals or {}).get('total_tax_amount'))
+        total_amount = dict(targets).get('total_amount')
+        if tax and total_amount is not None and abs(_total(items) + tax - total_amount) < TOLERANCE:
+            shares = allocate([to_decimal(g['total_price']) for g in grouped], tax)
+            for group, share in zip(grouped, shares):
+                group['total_price'] = f"{to_decimal(group['total_price']) + share:.2f}"
+            adjustments.append(f"tax {tax} allocated proportionally over {len(grouped)} categories")
+            target, status = 'total_amount', 'reconciled'
+    grouped_sum = sum((to_decimal(g['total_price']) for g in grouped), Decimal('0'))
+    gap = (dict(targets).get(target) - grouped_sum) if target else (targets[-1][1] - grouped_sum if targets else Decimal('0'))
+    return {
+        'status': status or 'residual',
+        'target': target,
+        'grouped': grouped,
+        'adjustments': adjustments,
+        'gap': f"{gap:.2f}",
+    }
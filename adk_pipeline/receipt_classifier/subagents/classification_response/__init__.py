@@ -1 +1 @@
-from .agent import response_agent
\ No newline at end of file
+from .agent import response_agent, summary_agent, PIPELINE_LLM_SUMMARY
\ No newline at end of file
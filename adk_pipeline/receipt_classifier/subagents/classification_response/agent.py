@@ -1,63 +1,81 @@
 """
 Receipt Classification Response Agent
+
+Persists the final classification without an LLM call: the grouped categories are
+read straight from the session state and saved to Firebase. An optional LLM summary
+(PIPELINE_LLM_SUMMARY=True) runs after the save, off the critical path.
 """
 
 # response_agent/agent.py
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import AsyncGenerator
+from google.adk.agents import BaseAgent
 from google.adk.agents.llm_agent import LlmAgent
-from .tools import save_to_firebase
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from .persist import final_categories
+from ...config import agent_model
+from ...tiering import model_callbacks
+try:
+    from .firebase_store import save_summarised_data
+except Exception as e:
+    from firebase_store import save_summarised_data
+
+PIPELINE_LLM_SUMMARY = os.getenv("PIPELINE_LLM_SUMMARY", "False").lower() == "true"
 
-GEMINI_MODEL = "gemini-2.0-flash"
+class PersistClassificationAgent(BaseAgent):
+    """
+    Saves the final categories to DATA/SUMMARISED_DATA and writes the outcome to
+    `firebase_save_result` ({"result", "message", "data"}), the key the API waits for.
+    """
+    output_key: str = "firebase_save_result"
 
-response_agent = LlmAgent(
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        categories = final_categories(ctx.session.state)
+        dt = datetime.now()
+        try:
+            # Firestore calls are blocking; keep them off the event loop
+            await asyncio.to_thread(save_summarised_data, dt.strftime("%Y-%m-%d"), ctx.session.id, categories, dt)
+            result = {"result": "success", "message": "Data saved to Firebase.", "data": categories}
+        except Exception as e:
+            logging.exception(f"Saving classification for session {ctx.session.id} failed")
+            result = {"result": "error", "message": f"Saving to Firebase failed: {e}"}
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(result))]),
+            actions=EventActions(state_delta={self.output_key: result}),
+        )
+
+response_agent = PersistClassificationAgent(
     name="response_agent",
-    model=GEMINI_MODEL,
+    description="Saves the final receipt classification to Firebase (deterministic, no LLM call).",
+)
+
+# Optional human-readable summary, generated after the data is already saved
+summary_agent = LlmAgent(
+    name="summary_agent",
+    model=agent_model("summary"),
+    include_contents="none",
     instruction="""
-You are a Receipt Classification Finalizer Agent.
-
-Given the validated receipt classification breakdown, perform the following steps:
-1. Generate a summary JSON as described below.
-2. Call the `save_to_firebase` tool, passing the summary from `grouped_classification` variable to it as the 'data' argument.
-3. Output ONLY the result from the `save_to_firebase` tool.
-
-## Summary JSON Fields:
-- summary: A concise description of the classification result.
-- categories: The list of categories and their items (from grouped_classification).
-- final_total: The computed final total.
-- status: 1 if totals matched, 0 if not.
-- timestamp: Use the provided timestamp if available.
-- notes: Any warnings or info.
-
-
-
-## Example Input to `save_to_firebase` tool (VERY STRICT STRUCTURE):
-    [
-        {
-            "category": "Groceries", "items": ["Apple", "Bread"], "total_price": "3.55"
-        },
-        {
-            "category": "Fast Food", "items": ["Fren Onion Soup"], "total_price": "5.95"
-        }
-    ]
-
-## Example Output what the `save_to_firebase` tool should return:
-{
-  "result": "success",
-  "message": "Data saved to Firebase.",
-  "data":     [
-        {
-            "category": "Groceries", "items": ["Apple", "Bread"], "total_price": "3.55"
-        },
-        {
-            "category": "Fast Food", "items": ["Fren Onion Soup"], "total_price": "5.95"
-        }
-    ]
-}
-
-
-Take the Data from the 'grouped_classification' key in the input JSON and use it to generate the summary JSON.
-{grouped_classification}
+You are a Receipt Classification Summary Agent.
+Write a one or two sentence summary of the saved receipt classification below
+(categories, their totals and anything notable). Output only the summary text.
+
+Saved classification:
+{firebase_save_result}
+
+Validation / reconciliation notes:
+{validation_result?}
+{reconciliation?}
 """,
-    description="Generates and saves the final receipt classification summary to Firebase.",
-    tools=[save_to_firebase],
-    output_key="firebase_save_result"
+    description="Writes a short natural-language summary of the saved classification.",
+    output_key="classification_summary",
+    **model_callbacks(validate_output=False),
 )
@@ -1,33 +1,69 @@
 # classification_response/firebase_store.py
+"""
+Saves the final categories where the API reads them, with the API's own storage
+layer: flask_api/storage.py (Firestore or SQLite backend, SQLite schema) and
+spend_aggregates.py (spend contribution rules). STORAGE_BACKEND and SQLITE_PATH pick
+the backend, as in the API.
+
+The two modules are imported from SPENDIFY_API_PATH (default: the flask_api directory
+next to adk_pipeline) or, in the deployed service, from receipt_classifier/shared/,
+where deploy.sh copies them. Inside the API (CLASSIFICATION_URL=inprocess) the
+already imported modules and Firebase app are reused.
+"""
+import logging
 import os
-import firebase_admin
-from firebase_admin import credentials, firestore # , realtime
+import sys
+import threading
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SPENDIFY_API_PATH = os.getenv('SPENDIFY_API_PATH', os.path.join(os.path.dirname(os.path.dirname(PACKAGE_DIR)), 'flask_api'))
+SHARED_PATH = os.path.join(PACKAGE_DIR, 'shared')
+
+_lock = threading.Lock()
+_store = None
 
-cred_path = os.getenv('FIREBASE_CREDENTIALS', 'firebase_credentials.json')
-print(f"Loading Firebase credentials from: {cred_path}")
-if not cred_path or not os.path.exists(cred_path):
-    code_current_dir = os.path.dirname(os.path.abspath(__file__))
-    msg = f"Firebase credentials file not found at: {cred_path}"
-    print(msg)
-    cred_path = os.path.join(code_current_dir, 'firebase_credentials.json')
-    if not os.path.exists(cred_path):
-        print(f"Firebase credentials file not found at: {cred_path}")
-        raise FileNotFoundError(msg)
+def _import_api_modules():
+    """Put the directory holding storage.py and spend_aggregates.py on sys.path."""
+    if 'storage' in sys.modules:
+        return
+    for path in (SPENDIFY_API_PATH, SHARED_PATH):
+        path = os.path.abspath(path)
+        if os.path.exists(os.path.join(path, 'storage.py')):
+            if path not in sys.path:
+                sys.path.append(path)
+            return
+    raise ImportError(f"storage.py not found in SPENDIFY_API_PATH ({SPENDIFY_API_PATH}) or {SHARED_PATH}")
 
-cred = credentials.Certificate(cred_path)
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+def _storage():
+    """The API's storage backend, created on first use."""
+    global _store
+    with _lock:
+        if _store is None:
+            _import_api_modules()
+            from storage import create_storage
+            _store = create_storage()
+        return _store
 
 def save_summarised_data(date_str, session_id, summary_dict, timestamp): # , final_total
     """
     Store summarised data under:
       DATA -> SUMMARISED_DATA -> {date_str} -> {session_id}
+    and update the owning user's SPEND_AGGREGATES.
+    The session's own date (SESSIONS/{session_id}.timestamp) is used when known,
+    so the API finds the document where it looks for it.
     """
-    sum_ref = db.collection('DATA').document('SUMMARISED_DATA').collection(date_str).document(session_id)
-    print(f"Saving summarised data to: DATA/SUMMARISED_DATA/{date_str}/{session_id}")
-    print(f"Summary data: {summary_dict}")
+    store = _storage()
+    from spend_aggregates import summary_contribution
+    logging.info(f"Summary data: {summary_dict}")
     # [{'category': 'Others', 'items': ['g1 Imp White', 'Blue Moon Tap'], 'total_price': '13.75'}, {'items': ['Mozzarella&Tomato', 'Pork Quesadilla', 'Fren Onion Soup', 'Pork Chop', 'Hanger Sizzle'], 'category': 'Fast Food', 'total_price': '72.75'}]
     final_total = sum(float(item['total_price']) for item in summary_dict if 'total_price' in item)
     payload = {"categories": summary_dict, 'timestamp': timestamp, 'final_total': final_total}
-    sum_ref.set(payload)
-    print(f"Data saved successfully for session {session_id} on {date_str}.")
\ No newline at end of file
+    session_doc = store.get_session(session_id) or {}
+    date_str = session_doc.get('timestamp', '').split('T')[0] or date_str
+    store.save_summary(date_str, session_id, payload)
+    logging.info(f"Data saved successfully for session {session_id} on {date_str}.")
+    if session_doc.get('main_user'):
+        store.update_spend_aggregates(session_doc['main_user'], session_id, summary_contribution(summary_dict, date_str))
+        logging.info(f"Spend aggregates updated for user {session_doc['main_user']}")
+    else:
+        logging.warning(f"No session metadata for {session_id}, spend aggregates not updated.")
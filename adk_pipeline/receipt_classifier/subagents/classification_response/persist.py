@@ -0,0 +1,19 @@
+# classification_response/persist.py
+"""
+Picks the final grouped classification out of the session state (pure Python).
+"""
+from ..classification_grouper.grouping import load_classification
+
+def final_categories(state):
+    """
+    The categories to persist: the refiner's `grouped` when the refinement loop ran
+    and produced a list, otherwise `grouped_classification` (grouper / reconciliation).
+    """
+    if state.get("refinement_loop") == "run":
+        refined = load_classification(state.get("grouped"))
+        if isinstance(refined, dict):
+            refined = refined.get("grouped")
+        if isinstance(refined, list) and refined:
+            return refined
+    grouped = load_classification(state.get("grouped_classification"))
+    return grouped.get("grouped", []) if isinstance(grouped, dict) else grouped
@@ -7,13 +7,13 @@ This agent validates that the grouped classification output matches the receipt
 # classification_reviewer/agent.py
 from google.adk.agents.llm_agent import LlmAgent
 from .tools import calculate_final_total, exit_function
+from ...config import INCLUDE_CONTENTS, STATE_CONTEXT, state_inputs, agent_model
+from ...tiering import model_callbacks
 # from google.adk.tools import exit_loop
 
-GEMINI_MODEL = "gemini-2.0-flash" # Constants
-
 validate_classification = LlmAgent(
     name="validate_classification",
-    model=GEMINI_MODEL,
+    model=agent_model("validator"),
     instruction="""
 You are a Receipt Classification Validation Agent.
 
@@ -54,9 +54,13 @@ Your task is to verify that the GROUPED receipt breakdown's total matches the or
 1. Call `calculate_final_total`.
 2. On success, call `exit_function`.
 3. Output **only** the result from the last tool.
-
-""",
+""" + (
+    "\nWhen `grouped` (the refiner's latest breakdown) is set below, validate it instead of `grouped_classification`.\n"
+    if STATE_CONTEXT else ""
+) + state_inputs("stage_init_classification", "grouped_classification", "grouped"),
+    include_contents=INCLUDE_CONTENTS,
     description="Validates that the grouped classification matches the receipt's total using the calculate_final_total tool and calls exit_function to determine and return final status.",
     tools=[calculate_final_total, exit_function],
     output_key="validation_result",
+    **model_callbacks(validate_output=False), # strong model once exit_function reported a mismatch
 )
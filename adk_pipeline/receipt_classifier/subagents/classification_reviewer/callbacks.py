@@ -0,0 +1,46 @@
+# classification_reviewer/callbacks.py
+from typing import Optional
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+from .totals import grouped_total, match_receipt_total
+from ..classification_grouper.grouping import load_classification
+from ..classification_refiner.reconcile import reconcile
+from ..classifier_init.assemble import load_request, request_line_items
+from ... import metrics
+
+def _request_line_items(callback_context: CallbackContext):
+    """Original OCR line items from the user's request JSON (used to spot dropped/duplicated lines)."""
+    return request_line_items(load_request(callback_context.user_content)) or None
+
+def skip_refinement_if_reconciled(callback_context: CallbackContext) -> Optional[types.Content]:
+    """
+    before_agent_callback for the refinement loop: when the grouped totals already
+    match the receipt's total_amount or net_amount, or the gap is explained by the
+    deterministic reconciliation (classification_refiner/reconcile.py), skip the loop
+    and its validator/refiner LLM calls. Only residual gaps go through the loop.
+    Records the outcome in state['refinement_loop'] ('skipped', 'reconciled' or 'run')
+    and in the metrics counters.
+    """
+    state = callback_context.state
+    grouped = load_classification(state.get("grouped_classification")).get("grouped")
+    classification = load_classification(state.get("stage_init_classification"))
+    totals = classification.get("total_values_dict")
+    final_total = grouped_total(grouped)
+    matched = match_receipt_total(final_total, totals) if grouped else None
+    if matched is not None:
+        state["refinement_loop"] = "skipped"
+        state["validation_result"] = {"status": 1, "details": f"Computed total {final_total} matches the receipt {matched}. Refinement skipped."}
+        metrics.increment("refinement_loops_skipped")
+        return types.Content(role="model", parts=[types.Part(text=f"Grouped total {final_total} matches {matched}; refinement skipped.")])
+
+    result = reconcile(classification.get("classified"), totals, _request_line_items(callback_context))
+    state["reconciliation"] = {k: result[k] for k in ("status", "target", "adjustments", "gap")}
+    if result["status"] == "residual":
+        state["refinement_loop"] = "run"
+        metrics.increment("refinement_loops_run")
+        return None
+    state["grouped_classification"] = {"grouped": result["grouped"]}
+    state["refinement_loop"] = "reconciled"
+    state["validation_result"] = {"status": 1, "details": f"Reconciled with the receipt {result['target']}: {'; '.join(result['adjustments']) or 'regrouped'}."}
+    metrics.increment("refinement_loops_reconciled")
+    return types.Content(role="model", parts=[types.Part(text=f"Totals reconciled ({'; '.join(result['adjustments']) or 'regrouped'}); refinement skipped.")])
@@ -1,6 +1,9 @@
 # classification_reviewer/tools.py
 from typing import Any, Dict, List
 from google.adk.tools.tool_context import ToolContext
+from .totals import find_receipt_totals, match_receipt_total
+from ..classification_grouper.grouping import to_decimal
+from ...tiering import escalate
 
 def calculate_final_total(
         data: List[Dict[str, Any]], # list,
@@ -65,44 +68,38 @@ def exit_function(
     Returns:
         Dict with 'status' and 'details' keys.
     """
-    # Adapt to your actual key structure
-    receipt_totals = None
-
-    if "stage_init_classifier" in data:
-        totals_dict = data["stage_init_classifier"].get("total_values_dict", {})
-    elif "receipt_total_value" in data:
-        totals_dict = data["receipt_total_value"]
-    elif "total_values_dict" in data:
-        totals_dict = data["total_values_dict"]
-    else:
+    totals_dict = find_receipt_totals(data)
+    if totals_dict is None:
         return {
             "status": 0,
             "details": f"Could not find receipt totals in the provided data => {data}"
         }
 
-    try:
-        total_amount = float(totals_dict.get("total_amount", "-99999"))
-        net_amount = float(totals_dict.get("net_amount", "-99999"))
-    except Exception as e:
+    total_amount = to_decimal(totals_dict.get("total_amount", "-99999"))
+    net_amount = to_decimal(totals_dict.get("net_amount", "-99999"))
+    if total_amount is None or net_amount is None:
         return {
             "status": 0,
-            "details": f"Could not parse receipt totals: {e}"
+            "details": f"Could not parse receipt totals: {totals_dict}"
         }
 
-    # Check for match (allow for floating-point rounding)
-    if abs(final_total - total_amount) < 0.01:
+    # Exact decimal comparison (within one cent)
+    matched = match_receipt_total(final_total, totals_dict)
+    if matched == "total_amount":
         tool_context.actions.escalate = True
         return {
             "status": 1,
             "details": "Computed total matches the receipt total. Classification is valid. Exiting the refinement loop."
         }
-    elif abs(final_total - net_amount) < 0.01:
+    elif matched == "net_amount":
         tool_context.actions.escalate = True
         return {
             "status": 1,
             "details": "Computed total matches the net amount (excluding tax). Classification is valid. Exiting the refinement loop."
         }
     else:
+        # The refiner (and later validations) of this receipt run on the strong model
+        escalate(tool_context.state, "exit_function", "totals mismatch")
         return {
             "status": 0,
             "details": f"Computed total is {final_total}, but expected {total_amount} or {net_amount}. Please check the following categories and their prices for inconsistencies."
@@ -0,0 +1,44 @@
+# classification_reviewer/totals.py
+"""
+Exact (Decimal) reconciliation of grouped category totals against the receipt totals.
+Shared by the exit_function tool and the refinement loop short-circuit.
+"""
+from decimal import Decimal
+from ..classification_grouper.grouping import to_decimal
+
+TOLERANCE = Decimal('0.01')
+
+def grouped_total(grouped):
+    """Sum of total_price over the grouped categories; None if any total is missing/invalid."""
+    total = Decimal('0')
+    for category in grouped or []:
+        price = to_decimal(category.get('total_price')) if isinstance(category, dict) else None
+        if price is None:
+            return None
+        total += price
+    return total
+
+def find_receipt_totals(data):
+    """Locate the totals dict in a classification payload (the keys vary by producer)."""
+    if not isinstance(data, dict):
+        return None
+    if "stage_init_classifier" in data:
+        return data["stage_init_classifier"].get("total_values_dict", {})
+    for key in ("receipt_total_value", "total_values_dict"):
+        if key in data:
+            return data[key]
+    return None
+
+def match_receipt_total(final_total, totals, tolerance=TOLERANCE):
+    """
+    Compare a computed total with the receipt's total_amount and net_amount.
+    Returns 'total_amount', 'net_amount' or None.
+    """
+    final_total = to_decimal(final_total)
+    if final_total is None or not totals:
+        return None
+    for key in ("total_amount", "net_amount"):
+        expected = to_decimal(totals.get(key))
+        if expected is not None and abs(final_total - expected) < tolerance:
+            return key
+    return None
@@ -1 +1 @@
-from .agent import initial_classifier
\ No newline at end of file
+from .agent import initial_classifier, category_classifier, classifier_router
\ No newline at end of file
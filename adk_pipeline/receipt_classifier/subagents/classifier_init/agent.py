@@ -5,9 +5,16 @@ This agent generates the initial Classification before grouping.
 """
 
 # classifier_init/agent.py
+import json
+from google.adk.agents import ParallelAgent
 from google.adk.agents.llm_agent import LlmAgent
 from typing import List, Dict, Any
 from pydantic import BaseModel, Field
+from ...config import INCLUDE_CONTENTS, CLASSIFY_CHUNK_WORKERS, agent_model
+from ...tiering import model_callbacks
+from .assemble import CATEGORIES
+from .callbacks import skip_without_chunk
+from .router import ClassifierRouter
 
 ### INPUT SCHEMA DEFINITION ###
 class ReceiptTotalValue(BaseModel):
@@ -40,13 +47,11 @@ class ReceiptClassificationBreakdown(BaseModel):
 class ReceiptClassificationOutput(BaseModel):
     classified: List[ReceiptClassificationBreakdown] = Field(..., description="List of classified receipt items.") # List[Dict[str, Any]] = Field(..., description="List of classified receipt items.")
     total_values_dict: ReceiptTotalValue = Field(..., description="Total, net, and tax values from the receipt, as a dictionary. Raw, may have any keys.") # Dict[str, Any] = Field(..., description="Total, net, and tax values from the receipt, as a dictionary. Raw, may have any keys.")
-# Constants
-GEMINI_MODEL = "gemini-2.0-flash" # "gemini-2.5-flash"
 
 # Define the Initial Classifier Agent
 initial_classifier = LlmAgent(
     name="InitialClassifier",
-    model=GEMINI_MODEL,
+    model=agent_model("initial_classifier"),
     instruction="""
     You are a Receipt Classifier.
     You are a receipt classification agent.
@@ -96,7 +101,104 @@ initial_classifier = LlmAgent(
     }
     """,
     description="Generates the initial Classification JSON to start the refinement process",
+    include_contents=INCLUDE_CONTENTS, # first agent: the user's request is its current turn either way
     input_schema=ReceiptClassificationInput,
     output_schema=ReceiptClassificationOutput,
     output_key="stage_init_classification", 
+    **model_callbacks(ReceiptClassificationOutput), # fast tier first, retried on the strong model if the output is invalid
+)
+
+### CATEGORY-ONLY MODE (the API already parsed quantity and price) ###
+class ItemCategoryOutput(BaseModel):
+    categories: List[str] = Field(..., description="One category per item name, in the same order as the items.")
+
+def make_category_classifier(name):
+    """A category-only classifier (an agent instance can only have one parent, so each user gets its own)."""
+    return LlmAgent(
+        name=name,
+        model=agent_model("category_classifier"),
+        instruction="""
+        You are a Receipt Item Categorizer.
+
+        Task:
+        Assign each receipt item name below to ONE of these categories ONLY:
+        """ + json.dumps(CATEGORIES) + """
+
+        - Use only the item name and context to decide the best category.
+        - If an item doesn't clearly fit a category, assign it to "Others".
+        - Quantities and prices are already known: do not output them, do not explain.
+
+        Output:
+        {"categories": [...]} with exactly one category per item, in the same order as the items.
+
+        Example:
+        Items: ["Apple", "Fren Onion Soup", "Bread"]
+        Output: {"categories": ["Groceries", "Fast Food", "Groceries"]}
+
+        Items:
+        {item_names}
+        """,
+        description="Assigns a category to each pre-parsed item name (category-only mode)",
+        include_contents="none", # sees only the item names rendered above
+        output_schema=ItemCategoryOutput,
+        output_key="item_categories",
+        **model_callbacks(ItemCategoryOutput),
+    )
+
+category_classifier = make_category_classifier("CategoryClassifier")
+
+### CHUNKED MODE (long raw receipts, see chunking.py) ###
+class ChunkClassificationOutput(BaseModel):
+    classified: List[ReceiptClassificationBreakdown] = Field(..., description="One classified entry per line item of the chunk, in order.")
+
+def make_chunk_classifier(index):
+    """Chunk worker `index`: classifies the lines in state['chunk_line_items_<index>']."""
+    return LlmAgent(
+        name=f"ChunkClassifier_{index}",
+        model=agent_model("chunk_classifier"),
+        instruction="""
+        You are a Receipt Chunk Classifier.
+
+        Task:
+        The line items below (each with quantity, item name, and price at the end) are one part of a longer receipt.
+        Assign each line item to ONE of these categories ONLY:
+        """ + json.dumps(CATEGORIES) + """
+
+        - Use only the item name and context to decide the best category.
+        - If an item doesn't clearly fit a category, assign it to "Others".
+        - Do not group, sum, or explain—just classify.
+        - If a line_item doesn't have a quantity default it to "1"
+        - If a line_item doesn't have a price use "0" (the receipt totals are reconciled after all parts are merged)
+        - "item" is the item name only, without quantity and price (VERY IMPORTANT)
+        - Return exactly one entry per line item, in the same order.
+
+        Output:
+        {"classified": [{"item", "quantity", "price", "category"}, ...]}
+
+        Line items:
+        {chunk_line_items_""" + str(index) + """}
+        """,
+        description="Classifies one chunk of a long receipt's line items",
+        include_contents="none", # sees only its chunk, rendered above
+        output_schema=ChunkClassificationOutput,
+        output_key=f"chunk_classification_{index}",
+        before_agent_callback=skip_without_chunk(index), # no LLM call when the receipt needs fewer chunks
+        **model_callbacks(ChunkClassificationOutput),
+    )
+
+# The workers run concurrently; ClassifierRouter fills in their chunks and merges the results
+chunked_classifier = ParallelAgent(
+    name="ChunkedClassification",
+    sub_agents=[make_chunk_classifier(i) for i in range(max(1, CLASSIFY_CHUNK_WORKERS))],
+    description="Classifies the chunks of a long receipt concurrently",
+)
+
+# Category-only classification when the request carries parsed_items, chunked classification
+# for long raw receipts, full classification otherwise
+classifier_router = ClassifierRouter(
+    name="ClassifierRouter",
+    full_classifier=initial_classifier,
+    category_classifier=category_classifier,
+    chunked_classifier=chunked_classifier,
+    description="Routes to the category-only classifier for pre-parsed items, to concurrent chunk classifiers for long receipts, to InitialClassifier otherwise",
 )
@@ -0,0 +1,52 @@
+# classifier_init/assemble.py
+"""
+Category-only classification: the API parses quantity and price locally and sends
+`parsed_items`; the LLM returns one category per item name and the classification
+is assembled here, in the same shape InitialClassifier produces.
+
+Pure Python (no ADK imports) so it can be reused by agents, callbacks and benchmarks.
+"""
+import json
+import logging
+
+CATEGORIES = ["Groceries", "Fast Food", "Electronics", "Apparel", "Personal Care", "Others"]
+
+def load_request(content):
+    """The user's request JSON (first text part of a types.Content), {} when it isn't JSON."""
+    for part in (content.parts if content and content.parts else []):
+        if part.text:
+            try:
+                request = json.loads(part.text)
+            except json.JSONDecodeError:
+                return {}
+            return request if isinstance(request, dict) else {}
+    return {}
+
+def request_line_items(request):
+    """OCR line strings of the request; rebuilt from parsed_items when the API sent those instead."""
+    if request.get("line_items"):
+        return request["line_items"]
+    return [f"{item.get('quantity', '1')} {item.get('item', '')} {item.get('price', '')}" for item in request.get("parsed_items") or []]
+
+def assemble_classification(parsed_items, categories, totals):
+    """
+    Args:
+        parsed_items: [{"item", "quantity", "price"}, ...] parsed by the API.
+        categories: one category per item, in the same order (from the category classifier).
+        totals: receipt_total_value of the request.
+
+    Returns:
+        {"classified": [{"item", "quantity", "price", "category"}], "total_values_dict": totals}
+    """
+    if len(categories) != len(parsed_items):
+        logging.warning(f"Category classifier returned {len(categories)} categories for {len(parsed_items)} items; missing ones are Others")
+    classified = []
+    for i, item in enumerate(parsed_items):
+        category = categories[i] if i < len(categories) else "Others"
+        classified.append({
+            "item": item.get("item", ""),
+            "quantity": item.get("quantity", "1"),
+            "price": item.get("price", "0"),
+            "category": category if category in CATEGORIES else "Others",
+        })
+    return {"classified": classified, "total_values_dict": totals or {}}
@@ -0,0 +1,15 @@
+# classifier_init/callbacks.py
+from typing import Optional
+from google.adk.agents.callback_context import CallbackContext
+from google.genai import types
+
+def skip_without_chunk(index):
+    """
+    before_agent_callback for chunk worker `index`: skips its LLM call when the router
+    gave it no lines (the receipt needs fewer chunks than there are workers).
+    """
+    def callback(callback_context: CallbackContext) -> Optional[types.Content]:
+        if callback_context.state.get(f"chunk_line_items_{index}"):
+            return None
+        return types.Content(role="model", parts=[types.Part(text=f"No chunk {index} for this receipt.")])
+    return callback
@@ -0,0 +1,81 @@
+# classifier_init/chunking.py
+"""
+Chunked classification of long receipts: the raw line items are split into a few
+balanced chunks, classified concurrently (one LLM call each, see agent.py) and
+merged back in order before grouping.
+
+The chunk count adapts to the receipt: ceil(items / CLASSIFY_CHUNK_ITEMS) chunks,
+at most CLASSIFY_CHUNK_WORKERS, with the items spread evenly over them, so an 85
+line receipt becomes 4 chunks of 21-22 lines rather than 3 full chunks and a
+stub. Receipts up to CLASSIFY_CHUNK_THRESHOLD lines are not split.
+
+Pure Python (no ADK imports) so it can be reused by agents and benchmarks.
+"""
+import json
+import logging
+import math
+from ..classification_refiner.reconcile import parse_line
+from ...config import CLASSIFY_CHUNK_THRESHOLD, CLASSIFY_CHUNK_ITEMS, CLASSIFY_CHUNK_WORKERS
+
+def chunk_count(item_count, threshold=CLASSIFY_CHUNK_THRESHOLD, target=CLASSIFY_CHUNK_ITEMS, workers=CLASSIFY_CHUNK_WORKERS):
+    """Number of chunks for a receipt with item_count lines (1 = classify it whole)."""
+    if item_count <= threshold or workers < 2:
+        return 1
+    return max(1, min(workers, math.ceil(item_count / max(1, target))))
+
+def split_chunks(line_items, chunks):
+    """Split line_items into `chunks` contiguous lists whose sizes differ by at most one."""
+    size, extra = divmod(len(line_items), chunks)
+    split, start = [], 0
+    for i in range(chunks):
+        end = start + size + (1 if i < extra else 0)
+        split.append(line_items[start:end])
+        start = end
+    return split
+
+def chunk_state(chunks, workers=CLASSIFY_CHUNK_WORKERS):
+    """
+    State delta handing each chunk worker its lines (compact JSON) and clearing its
+    previous output; workers without a chunk get "" and skip their LLM call.
+    """
+    delta = {}
+    for i in range(workers):
+        delta[f"chunk_line_items_{i}"] = json.dumps(chunks[i], ensure_ascii=False) if i < len(chunks) else ""
+        delta[f"chunk_classification_{i}"] = None
+    return delta
+
+def chunk_classified(output):
+    """The classified list of a chunk worker's output, None when it is missing or malformed."""
+    classified = output.get("classified") if isinstance(output, dict) else None
+    if not isinstance(classified, list) or not all(isinstance(entry, dict) for entry in classified):
+        return None
+    return classified
+
+def _unclassified(line):
+    parsed = parse_line(line) or {"item": line, "quantity": "1", "price": None}
+    price = parsed["price"]
+    return {"item": parsed["item"], "quantity": parsed["quantity"], "price": f"{price:.2f}" if price is not None else "0", "category": "Others"}
+
+def merge_chunks(chunks, outputs, totals):
+    """
+    Merge the chunk classifications in chunk order.
+
+    Args:
+        chunks: the line items of each chunk.
+        outputs: the classified list of each chunk (None for a chunk that failed).
+        totals: receipt_total_value of the request.
+
+    Returns:
+        {"classified": [...], "total_values_dict": totals}, the InitialClassifier shape.
+        Lines of a failed chunk are parsed locally and kept as "Others", so the
+        category totals still add up to the receipt.
+    """
+    classified = []
+    for lines, output in zip(chunks, outputs):
+        if output is None:
+            logging.warning(f"Chunk of {len(lines)} lines has no classification; kept as Others")
+            output = [_unclassified(line) for line in lines]
+        elif len(output) != len(lines):
+            logging.warning(f"Chunk classifier returned {len(output)} items for {len(lines)} lines")
+        classified.extend(output)
+    return {"classified": classified, "total_values_dict": totals or {}}
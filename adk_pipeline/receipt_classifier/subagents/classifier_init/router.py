@@ -0,0 +1,106 @@
+# classifier_init/router.py
+import json
+import logging
+from typing import AsyncGenerator
+from google.adk.agents import BaseAgent
+from google.adk.agents.llm_agent import LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+from .assemble import assemble_classification, load_request
+from .chunking import chunk_count, split_chunks, chunk_state, chunk_classified, merge_chunks
+from ..classification_grouper.grouping import load_classification
+
+class ClassifierRouter(BaseAgent):
+    """
+    Runs the category-only classifier when the request carries `parsed_items` (quantity and
+    price already parsed by the API), the concurrent chunk classifiers for raw receipts
+    longer than CLASSIFY_CHUNK_THRESHOLD lines, the full InitialClassifier otherwise.
+    Either way `stage_init_classification` is set for the rest of the pipeline.
+    """
+    full_classifier: LlmAgent
+    category_classifier: LlmAgent
+    chunked_classifier: BaseAgent
+    output_key: str = "stage_init_classification"
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def __init__(self, name: str, full_classifier: LlmAgent, category_classifier: LlmAgent, chunked_classifier: BaseAgent, **kwargs):
+        super().__init__(
+            name=name,
+            full_classifier=full_classifier,
+            category_classifier=category_classifier,
+            chunked_classifier=chunked_classifier,
+            sub_agents=[full_classifier, category_classifier, chunked_classifier],
+            **kwargs,
+        )
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        request = load_request(ctx.user_content)
+        parsed_items = request.get("parsed_items")
+        if not parsed_items:
+            line_items = request.get("line_items") or []
+            workers = self.chunked_classifier.sub_agents
+            chunks = chunk_count(len(line_items), workers=len(workers))
+            if chunks > 1:
+                async for event in self._run_chunked(ctx, request, split_chunks(line_items, chunks)):
+                    yield event
+                return
+            async for event in self.full_classifier.run_async(ctx):
+                yield event
+            return
+
+        # The category classifier only sees the item names (include_contents="none")
+        names = [item.get("item", "") for item in parsed_items]
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={"item_names": json.dumps(names, ensure_ascii=False)}),
+        )
+        async for event in self.category_classifier.run_async(ctx):
+            yield event
+        categories = load_classification(ctx.session.state.get(self.category_classifier.output_key)).get("categories", [])
+        classification = assemble_classification(parsed_items, categories, request.get("receipt_total_value"))
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(classification))]),
+            actions=EventActions(state_delta={self.output_key: classification}),
+        )
+
+    async def _run_chunked(self, ctx: InvocationContext, request, chunks) -> AsyncGenerator[Event, None]:
+        workers = self.chunked_classifier.sub_agents
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta=chunk_state(chunks, workers=len(workers))),
+        )
+        try:
+            async for event in self.chunked_classifier.run_async(ctx):
+                yield event
+        except Exception as e:
+            logging.exception(f"Chunked classification failed ({e}); retrying the chunks without a result")
+        outputs = []
+        for worker, lines in zip(workers, chunks):
+            output = chunk_classified(load_classification(ctx.session.state.get(worker.output_key)))
+            if output is None:
+                # Only this chunk is retried (once), not the whole receipt
+                logging.warning(f"{worker.name} returned no valid classification for {len(lines)} lines; retrying it")
+                try:
+                    async for event in worker.run_async(ctx):
+                        yield event
+                except Exception as e:
+                    logging.exception(f"{worker.name} failed again: {e}")
+                output = chunk_classified(load_classification(ctx.session.state.get(worker.output_key)))
+            outputs.append(output)
+        classification = merge_chunks(chunks, outputs, request.get("receipt_total_value"))
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(classification))]),
+            actions=EventActions(state_delta={self.output_key: classification}),
+        )
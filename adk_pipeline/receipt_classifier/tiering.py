@@ -0,0 +1,109 @@
+# receipt_classifier/tiering.py
+"""
+Model tiering: each receipt is served by the fast tier (every agent's own model,
+MODEL_FAST by default) until something goes wrong, then by MODEL_STRONG.
+
+Escalation triggers:
+  - exit_function reports that the grouped totals don't match the receipt
+    (classification_reviewer/tools.py), so the refiner and later validations run
+    on the strong model;
+  - an LLM output fails validation (its agent's output schema, or JSON for the
+    refiner): the call is retried once on the strong model and the receipt stays
+    there.
+
+The tier that served the receipt is kept in state['model_tier'] ('fast' or
+'strong') and each escalation in state['model_escalations']; the API reads both
+from the run events.
+"""
+import json
+import logging
+import weakref
+from typing import Optional
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from pydantic import ValidationError
+from .config import MODEL_STRONG, MODEL_TIERING
+from . import metrics
+
+TIER_STATE_KEY = "model_tier"
+ESCALATIONS_STATE_KEY = "model_escalations"
+
+# (invocation_id, agent_name) -> the LlmRequest in flight, for retries on the strong model.
+# Weak values: the flow holds the request until the call ends, so entries of calls that
+# raise, are cancelled or never reach after_model_callback go away with the request.
+_requests = weakref.WeakValueDictionary()
+
+def escalate(state, agent_name, reason):
+    """Move the receipt to the strong tier (no-op when tiering is off or it is already there)."""
+    if not MODEL_TIERING or state.get(TIER_STATE_KEY) == "strong":
+        return
+    state[TIER_STATE_KEY] = "strong"
+    state[ESCALATIONS_STATE_KEY] = (state.get(ESCALATIONS_STATE_KEY) or []) + [{"agent": agent_name, "reason": reason}]
+    metrics.increment("model_escalations")
+    logging.info(f"Escalating to {MODEL_STRONG} after {agent_name}: {reason}")
+
+def route_model(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    """before_model_callback: sends the request to MODEL_STRONG once the receipt was escalated."""
+    state = callback_context.state
+    if state.get(TIER_STATE_KEY) is None:
+        state[TIER_STATE_KEY] = "fast"
+    if MODEL_TIERING and state.get(TIER_STATE_KEY) == "strong":
+        llm_request.model = MODEL_STRONG
+    return None
+
+def _route_and_keep_request(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+    route_model(callback_context, llm_request)
+    _requests[(callback_context.invocation_id, callback_context.agent_name)] = llm_request
+    return None
+
+def _response_text(llm_response):
+    if llm_response.partial or not llm_response.content or not llm_response.content.parts:
+        return None
+    if any(part.function_call for part in llm_response.content.parts):
+        return None # tool call, not the final output
+    return "".join(part.text or "" for part in llm_response.content.parts)
+
+def _is_valid(text, schema):
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    try:
+        if schema is not None:
+            schema.model_validate_json(text)
+        else:
+            json.loads(text)
+    except (ValidationError, ValueError):
+        return False
+    return True
+
+def _escalate_invalid_output(schema):
+    async def callback(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        text = _response_text(llm_response)
+        if text is None or _is_valid(text, schema):
+            _requests.pop(key, None)
+            return None
+        llm_request = _requests.pop(key, None)
+        if not MODEL_TIERING or llm_request is None or llm_request.model == MODEL_STRONG:
+            return None # already the strong model: let the agent handle the output
+        escalate(callback_context.state, callback_context.agent_name, "invalid output")
+        llm_request.model = MODEL_STRONG
+        # The agent's own model client (Gemini) calls llm_request.model
+        llm = callback_context._invocation_context.agent.canonical_model
+        retried = None
+        async for response in llm.generate_content_async(llm_request):
+            retried = response
+        return retried
+    return callback
+
+def model_callbacks(schema=None, validate_output=True):
+    """
+    before/after_model_callback keyword arguments for an LlmAgent: route to the tier of the
+    receipt and, with validate_output, escalate and retry the call on MODEL_STRONG when the
+    final output doesn't validate against `schema` (a pydantic model; plain JSON when None).
+    """
+    if not validate_output:
+        return {"before_model_callback": route_model}
+    return {"before_model_callback": _route_and_keep_request, "after_model_callback": _escalate_invalid_output(schema)}
@@ -0,0 +1,25 @@
+"""
+The pure-Python pipeline modules (grouping, reconcile, chunking, batch, assemble, ...)
+are imported as rc.subagents.<agent>.<module> through bare parent packages, so
+receipt_classifier/__init__.py (and with it google-adk) is not executed. Tests that
+run the agents import receipt_classifier and skip without google-adk.
+"""
+import os
+import sys
+import types
+
+PIPELINE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(PIPELINE_DIR, 'receipt_classifier')
+sys.path.insert(0, PIPELINE_DIR) # tests that run the agents import receipt_classifier itself
+
+def _package(name, path):
+    if name not in sys.modules:
+        module = types.ModuleType(name)
+        module.__path__ = [path]
+        sys.modules[name] = module
+
+_package('rc', PACKAGE_DIR)
+_package('rc.subagents', os.path.join(PACKAGE_DIR, 'subagents'))
+for agent in os.listdir(os.path.join(PACKAGE_DIR, 'subagents')):
+    if os.path.isdir(os.path.join(PACKAGE_DIR, 'subagents', agent)) and not agent.startswith('__'):
+        _package(f'rc.subagents.{agent}', os.path.join(PACKAGE_DIR, 'subagents', agent))
@@ -0,0 +1,35 @@
+"""assemble: the category-only request and the classification assembled from its categories."""
+from types import SimpleNamespace
+from rc.subagents.classifier_init.assemble import load_request, request_line_items, assemble_classification
+
+def content(*texts):
+    return SimpleNamespace(parts=[SimpleNamespace(text=text) for text in texts])
+
+def test_load_request_reads_the_first_text_part():
+    assert load_request(content(None, '{"line_items": ["1 Tea 2.00"]}')) == {'line_items': ['1 Tea 2.00']}
+    assert load_request(content('not json')) == {}
+    assert load_request(content('[1, 2]')) == {}
+    assert load_request(None) == {}
+
+def test_line_items_are_rebuilt_from_parsed_items():
+    assert request_line_items({'line_items': ['1 Tea 2.00']}) == ['1 Tea 2.00']
+    parsed = [{'item': 'Bread', 'quantity': '2', 'price': '2.10'}, {'item': 'Milk', 'price': '1.99'}]
+    assert request_line_items({'parsed_items': parsed}) == ['2 Bread 2.10', '1 Milk 1.99']
+    assert request_line_items({}) == []
+
+def test_categories_are_assembled_in_order():
+    parsed = [{'item': 'Bread', 'quantity': '2', 'price': '2.10'}, {'item': 'Shampoo', 'quantity': '1', 'price': '4.00'}]
+    totals = {'total_amount': '6.10'}
+    assert assemble_classification(parsed, ['Groceries', 'Personal Care'], totals) == {
+        'classified': [
+            {'item': 'Bread', 'quantity': '2', 'price': '2.10', 'category': 'Groceries'},
+            {'item': 'Shampoo', 'quantity': '1', 'price': '4.00', 'category': 'Personal Care'},
+        ],
+        'total_values_dict': totals,
+    }
+
+def test_missing_and_unknown_categories_are_others():
+    parsed = [{'item': 'Bread', 'price': '2.10'}, {'item': 'Widget', 'price': '1.00'}, {'item': 'Gift', 'price': '5.00'}]
+    result = assemble_classification(parsed, ['Groceries', 'Gadgets'], None)
+    assert [x['category'] for x in result['classified']] == ['Groceries', 'Others', 'Others']
+    assert result['classified'][0]['quantity'] == '1' and result['total_values_dict'] == {}
@@ -0,0 +1,51 @@
+"""batch: validating a batch request, splitting the LLM answers back per receipt and per-receipt reconciliation."""
+import json
+from rc.subagents.batch_classification.batch import (
+    batch_receipts, batch_item_names, split_categories, batch_line_items, split_classified, reconcile_receipt,
+)
+
+def parsed_receipt(receipt_id, *names):
+    return {'receipt_id': receipt_id, 'parsed_items': [{'item': name, 'quantity': '1', 'price': '1.00'} for name in names]}
+
+def test_receipts_without_a_unique_id_are_dropped():
+    request = {'receipts': [{'receipt_id': 'a'}, {'line_items': []}, {'receipt_id': 'a'}, 'junk', {'receipt_id': 'b'}]}
+    assert [r['receipt_id'] for r in batch_receipts(request)] == ['a', 'b']
+    assert batch_receipts({'line_items': ['1 Tea 2.00']}) == []
+    assert batch_receipts(None) == []
+
+def test_categories_are_split_back_by_item_counts():
+    receipts = [parsed_receipt('a', 'Tea', 'Cake'), parsed_receipt('b'), parsed_receipt('c', 'Soap')]
+    assert batch_item_names(receipts) == ['Tea', 'Cake', 'Soap']
+    assert split_categories(receipts, ['Groceries', 'Fast Food', 'Personal Care']) == \
+        [['Groceries', 'Fast Food'], [], ['Personal Care']]
+
+def test_a_miscounted_answer_is_not_split():
+    receipts = [parsed_receipt('a', 'Tea', 'Cake'), parsed_receipt('b', 'Soap')]
+    assert split_categories(receipts, ['Groceries', 'Fast Food']) is None
+    assert split_categories(receipts, None) is None
+
+def test_instruction_payload_keeps_only_the_non_empty_fields():
+    receipts = [{'receipt_id': 'a', 'line_items': ['1 Tea 2.00'], 'receipt_total_value': {'total_amount': '2.00'}, 'grouped': {}, 'extra': 1}]
+    rendered = batch_line_items(receipts)
+    assert json.loads(rendered) == [{'receipt_id': 'a', 'line_items': ['1 Tea 2.00'], 'receipt_total_value': {'total_amount': '2.00'}}]
+    assert ' ' not in rendered.replace('1 Tea 2.00', '')
+
+def test_classified_is_split_by_receipt_id():
+    output = {'receipts': [{'receipt_id': 'a', 'classified': [{'item': 'Tea'}]}, {'receipt_id': 'b'}, {'classified': []}, 'junk']}
+    assert split_classified(output) == {'a': [{'item': 'Tea'}], 'b': []}
+    assert split_classified('not a dict') == {}
+
+def classification(total, *items):
+    return {'classified': [{'item': name, 'quantity': '1', 'price': price, 'category': 'Groceries'} for name, price in items],
+            'total_values_dict': {'total_amount': total}}
+
+def test_matching_receipt_skips_the_refinement_loop():
+    result = reconcile_receipt(classification('3.00', ('Tea', '2.00'), ('Cake', '1.00')))
+    assert result == {'refinement_loop': 'skipped', 'grouped': [{'category': 'Groceries', 'items': ['Tea', 'Cake'], 'total_price': '3.00'}]}
+
+def test_explained_gap_is_reconciled_and_the_rest_is_residual():
+    result = reconcile_receipt(classification('3.50', ('Tea', '2.00')), ['1 Tea 2.00', '1 Cake 1.50'])
+    assert result['refinement_loop'] == 'reconciled' and result['reconciliation']['status'] == 'reconciled'
+    result = reconcile_receipt(classification('9.99', ('Tea', '2.00')), ['1 Tea 2.00'])
+    assert result['refinement_loop'] == 'residual' and result['grouped'] is None
+    assert result['reconciliation']['gap'] == '7.99'
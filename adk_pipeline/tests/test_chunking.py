@@ -0,0 +1,41 @@
+"""chunking: chunk count and sizes, the per-worker state and merging the chunk outputs back."""
+import json
+from rc.subagents.classifier_init.chunking import chunk_count, split_chunks, chunk_state, chunk_classified, merge_chunks
+
+def test_short_receipts_are_not_split():
+    assert chunk_count(30, threshold=40, target=25, workers=4) == 1
+    assert chunk_count(200, threshold=40, target=25, workers=1) == 1
+
+def test_chunk_count_is_capped_by_the_workers():
+    assert chunk_count(85, threshold=40, target=25, workers=4) == 4
+    assert chunk_count(60, threshold=40, target=25, workers=4) == 3
+    assert chunk_count(500, threshold=40, target=25, workers=4) == 4
+
+def test_chunks_are_balanced_and_keep_the_order():
+    lines = [f'line {i}' for i in range(85)]
+    chunks = split_chunks(lines, 4)
+    assert [len(chunk) for chunk in chunks] == [22, 21, 21, 21]
+    assert sum(chunks, []) == lines
+
+def test_workers_without_a_chunk_get_an_empty_input():
+    delta = chunk_state([['1 Tea 2.00'], ['1 Cake 3.00']], workers=3)
+    assert json.loads(delta['chunk_line_items_0']) == ['1 Tea 2.00']
+    assert delta['chunk_line_items_2'] == ''
+    assert all(delta[f'chunk_classification_{i}'] is None for i in range(3))
+
+def test_malformed_chunk_output_is_none():
+    assert chunk_classified({'classified': [{'item': 'Tea'}]}) == [{'item': 'Tea'}]
+    assert chunk_classified({'classified': ['Tea']}) is None
+    assert chunk_classified({}) is None
+    assert chunk_classified('```json') is None
+
+def test_failed_chunk_lines_are_kept_as_others():
+    chunks = [['1 Tea 2.00'], ['2 x Cake 3.00', 'Bag fee']]
+    first = [{'item': 'Tea', 'quantity': '1', 'price': '2.00', 'category': 'Fast Food'}]
+    merged = merge_chunks(chunks, [first, None], {'total_amount': '5.00'})
+    assert merged['classified'] == first + [
+        {'item': 'Cake', 'quantity': '2', 'price': '3.00', 'category': 'Others'},
+        {'item': 'Bag fee', 'quantity': '1', 'price': '0', 'category': 'Others'},
+    ]
+    assert merged['total_values_dict'] == {'total_amount': '5.00'}
+    assert merge_chunks([], [], None) == {'classified': [], 'total_values_dict': {}}
@@ -0,0 +1,83 @@
+"""
+Prompt size of the refinement loop's LLM calls in PIPELINE_CONTEXT_MODE=state: the real
+root_agent runs with a fake model on a receipt whose gap nothing can reconcile, so the
+loop runs every iteration, and the validator prompt must not grow with them.
+"""
+import asyncio
+import json
+import pytest
+
+pytest.importorskip("google.adk")
+
+CLASSIFIED = [
+    {'item': 'Coffee', 'quantity': '1', 'price': '3.50', 'category': 'Fast Food'},
+    {'item': 'Glass House Wine', 'quantity': '1', 'price': '9.95', 'category': 'Others'},
+    {'item': 'Jumbo Coctail Shrimp', 'quantity': '1', 'price': '12.95', 'category': 'Fast Food'},
+    {'item': 'Veal Zingaria', 'quantity': '1', 'price': '23.95', 'category': 'Fast Food'},
+]
+TOTALS = {'total_amount': '57.77', 'net_amount': '57.77', 'total_tax_amount': '0'} # 7.42 nobody can explain
+GROUPED = [
+    {'category': 'Fast Food', 'items': ['Coffee', 'Jumbo Coctail Shrimp', 'Veal Zingaria'], 'total_price': '40.40'},
+    {'category': 'Others', 'items': ['Glass House Wine'], 'total_price': '9.95'},
+]
+RESPONSES = { # instruction marker -> canned answer
+    'You are a Receipt Classifier.': json.dumps({'classified': CLASSIFIED, 'total_values_dict': TOTALS}),
+    'Validation Agent': json.dumps({'status': 0, 'details': 'Computed total is 50.35, but expected 57.77.'}),
+    'Refiner Agent': json.dumps(GROUPED),
+}
+ITERATIONS = 4
+
+@pytest.fixture
+def recorded_calls(monkeypatch):
+    """Runs the pipeline once with a recording fake model; returns [(marker, estimated prompt tokens)]."""
+    from google.adk.agents import LlmAgent
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+    from google.genai import types
+    from receipt_classifier import config
+    from receipt_classifier.agent import root_agent, refinement_loop
+    import receipt_classifier.subagents.classification_response.agent as response_module
+
+    if not config.STATE_CONTEXT:
+        pytest.skip("PIPELINE_CONTEXT_MODE is not 'state'")
+    calls = []
+    class RecordingLlm(BaseLlm):
+        model: str = 'fake'
+
+        async def generate_content_async(self, llm_request, stream=False):
+            instruction = str(llm_request.config.system_instruction or '')
+            marker = next(m for m in RESPONSES if m in instruction)
+            contents = json.dumps([c.model_dump(mode='json', exclude_none=True) for c in llm_request.contents])
+            calls.append((marker, (len(instruction) + len(contents)) // 4))
+            yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=RESPONSES[marker])]))
+
+    monkeypatch.setattr(response_module, 'save_summarised_data', lambda *args: None)
+    monkeypatch.setattr(refinement_loop, 'max_iterations', ITERATIONS)
+    pending = [root_agent]
+    while pending:
+        agent = pending.pop()
+        if isinstance(agent, LlmAgent):
+            monkeypatch.setattr(agent, 'model', RecordingLlm())
+        pending.extend(agent.sub_agents)
+
+    async def run():
+        service = InMemorySessionService()
+        runner = Runner(agent=root_agent, app_name='test', session_service=service)
+        session = await service.create_session(app_name='test', user_id='user')
+        prompt = json.dumps({'line_items': [f"1 {x['item']} {x['price']}" for x in CLASSIFIED], 'receipt_total_value': TOTALS})
+        message = types.Content(role='user', parts=[types.Part(text=prompt)])
+        async for _ in runner.run_async(user_id='user', session_id=session.id, new_message=message):
+            pass
+    asyncio.run(run())
+    return calls
+
+def test_validator_prompt_stays_flat_across_loop_iterations(recorded_calls):
+    validator = [tokens for marker, tokens in recorded_calls if marker == 'Validation Agent']
+    refiner = [tokens for marker, tokens in recorded_calls if marker == 'Refiner Agent']
+    assert len(validator) == ITERATIONS
+    assert len(refiner) == ITERATIONS
+    # Iteration 1 sees the grouped classification, later ones the refiner's output: same size every time
+    assert len(set(validator[1:])) == 1 and len(set(refiner[1:])) == 1
+    assert validator[-1] <= 1.2 * validator[0] and refiner[-1] <= 1.2 * refiner[0]
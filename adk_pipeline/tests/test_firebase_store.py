@@ -0,0 +1,41 @@
+"""The pipeline's save goes through the API's storage.py: same schema and spend rules, on a temporary SQLite database."""
+import sys
+import pytest
+from rc.subagents.classification_response import firebase_store
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    firebase_store._import_api_modules()
+    from storage import SQLiteStorage
+    store = SQLiteStorage(str(tmp_path / 'spendify.db'))
+    monkeypatch.setattr(firebase_store, '_store', store)
+    return store
+
+SUMMARY = [{'category': 'Groceries', 'items': ['Milk'], 'total_price': '2.50'},
+           {'category': 'Tax', 'items': [], 'total_price': '0.20'}]
+
+def test_summary_is_saved_on_the_session_date_with_spend_aggregates(store):
+    store.set_session('s1', {'timestamp': '2025-03-01T10:00:00', 'main_user': 'u1'})
+    firebase_store.save_summarised_data('2025-03-05', 's1', SUMMARY, '2025-03-05T09:00:00')
+    [(session_id, date_str, user_id, doc)] = store.iter_summaries('u1')
+    assert (session_id, date_str, user_id) == ('s1', '2025-03-01', 'u1')
+    assert doc == {'categories': SUMMARY, 'timestamp': '2025-03-05T09:00:00', 'final_total': 2.7}
+    assert store.get_spend_aggregates('u1')['categories'] == {'Groceries': 2.5} # no Tax, as in the API
+
+def test_resaving_replaces_the_contribution(store):
+    store.set_session('s1', {'timestamp': '2025-03-01T10:00:00', 'main_user': 'u1'})
+    firebase_store.save_summarised_data('2025-03-01', 's1', SUMMARY, 't')
+    firebase_store.save_summarised_data('2025-03-01', 's1', [{'category': 'Others', 'items': ['Bag'], 'total_price': '1.00'}], 't')
+    assert store.get_spend_aggregates('u1')['categories'] == {'Others': 1.0}
+
+def test_unknown_session_saves_the_summary_only(store):
+    firebase_store.save_summarised_data('2025-03-05', 's2', SUMMARY, 't')
+    assert store.get_spend_aggregates('u1') is None
+    assert store._one('SELECT date FROM summaries WHERE session_id = ?', ('s2',)) == ('2025-03-05',)
+
+def test_missing_api_modules_are_reported(monkeypatch, tmp_path):
+    monkeypatch.delitem(sys.modules, 'storage', raising=False)
+    monkeypatch.setattr(firebase_store, 'SPENDIFY_API_PATH', str(tmp_path))
+    monkeypatch.setattr(firebase_store, 'SHARED_PATH', str(tmp_path / 'shared'))
+    with pytest.raises(ImportError):
+        firebase_store._import_api_modules()
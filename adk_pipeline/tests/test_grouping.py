@@ -0,0 +1,57 @@
+"""group_classified_items against the grouping_classification outputs in evals/recorded_grouping.json."""
+import json
+import os
+from decimal import Decimal
+import pytest
+from rc.subagents.classification_grouper.grouping import group_classified_items, load_classification
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'evals', 'recorded_grouping.json')
+with open(FIXTURES) as f:
+    RECORDED = json.load(f)
+
+def exact_total(classified, category):
+    """Decimal sum of a category's line prices; prices that aren't numbers count as 0."""
+    total = Decimal('0')
+    for entry in classified:
+        if entry['category'] == category and entry.get('price') is not None:
+            total += Decimal(str(entry['price']).replace('$', '').replace(',', '.'))
+    return total
+
+def test_fixtures_cover_discounts_and_missing_prices():
+    classified = [entry for fixture in RECORDED for entry in fixture['stage_init_classification']['classified']]
+    assert len(RECORDED) > 1
+    assert any(Decimal(str(entry.get('price') or 0).replace('$', '').replace(',', '.')) < 0 for entry in classified)
+    assert any(entry.get('price') is None for entry in classified)
+
+@pytest.mark.parametrize('fixture', RECORDED, ids=[fixture['name'] for fixture in RECORDED])
+def test_matches_recorded_grouping(fixture):
+    classified = fixture['stage_init_classification']['classified']
+    expected = fixture['llm_grouped_classification']['grouped']
+    grouped = group_classified_items(classified)
+    assert [group['category'] for group in grouped] == [group['category'] for group in expected]
+    for group, llm_group in zip(grouped, expected):
+        assert group['items'] == llm_group['items']
+        # Totals are exact Decimal sums to the cent (the LLM's own arithmetic may be off)
+        assert Decimal(group['total_price']) == exact_total(classified, group['category'])
+        assert group['total_price'] == f"{Decimal(group['total_price']):.2f}"
+
+def test_recorded_llm_total_was_off_by_five_cents():
+    fixture = RECORDED[0]
+    grouped = {group['category']: group for group in group_classified_items(fixture['stage_init_classification']['classified'])}
+    assert grouped['Fast Food']['total_price'] == '77.30'
+    assert fixture['llm_grouped_classification']['grouped'][0]['total_price'] == '77.35'
+
+def test_missing_category_is_others_and_state_values_parse():
+    assert group_classified_items([{'item': 'Mystery', 'price': '1.00'}]) == \
+        [{'category': 'Others', 'items': ['Mystery'], 'total_price': '1.00'}]
+    assert load_classification('```json\n{"classified": []}\n```') == {'classified': []}
+    assert load_classification('not json') == {}
+
+def test_thousands_separators_are_not_dropped():
+    classified = [{'item': 'TV', 'price': '1,299.00', 'category': 'Electronics'},
+                  {'item': 'Cable', 'price': '$9.99', 'category': 'Electronics'},
+                  {'item': 'Milk', 'price': '2,50', 'category': 'Groceries'}]
+    assert group_classified_items(classified) == [
+        {'category': 'Electronics', 'items': ['TV', 'Cable'], 'total_price': '1308.99'},
+        {'category': 'Groceries', 'items': ['Milk'], 'total_price': '2.50'},
+    ]
@@ -0,0 +1,67 @@
+"""reconcile: each strategy on a receipt whose gap it explains, tax allocation and the residual case."""
+from decimal import Decimal
+from rc.subagents.classification_refiner.reconcile import reconcile, allocate, parse_line
+
+def item(name, price, category='Groceries', quantity='1'):
+    return {'item': name, 'quantity': quantity, 'price': price, 'category': category}
+
+def grouped_total(result):
+    return sum(Decimal(group['total_price']) for group in result['grouped'])
+
+def test_matching_totals_are_left_alone():
+    result = reconcile([item('Milk', '2.50'), item('Soap', '1.50', 'Household')], {'total_amount': '4.00'})
+    assert result['status'] == 'matched' and result['target'] == 'total_amount'
+    assert result['adjustments'] == [] and result['gap'] == '0.00'
+
+def test_lost_discount_sign_is_restored_and_spread():
+    classified = [item('Milk', '6.00'), item('Soap', '3.00', 'Household'), item('Coupon', '0.90', 'Others')]
+    result = reconcile(classified, {'total_amount': '8.10'})
+    assert result['status'] == 'reconciled'
+    assert "'Coupon' is a discount" in result['adjustments'][0]
+    # The discount doesn't stay a negative category of its own: 2:1 over Groceries and Household
+    assert {g['category']: g['total_price'] for g in result['grouped']} == {'Groceries': '5.40', 'Household': '2.70'}
+    assert grouped_total(result) == Decimal('8.10')
+
+def test_unit_price_times_quantity():
+    result = reconcile([item('Bread', '1.05', quantity='2'), item('Milk', '2.00')], {'net_amount': '4.10'})
+    assert result['status'] == 'reconciled' and result['target'] == 'net_amount'
+    assert 'unit price x quantity' in result['adjustments'][0]
+    assert grouped_total(result) == Decimal('4.10')
+
+def test_duplicated_line_is_removed():
+    classified = [item('Eggs', '3.20'), item('Eggs', '3.20'), item('Milk', '2.00')]
+    result = reconcile(classified, {'total_amount': '5.20'}, ['1 Eggs 3.20', '1 Milk 2.00'])
+    assert result['status'] == 'reconciled' and 'duplicated' in result['adjustments'][0]
+    assert result['grouped'][0]['items'] == ['Eggs', 'Milk']
+
+def test_dropped_line_is_restored_as_others():
+    result = reconcile([item('Milk', '2.00')], {'total_amount': '3.50'}, ['1 Milk 2.00', '1 Batteries 1.50'])
+    assert result['status'] == 'reconciled'
+    assert {'category': 'Others', 'items': ['Batteries'], 'total_price': '1.50'} in result['grouped']
+
+def test_unitemised_tax_is_allocated_over_total_amount():
+    classified = [item('Milk', '7.50'), item('Soap', '2.50', 'Household')]
+    result = reconcile(classified, {'total_amount': '10.80', 'total_tax_amount': '0.80'})
+    assert result['status'] == 'reconciled' and result['target'] == 'total_amount'
+    assert {g['category']: g['total_price'] for g in result['grouped']} == {'Groceries': '8.10', 'Household': '2.70'}
+
+def test_unexplained_gap_is_residual():
+    result = reconcile([item('Milk', '2.00')], {'total_amount': '9.99'}, ['1 Milk 2.00'])
+    assert result['status'] == 'residual' and result['target'] is None
+    assert result['gap'] == '7.99'
+
+def test_allocate_keeps_the_exact_sum():
+    assert allocate([Decimal('1'), Decimal('1'), Decimal('1')], Decimal('1.00')) == [Decimal('0.34'), Decimal('0.33'), Decimal('0.33')]
+    assert sum(allocate([Decimal('3.33'), Decimal('6.67')], Decimal('-0.99'))) == Decimal('-0.99')
+    assert allocate([Decimal('0')], Decimal('1.00')) == [Decimal('0')]
+
+def test_parse_line():
+    assert parse_line('2 x Bread 1.05') == {'item': 'Bread', 'quantity': '2', 'price': Decimal('1.05')}
+    assert parse_line('Subtotal') is None
+
+def test_totals_and_lines_with_thousands_separators():
+    classified = [item('TV', '1,299.00', 'Electronics'), item('Cable', '9.99', 'Electronics')]
+    assert reconcile(classified, {'total_amount': '1,308.99'})['status'] == 'matched'
+    result = reconcile([item('Cable', '9.99', 'Electronics')], {'total_amount': '$1,308.99'}, ['1 TV 1,299.00', '1 Cable 9.99'])
+    assert result['status'] == 'reconciled' and "restored dropped line 'TV' (1299.00)" in result['adjustments'][0]
+    assert parse_line('TV 1,299.00')['price'] == Decimal('1299.00')
@@ -0,0 +1,60 @@
+"""tiering callbacks with a fake callback context: escalation on invalid output and the in-flight request registry."""
+import asyncio
+import gc
+import json
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("google.adk")
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from receipt_classifier import tiering
+from receipt_classifier.config import MODEL_STRONG
+
+if not tiering.MODEL_TIERING:
+    pytest.skip("MODEL_TIERING is off", allow_module_level=True)
+
+class FakeLlm:
+    def __init__(self):
+        self.models = []
+
+    async def generate_content_async(self, llm_request):
+        self.models.append(llm_request.model)
+        yield text_response('{"fixed": true}')
+
+def text_response(text):
+    return LlmResponse(content=types.Content(role='model', parts=[types.Part(text=text)]))
+
+def callback_context(invocation_id, llm=None):
+    agent = SimpleNamespace(canonical_model=llm)
+    return SimpleNamespace(invocation_id=invocation_id, agent_name='Refiner', state={},
+                           _invocation_context=SimpleNamespace(agent=agent))
+
+def model_call(context, output):
+    """before_model_callback, then after_model_callback on `output`, like one LLM call of the flow."""
+    callbacks = tiering.model_callbacks()
+    request = LlmRequest(model='fast-model')
+    callbacks['before_model_callback'](context, request)
+    return asyncio.run(callbacks['after_model_callback'](context, text_response(output)))
+
+def test_valid_output_stays_on_the_fast_tier():
+    context = callback_context('inv-valid')
+    assert model_call(context, json.dumps([{'category': 'Others'}])) is None
+    assert context.state == {tiering.TIER_STATE_KEY: 'fast'}
+
+def test_invalid_output_is_retried_on_the_strong_model():
+    llm = FakeLlm()
+    context = callback_context('inv-invalid', llm)
+    retried = model_call(context, 'not json')
+    assert retried.content.parts[0].text == '{"fixed": true}'
+    assert llm.models == [MODEL_STRONG]
+    assert context.state[tiering.TIER_STATE_KEY] == 'strong'
+    assert context.state[tiering.ESCALATIONS_STATE_KEY] == [{'agent': 'Refiner', 'reason': 'invalid output'}]
+
+def test_requests_of_calls_that_never_complete_are_not_kept():
+    for i in range(50):
+        # before_model_callback only: the model call raised or was cancelled
+        tiering.model_callbacks()['before_model_callback'](callback_context(f'inv-failed-{i}'), LlmRequest(model='fast-model'))
+    gc.collect()
+    assert not any(key[0].startswith('inv-failed-') for key in tiering._requests.keys())
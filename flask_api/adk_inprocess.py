@@ -0,0 +1,147 @@
+"""
+In-process execution of the ADK receipt pipeline (CLASSIFICATION_URL=inprocess).
+
+Instead of POSTing to a separate `adk api_server` and parsing its SSE stream, the
+API imports receipt_classifier.root_agent and runs it with an ADK Runner and an
+InMemorySessionService on a background event loop. Events are converted to the
+same camelCase dicts the SSE endpoint sends, so everything reading them
+(extract_saved_categories, state_values, progress reporting) is unchanged.
+
+The pipeline saves to the same storage as the API: its firebase_store reuses the
+API's firebase_admin app, or writes to the same SQLITE_PATH with STORAGE_BACKEND=sqlite.
+"""
+import asyncio, logging, os, queue, sys, threading
+from dotenv import load_dotenv
+from gcp_adk_classification import (
+    ADK_READ_TIMEOUT, ADK_TERMINAL_AUTHORS, ADK_TERMINAL_STATE_KEYS, follow_events
+)
+
+load_dotenv()
+
+ADK_PIPELINE_PATH = os.getenv('ADK_PIPELINE_PATH', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'adk_pipeline'))
+
+_DONE = object()
+
+def is_inprocess(classification_url):
+    return (classification_url or '').strip().lower() == 'inprocess'
+
+def load_root_agent(pipeline_path=ADK_PIPELINE_PATH):
+    """Import receipt_classifier.root_agent from the adk_pipeline directory (and its .env, without overriding ours)."""
+    pipeline_path = os.path.abspath(pipeline_path)
+    if pipeline_path not in sys.path:
+        sys.path.insert(0, pipeline_path)
+    load_dotenv(os.path.join(pipeline_path, 'receipt_classifier', '.env'), override=False)
+    from receipt_classifier.agent import root_agent
+    return root_agent
+
+def to_event_dict(event):
+    """ADK Event -> the dict run_sse would have sent for it."""
+    return event.model_dump(mode='json', by_alias=True, exclude_none=True)
+
+class InProcessPipeline:
+    """
+    One Runner + InMemorySessionService per process, driven by a dedicated event loop thread
+    so the API's worker threads can run it synchronously. Rebuilt after a fork.
+    """
+    def __init__(self, app_name, agent=None):
+        self.app_name = app_name
+        self.agent = agent
+        self.runner = None
+        self.session_service = None
+        self._loop = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return
+            from google.adk.runners import Runner
+            from google.adk.sessions import InMemorySessionService
+            self.agent = self.agent or load_root_agent()
+            self.session_service = InMemorySessionService()
+            self.runner = Runner(agent=self.agent, app_name=self.app_name, session_service=self.session_service)
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name='adk-inprocess', daemon=True).start()
+            self._pid = os.getpid()
+            logging.info(f"In-process ADK pipeline started for app {self.app_name} ({type(self.agent).__name__} {self.agent.name})")
+
+    def submit(self, coro):
+        """Schedule a coroutine on the pipeline loop; returns a concurrent.futures.Future."""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def get_or_create_session(self, user_id, session_id=None):
+        session = None
+        if session_id:
+            session = await self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+        return session or await self.session_service.create_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+
+    async def run(self, user_id, session_id, prompt_text, out):
+        """Run the pipeline to completion, putting event dicts (then _DONE, or the exception) on out."""
+        from google.genai import types
+        message = types.Content(role='user', parts=[types.Part(text=prompt_text)])
+        try:
+            async for event in self.runner.run_async(user_id=user_id, session_id=session_id, new_message=message):
+                out.put(to_event_dict(event))
+            out.put(_DONE)
+        except Exception as e:
+            logging.exception(f"In-process ADK run failed for session {session_id}: {e}")
+            out.put(e)
+        finally:
+            # The session only lives for one upload; don't let the in-memory store grow
+            await self.session_service.delete_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+
+class InProcessADKClient:
+    """
+    Same interface as ADKClient (get_or_create_session, iter_sse, run_sse) on an InProcessPipeline.
+    When iter_sse stops at a terminal event the rest of the run (e.g. the optional summary agent)
+    finishes in the background.
+    """
+    def __init__(self, pipeline, user_id="user", session_id=None, timeout=ADK_READ_TIMEOUT):
+        self.pipeline = pipeline
+        self.app_name = pipeline.app_name
+        self.user_id = user_id
+        self.session_id = session_id
+        self.timeout = timeout
+
+    def get_or_create_session(self, method="POST", payload={}, custom_session=False):
+        session_id = self.session_id if custom_session else None
+        try:
+            session = self.pipeline.submit(self.pipeline.get_or_create_session(self.user_id, session_id)).result(self.timeout)
+            return session.model_dump(mode='json', by_alias=True, exclude_none=True)
+        except Exception as e:
+            logging.error(f"Error creating in-process session {session_id}: {e}")
+            return None
+
+    def _events(self, out, session_id):
+        while True:
+            try:
+                item = out.get(timeout=self.timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No event from the in-process pipeline for {self.timeout}s (session {session_id})")
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def iter_sse(self, session_id, prompt_text, streaming=False, terminal_authors=ADK_TERMINAL_AUTHORS,
+                 terminal_state_keys=ADK_TERMINAL_STATE_KEYS, on_progress=None):
+        """
+        Runs the pipeline in-process and yields event dicts as they are produced, stopping after
+        the first terminal event (see gcp_adk_classification.is_terminal_event).
+        Raises the pipeline's exception if the run fails.
+        """
+        logging.info(f"In-process run for session {session_id} ({len(prompt_text)} prompt chars)")
+        out = queue.Queue()
+        self.pipeline.submit(self.pipeline.run(self.user_id, session_id, prompt_text, out))
+        yield from follow_events(self._events(out, session_id), terminal_authors, terminal_state_keys, on_progress)
+
+    def run_sse(self, session_id, prompt_text, streaming=False):
+        """Runs the pipeline to completion; returns the list of event dicts, or None on failure."""
+        try:
+            return list(self.iter_sse(session_id, prompt_text, streaming, terminal_authors=(), terminal_state_keys=()))
+        except Exception as e:
+            logging.error(f"Error in in-process run: {e}")
+            return None
@@ -0,0 +1,116 @@
+"""
+Per-agent latency and token metrics harvested from ADK run events.
+
+Every event carries its author, a timestamp and (for model responses) usageMetadata.
+summarize_events() turns one run's events into a compact per-agent summary, stored on
+SESSIONS/{session_id}.agent_metrics; AgentMetrics keeps recent summaries in memory and
+reports p50/p95 per agent for /metrics, so it's visible which sub-agent dominates.
+"""
+import threading
+from collections import deque
+
+LOOP_AGENT = 'validate_classification' # first agent of the refinement loop: one run per iteration
+
+def _empty():
+    return {'runs': 0, 'events': 0, 'llm_calls': 0, 'tool_calls': 0,
+            'prompt_tokens': 0, 'output_tokens': 0, 'total_tokens': 0, 'seconds': 0.0}
+
+def summarize_events(events, started=None):
+    """
+    Summarise one run's events (dicts as sent by run_sse).
+
+    Latency is attributed per event: the time between the previous event (or `started`,
+    an epoch timestamp taken before the run) and this one is spent by this event's author.
+    A run is a consecutive block of events from the same author.
+
+    Returns:
+        {"agents": {author: {runs, events, llm_calls, tool_calls, prompt_tokens,
+                             output_tokens, total_tokens, seconds}},
+         "total": {... same fields summed ...}, "loop_iterations": int}
+    """
+    agents = {}
+    previous_author = None
+    previous_time = started
+    for event in events or []:
+        author = event.get('author') or 'unknown'
+        stats = agents.setdefault(author, _empty())
+        stats['events'] += 1
+        if author != previous_author:
+            stats['runs'] += 1
+            previous_author = author
+        timestamp = event.get('timestamp')
+        if timestamp is not None:
+            if previous_time is not None:
+                stats['seconds'] += max(0.0, timestamp - previous_time)
+            previous_time = timestamp
+        usage = event.get('usageMetadata')
+        if usage:
+            stats['llm_calls'] += 1
+            stats['prompt_tokens'] += usage.get('promptTokenCount') or 0
+            stats['output_tokens'] += usage.get('candidatesTokenCount') or 0
+            stats['total_tokens'] += usage.get('totalTokenCount') or 0
+        for part in (event.get('content') or {}).get('parts') or []:
+            if 'functionCall' in part:
+                stats['tool_calls'] += 1
+    total = _empty()
+    for stats in agents.values():
+        stats['seconds'] = round(stats['seconds'], 3)
+        for key, value in stats.items():
+            total[key] += value
+    total['seconds'] = round(total['seconds'], 3)
+    return {
+        'agents': agents,
+        'total': total,
+        'loop_iterations': agents.get(LOOP_AGENT, {}).get('runs', 0),
+    }
+
+def percentile(values, share):
+    """Nearest-rank percentile of a list of numbers (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(share * len(ordered))) - 1))]
+
+class AgentMetrics:
+    """Rolling window of run summaries with per-agent p50/p95 latency and tokens."""
+    def __init__(self, window=500):
+        self._runs = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, summary):
+        with self._lock:
+            self._runs.append(summary)
+
+    def stats(self):
+        with self._lock:
+            runs = list(self._runs)
+        per_agent = {}
+        for summary in runs:
+            for author, stats in summary['agents'].items():
+                samples = per_agent.setdefault(author, {'seconds': [], 'total_tokens': [], 'llm_calls': 0, 'tool_calls': 0})
+                samples['seconds'].append(stats['seconds'])
+                samples['total_tokens'].append(stats['total_tokens'])
+                samples['llm_calls'] += stats['llm_calls']
+                samples['tool_calls'] += stats['tool_calls']
+        total_seconds = sum(summary['total']['seconds'] for summary in runs) or 1
+        total_tokens = sum(summary['total']['total_tokens'] for summary in runs) or 1
+        agents = {}
+        for author, samples in per_agent.items():
+            agents[author] = {
+                'sessions': len(samples['seconds']),
+                'seconds_p50': percentile(samples['seconds'], 0.5),
+                'seconds_p95': percentile(samples['seconds'], 0.95),
+                'tokens_p50': percentile(samples['total_tokens'], 0.5),
+                'tokens_p95': percentile(samples['total_tokens'], 0.95),
+                'llm_calls': samples['llm_calls'],
+                'tool_calls': samples['tool_calls'],
+                'latency_share': round(sum(samples['seconds']) / total_seconds, 3),
+                'token_share': round(sum(samples['total_tokens']) / total_tokens, 3),
+            }
+        iterations = [summary['loop_iterations'] for summary in runs]
+        return {
+            'runs': len(runs),
+            'loop_iterations_p50': percentile(iterations, 0.5),
+            'loop_iterations_p95': percentile(iterations, 0.95),
+            'agents': agents,
+        }
@@ -0,0 +1,107 @@
+"""
+Micro-batching of ADK classification runs.
+
+With CLASSIFY_BATCH_SIZE > 1, classify stages running at the same time hand their
+prompt to a ClassificationBatcher instead of starting one ADK run each. Up to
+CLASSIFY_BATCH_SIZE receipts, or whatever arrived within CLASSIFY_BATCH_WINDOW_MS,
+are sent as one {"receipts": [...]} request; the pipeline's BatchClassificationAgent
+classifies them in one LLM call, reconciles and saves each receipt and returns
+`batch_results` ({receipt_id: result}).
+
+A receipt that ends up alone in its window, or whose totals did not reconcile in
+the batch (no firebase_save_result), gets None back and is classified by the
+single-receipt pipeline, refinement loop included.
+"""
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CLASSIFY_BATCH_SIZE = int(os.getenv('CLASSIFY_BATCH_SIZE', 1)) # 1 = batching off
+CLASSIFY_BATCH_WINDOW_MS = int(os.getenv('CLASSIFY_BATCH_WINDOW_MS', 300))
+BATCH_RESULTS_KEY = 'batch_results'
+
+def build_batch_prompt(receipts):
+    """[(receipt_id, prompt_text)] -> the batch request text (each prompt is a prompt_builder JSON object)."""
+    return json.dumps({'receipts': [{'receipt_id': receipt_id, **json.loads(prompt_text)} for receipt_id, prompt_text in receipts]},
+                      separators=(',', ':'), ensure_ascii=False)
+
+def split_batch_results(events):
+    """{receipt_id: result} from the last `batch_results` state delta of a batch run ({} when there is none)."""
+    for event in reversed(events or []):
+        results = ((event.get('actions') or {}).get('stateDelta') or {}).get(BATCH_RESULTS_KEY)
+        if isinstance(results, dict):
+            return results
+    return {}
+
+def saved_categories(result):
+    """The categories the batch saved for one receipt, None when the save failed."""
+    saved = (result or {}).get('firebase_save_result') or {}
+    data = saved.get('data') if saved.get('result') == 'success' else None
+    return data if isinstance(data, list) else None
+
+class ClassificationBatcher:
+    def __init__(self, run_batch, max_size=CLASSIFY_BATCH_SIZE, window=CLASSIFY_BATCH_WINDOW_MS / 1000):
+        """
+        run_batch: fn([(receipt_id, prompt_text)]) -> {receipt_id: result}, one ADK run.
+        max_size: receipts per batch; a full batch is sent at once.
+        window: seconds the first receipt of a batch waits for others.
+        """
+        self.run_batch = run_batch
+        self.max_size = max(1, max_size)
+        self.window = window
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stats = {'batches': 0, 'batched_receipts': 0, 'alone': 0, 'failed_batches': 0}
+
+    def _take(self):
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        return batch
+
+    def _run(self, batch):
+        if len(batch) == 1:
+            with self._lock:
+                self._stats['alone'] += 1
+            batch[0][2].set_result(None) # nothing to batch with: the caller runs the single pipeline
+            return
+        try:
+            results = self.run_batch([(receipt_id, prompt_text) for receipt_id, prompt_text, _ in batch])
+        except Exception as e:
+            logging.exception(f"Batch classification of {len(batch)} receipts failed: {e}")
+            results = {}
+            with self._lock:
+                self._stats['failed_batches'] += 1
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['batched_receipts'] += len(batch)
+        for receipt_id, _, future in batch:
+            future.set_result(results.get(receipt_id))
+
+    def classify(self, receipt_id, prompt_text):
+        """
+        Classify one receipt as part of a batch. Blocks until its batch ran.
+        Returns the receipt's batch result, or None when it has to be classified on its own.
+        """
+        future = Future()
+        with self._lock:
+            self._pending.append((receipt_id, prompt_text, future))
+            batch = self._take() if len(self._pending) >= self.max_size else None
+        if batch is None:
+            try:
+                return future.result(timeout=self.window)
+            except FutureTimeout:
+                pass
+            # Window over: send whatever is pending, unless another caller already took this receipt
+            with self._lock:
+                batch = self._take() if any(entry[2] is future for entry in self._pending) else None
+        if batch:
+            self._run(batch)
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'pending': len(self._pending), 'max_size': self.max_size, 'window_ms': int(self.window * 1000)}
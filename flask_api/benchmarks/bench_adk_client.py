@@ -0,0 +1,98 @@
+"""
+Connection reuse benchmark for the ADK client against a local fake ADK server.
+
+The fake server answers session creation and streams a canned /run_sse response
+over HTTP/1.1 keep-alive, counting the TCP connections it accepts. Compares:
+  per-call : module-level requests.post/get, a new connection per request (previous behaviour)
+  pooled   : ADKClient on the shared keep-alive session
+  async    : AsyncADKClient on one aiohttp session (skipped without aiohttp)
+
+    python benchmarks/bench_adk_client.py --runs 200 --latency-ms 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from gcp_adk_classification import ADKClient, AsyncADKClient, get_http_session
+
+SSE_EVENTS = [
+    {'author': 'InitialClassifier', 'actions': {'stateDelta': {'stage_init_classification': {'classified': []}}}},
+    {'author': 'grouping_classification', 'actions': {'stateDelta': {'grouped_classification': {'grouped': []}}}},
+    {'author': 'response_agent', 'actions': {'stateDelta': {'firebase_save_result': 'ok'}}},
+]
+
+class FakeADKHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1' # keep-alive
+    connections = 0
+    latency = 0.0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1 # one handler instance per accepted connection
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.latency)
+        if self.path == '/run_sse':
+            body = ''.join(f'data: {json.dumps(event)}\n\n' for event in SSE_EVENTS).encode()
+            content_type = 'text/event-stream'
+        else:
+            body = json.dumps({'id': self.path.rsplit('/', 1)[-1]}).encode()
+            content_type = 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def run_sync(url, runs, http_session):
+    for i in range(runs):
+        adk = ADKClient(url, 'receipt-classifier', session_id=f'bench-{i}', http_session=http_session)
+        adk.get_or_create_session(method='POST', custom_session=True)
+        assert len(adk.run_sse(f'bench-{i}', '{}')) == len(SSE_EVENTS)
+
+async def run_async(url, runs):
+    async with AsyncADKClient(url, 'receipt-classifier') as shared:
+        for i in range(runs):
+            adk = AsyncADKClient(url, 'receipt-classifier', session_id=f'bench-{i}', http_session=shared._session())
+            await adk.get_or_create_session(method='POST', custom_session=True)
+            assert len(await adk.run_sse(f'bench-{i}', '{}')) == len(SSE_EVENTS)
+
+def measure(label, fn, runs):
+    FakeADKHandler.connections = 0
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:9}: {elapsed / runs * 1000:.2f} ms/receipt, {FakeADKHandler.connections} connections for {runs * 2} requests")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--latency-ms', type=float, default=0, help="Artificial server latency per request")
+    args = parser.parse_args()
+    FakeADKHandler.latency = args.latency_ms / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeADKHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    measure('per-call', lambda: run_sync(url, args.runs, requests), args.runs)
+    measure('pooled', lambda: run_sync(url, args.runs, get_http_session()), args.runs)
+    try:
+        import aiohttp # noqa: F401
+        measure('async', lambda: asyncio.run(run_async(url, args.runs)), args.runs)
+    except ImportError:
+        print("async    : skipped (aiohttp not installed)")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
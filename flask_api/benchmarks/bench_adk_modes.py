@@ -0,0 +1,151 @@
+"""
+HTTP + SSE vs in-process execution of the ADK receipt pipeline, with a fake model.
+
+Both modes run the real receipt_classifier.root_agent (needs google-adk and the
+pipeline's requirements) with every LlmAgent's model replaced by a fake BaseLlm
+that answers the initial classification after --model-ms. The receipt totals
+match, so grouping, reconciliation and the save are the deterministic agents.
+The Firestore save is replaced by a no-op and Firebase gets an anonymous app,
+so no credentials or network are needed.
+  http      : ADKClient against a local server that runs the same Runner and
+              streams the events as SSE, like `adk api_server`
+  inprocess : InProcessADKClient (CLASSIFICATION_URL=inprocess)
+
+    python benchmarks/bench_adk_modes.py --runs 100 --model-ms 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import firebase_admin
+import google.auth.credentials
+from firebase_admin import credentials
+from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+from adk_inprocess import InProcessPipeline, InProcessADKClient, load_root_agent, _DONE
+from gcp_adk_classification import ADKClient
+
+APP_NAME = 'receipt-classifier'
+CLASSIFIED = [
+    {'item': 'Coffee', 'quantity': '1', 'price': '3.50', 'category': 'Fast Food'},
+    {'item': 'Glass House Wine', 'quantity': '1', 'price': '9.95', 'category': 'Others'},
+    {'item': 'Jumbo Coctail Shrimp', 'quantity': '1', 'price': '12.95', 'category': 'Fast Food'},
+    {'item': 'Veal Zingaria', 'quantity': '1', 'price': '23.95', 'category': 'Fast Food'},
+]
+TOTALS = {'total_amount': '54.40', 'net_amount': '50.35', 'total_tax_amount': '4.05'}
+PROMPT = json.dumps({
+    'line_items': [f"{x['quantity']} {x['item']} {x['price']}" for x in CLASSIFIED],
+    'receipt_total_value': TOTALS,
+})
+
+class FakeLlm(BaseLlm):
+    model: str = 'fake-classifier'
+    latency: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        await asyncio.sleep(self.latency)
+        text = json.dumps({'classified': CLASSIFIED, 'total_values_dict': TOTALS})
+        yield LlmResponse(content=types.Content(role='model', parts=[types.Part(text=text)]))
+
+class AnonymousCredential(credentials.Base):
+    def get_credential(self):
+        return google.auth.credentials.AnonymousCredentials()
+
+def build_pipeline(model_seconds):
+    firebase_admin.initialize_app(AnonymousCredential(), {'projectId': 'bench'})
+    root_agent = load_root_agent()
+    sys.modules['receipt_classifier.subagents.classification_response.agent'].save_summarised_data = lambda *args: None
+    fake = FakeLlm(latency=model_seconds)
+    pending = [root_agent]
+    while pending:
+        agent = pending.pop()
+        if isinstance(agent, LlmAgent):
+            agent.model = fake
+        pending.extend(agent.sub_agents)
+    return InProcessPipeline(APP_NAME, agent=root_agent)
+
+def make_handler(pipeline):
+    class PipelineSSEHandler(BaseHTTPRequestHandler):
+        """Session + /run_sse endpoints of `adk api_server`, backed by the same pipeline."""
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path == '/run_sse':
+                out = queue.Queue()
+                prompt = body['newMessage']['parts'][0]['text']
+                pipeline.submit(pipeline.run(body['userId'], body['sessionId'], prompt, out))
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                try:
+                    while (item := out.get()) is not _DONE and not isinstance(item, Exception):
+                        self._chunk(f"data: {json.dumps(item)}\n\n".encode())
+                    self._chunk(b'')
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True # the client stopped reading at the terminal event
+                return
+            parts = self.path.split('/') # /apps/{app}/users/{user}/sessions[/{id}]
+            session_id = parts[6] if len(parts) > 6 else None
+            session = pipeline.submit(pipeline.get_or_create_session(parts[4], session_id)).result()
+            data = json.dumps(session.model_dump(mode='json', by_alias=True, exclude_none=True)).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+    return PipelineSSEHandler
+
+def run_mode(make_client, runs):
+    latencies = []
+    for i in range(runs):
+        client = make_client(f"bench-{time.time_ns()}-{i}")
+        start = time.perf_counter()
+        session = client.get_or_create_session(method="POST", custom_session=True)
+        events = list(client.iter_sse(session['id'], PROMPT))
+        latencies.append(time.perf_counter() - start)
+        assert any('firebase_save_result' in (e.get('actions') or {}).get('stateDelta', {}) for e in events), events
+    return latencies
+
+def report(name, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(f"{name:10}: mean {statistics.mean(latencies) * 1000:7.2f} ms  p50 {statistics.median(latencies) * 1000:7.2f} ms  p95 {p95 * 1000:7.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--model-ms', type=float, default=50, help="Fake model latency per call")
+    args = parser.parse_args()
+    pipeline = build_pipeline(args.model_ms / 1000)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(pipeline))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        run_mode(lambda sid: InProcessADKClient(pipeline, session_id=sid), 5) # warm-up (imports, first Runner call)
+        report('http', run_mode(lambda sid: ADKClient(url, APP_NAME, session_id=sid), args.runs))
+        report('inprocess', run_mode(lambda sid: InProcessADKClient(pipeline, session_id=sid), args.runs))
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
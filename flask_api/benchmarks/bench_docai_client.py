@@ -0,0 +1,96 @@
+"""
+Micro-benchmark: per-call Document AI client construction vs the pooled client manager.
+
+Runs a local gRPC stub of DocumentProcessorService (returns an empty document)
+so only client/channel setup and the RPC round trip are measured.
+
+    python benchmarks/bench_docai_client.py --requests 200 --concurrency 4
+
+Note: the stub is plaintext gRPC, so the TLS handshake saved against the real
+endpoint comes on top of the numbers reported here.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GOOGLE_APPLICATION_PATH', os.path.abspath(__file__)) # gcp_docai only checks the path exists
+os.environ.setdefault('DOCUMENT_AI_PROCESSOR_URL', 'https://localhost/v1/projects/bench/locations/us/processors/stub')
+
+import grpc
+from google.api_core.client_options import ClientOptions
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import documentai_v1 as documentai
+from google.cloud.documentai_v1.services.document_processor_service.transports import DocumentProcessorServiceGrpcTransport
+from gcp_docai import DocumentAIClientManager, get_processor_name
+
+SERVICE = 'google.cloud.documentai.v1.DocumentProcessorService'
+
+def start_stub_server():
+    def process_document(request, context):
+        return documentai.ProcessResponse(document=documentai.Document(text='stub'))
+    handler = grpc.method_handlers_generic_handler(SERVICE, {
+        'ProcessDocument': grpc.unary_unary_rpc_method_handler(
+            process_document,
+            request_deserializer=documentai.ProcessRequest.deserialize,
+            response_serializer=documentai.ProcessResponse.serialize,
+        )
+    })
+    server = grpc.server(ThreadPoolExecutor(max_workers=16))
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port('localhost:0')
+    server.start()
+    return server, f'localhost:{port}'
+
+def stub_client_factory(address):
+    def factory():
+        transport = DocumentProcessorServiceGrpcTransport(channel=grpc.insecure_channel(address), credentials=AnonymousCredentials())
+        return documentai.DocumentProcessorServiceClient(transport=transport, client_options=ClientOptions(api_endpoint=address))
+    return factory
+
+def run(get_client, n_requests, concurrency):
+    request = documentai.ProcessRequest(
+        name=get_processor_name(),
+        raw_document=documentai.RawDocument(content=b'\xff\xd8' + b'0' * 64_000, mime_type='image/jpeg'),
+    )
+    latencies = []
+    def one(_):
+        start = time.perf_counter()
+        get_client().process_document(request=request)
+        latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'wall_s': round(wall, 3),
+        'req_per_s': round(n_requests / wall, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=2)
+    args = parser.parse_args()
+
+    server, address = start_stub_server()
+    factory = stub_client_factory(address)
+    try:
+        per_call = run(factory, args.requests, args.concurrency)
+        manager = DocumentAIClientManager(pool_size=args.pool_size, client_factory=factory)
+        manager.warm_up()
+        pooled = run(manager.get_client, args.requests, args.concurrency)
+    finally:
+        server.stop(0)
+    print(f"per-call client : {per_call}")
+    print(f"pooled clients  : {pooled}")
+    print(f"setup saved per request: {round(per_call['p50_ms'] - pooled['p50_ms'], 2)} ms (p50)")
+
+if __name__ == '__main__':
+    main()
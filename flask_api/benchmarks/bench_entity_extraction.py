@@ -0,0 +1,80 @@
+"""
+CPU / allocation benchmark: full Document dict path vs lean entity extraction.
+
+Builds a synthetic multi-page Document AI response (pages, tokens, layouts)
+and compares:
+  full : MessageToDict + json.dumps/loads + replace_nested_lists_with_json + grouping (previous /upload path)
+  lean : grouping straight from document.entities (STORE_RAW_DOCUMENT=False)
+
+    python benchmarks/bench_entity_extraction.py --pages 10 --tokens 800
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GOOGLE_APPLICATION_PATH', os.path.abspath(__file__)) # gcp_docai only checks the path exists
+
+from google.cloud import documentai_v1 as documentai
+from gcp_docai import group_entities, document_to_dict, replace_nested_lists_with_json
+
+def build_document(pages, tokens_per_page, line_items):
+    def layout(i):
+        vertices = [documentai.NormalizedVertex(x=(i % 50) / 50, y=(i // 50) / 50 + d / 100) for d in range(4)]
+        return documentai.Document.Page.Layout(
+            text_anchor=documentai.Document.TextAnchor(text_segments=[documentai.Document.TextAnchor.TextSegment(start_index=i * 6, end_index=i * 6 + 5)]),
+            confidence=0.98,
+            bounding_poly=documentai.BoundingPoly(normalized_vertices=vertices),
+        )
+    document = documentai.Document(text='token ' * pages * tokens_per_page)
+    for p in range(pages):
+        page = documentai.Document.Page(page_number=p + 1)
+        page.tokens.extend(documentai.Document.Page.Token(layout=layout(t)) for t in range(tokens_per_page))
+        page.lines.extend(documentai.Document.Page.Line(layout=layout(t)) for t in range(0, tokens_per_page, 8))
+        document.pages.append(page)
+    document.entities.extend(documentai.Document.Entity(type_='line_item', mention_text=f'1 Item {i} {i % 20 + 0.95:.2f}') for i in range(line_items))
+    document.entities.extend([
+        documentai.Document.Entity(type_='total_amount', mention_text='123.45'),
+        documentai.Document.Entity(type_='net_amount', mention_text='110.00'),
+        documentai.Document.Entity(type_='total_tax_amount', mention_text='13.45'),
+    ])
+    return document
+
+def full_path(document):
+    document_dict = document_to_dict(document)
+    sanitized = json.loads(json.dumps(document_dict, default=str))
+    replace_nested_lists_with_json(sanitized)
+    return group_entities(document)
+
+def lean_path(document):
+    return group_entities(document)
+
+def measure(fn, document, iterations):
+    tracemalloc.start()
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(document)
+    cpu = (time.process_time() - start) / iterations
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'cpu_ms': round(cpu * 1000, 2), 'peak_alloc_mb': round(peak / 1024 / 1024, 2)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--tokens', type=int, default=800, help="Tokens per page")
+    parser.add_argument('--line-items', type=int, default=80)
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+    document = build_document(args.pages, args.tokens, args.line_items)
+    print(f"document: {args.pages} pages x {args.tokens} tokens, {len(document.entities)} entities, {documentai.Document.serialize(document).__len__()} proto bytes")
+    full = measure(full_path, document, args.iterations)
+    lean = measure(lean_path, document, args.iterations)
+    print(f"full dict path : {full}")
+    print(f"lean (entities): {lean}")
+
+if __name__ == '__main__':
+    main()
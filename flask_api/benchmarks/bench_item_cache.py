@@ -0,0 +1,73 @@
+"""
+Item category cache benchmark: LLM work per receipt as the cache warms up.
+
+Simulates a stream of receipts whose line items are drawn (Zipf-like) from a
+fixed vocabulary. Items the cache knows are classified locally; the rest go to
+a simulated ADK run that classifies them correctly and is learned from.
+
+LLM calls and tokens per ADK run follow the recorded trace in
+gcp_adk_classification.extract_json_from_events (10 model calls, ~22k tokens for
+6 items): tokens ~= BASE_TOKENS_PER_RUN + TOKENS_PER_ITEM * items sent.
+
+    python benchmarks/bench_item_cache.py --receipts 500 --vocabulary 300
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from item_cache import ItemCategoryCache
+
+LLM_CALLS_PER_RUN = 10
+BASE_TOKENS_PER_RUN = 18000
+TOKENS_PER_ITEM = 650
+CATEGORIES = ["Groceries", "Fast Food", "Electronics", "Apparel", "Personal Care", "Others"]
+
+def make_receipts(count, vocabulary, items_per_receipt, seed):
+    rng = random.Random(seed)
+    names = [f"Item {i}" for i in range(vocabulary)]
+    truth = {name: rng.choice(CATEGORIES) for name in names}
+    weights = [1 / (rank + 1) for rank in range(vocabulary)]
+    receipts = []
+    for _ in range(count):
+        picked = rng.choices(names, weights, k=items_per_receipt)
+        receipts.append([f"1 {name} {rng.randint(100, 2000) / 100:.2f}" for name in picked])
+    return receipts, truth
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--receipts', type=int, default=500)
+    parser.add_argument('--vocabulary', type=int, default=300)
+    parser.add_argument('--items', type=int, default=8, help="Line items per receipt")
+    parser.add_argument('--min-count', type=int, default=2)
+    parser.add_argument('--window', type=int, default=100, help="Receipts per reported window")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    receipts, truth = make_receipts(args.receipts, args.vocabulary, args.items, args.seed)
+    cache = ItemCategoryCache(min_count=args.min_count)
+    print(f"{'receipts':>12} {'hit rate':>9} {'LLM runs/rcpt':>14} {'LLM calls/rcpt':>15} {'tokens/rcpt':>12}")
+    baseline_tokens = BASE_TOKENS_PER_RUN + TOKENS_PER_ITEM * args.items
+    for start in range(0, len(receipts), args.window):
+        runs = items_sent = hits = lookups = 0
+        window = receipts[start:start + args.window]
+        for line_items in window:
+            known, unknown = cache.split_line_items(line_items)
+            hits += len(known)
+            lookups += len(line_items)
+            if unknown:
+                runs += 1
+                items_sent += len(unknown)
+                # Simulated pipeline result for the unknown items, learned like classify_stage does
+                names = [line.split(' ', 1)[1].rsplit(' ', 1)[0] for line in unknown]
+                cache.learn([{'category': truth[name], 'items': [name], 'total_price': '0'} for name in names])
+        tokens = runs * BASE_TOKENS_PER_RUN + items_sent * TOKENS_PER_ITEM
+        label = f"{start + 1}-{start + len(window)}"
+        print(f"{label:>12} {hits / lookups:>9.2f} {runs / len(window):>14.2f} {runs * LLM_CALLS_PER_RUN / len(window):>15.1f} {tokens / len(window):>12.0f}")
+    print(f"without cache: 1.00 runs, {LLM_CALLS_PER_RUN} calls, {baseline_tokens} tokens per receipt")
+    print(cache.stats())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Output tokens of the classifier: full classification vs category-only (parsed items).
+
+Without parsed items, InitialClassifier echoes item, quantity and price for every
+line plus the totals; with them (line_item_parser.py + PROMPT_PARSED_ITEMS), the
+CategoryClassifier returns one category per item name. Both outputs are rendered
+like the model writes them (indent=2 JSON) and converted to tokens with the
+characters-per-token ratio of the recorded InitialClassifier response in
+gcp_adk_classification.py (341 output tokens for 6 items).
+
+Corpus: adk_pipeline/evals/test_data.json plus the synthetic receipts of
+bench_prompt_builder.py.
+
+    python benchmarks/bench_line_item_parser.py --receipts 200
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from line_item_parser import parse_line_items, prompt_items
+from prompt_builder import PARSER_MIN_CONFIDENCE
+from bench_prompt_builder import make_receipt, sample_receipt
+
+RECORDED_ITEMS = [("Coffee", "3.50", "Fast Food"), ("Glass House Wine", "9.95", "Others"), ("Jumbo Coctail Shrimp", "12.95", "Fast Food"),
+                  ("Escargot Bourguigonne", "10.95", "Fast Food"), ("Veal Zingaria", "23.95", "Fast Food"), ("Duckling ala Arancio", "25.95", "Fast Food")]
+RECORDED_OUTPUT_TOKENS = 341
+
+def full_output(items, totals):
+    return json.dumps({'classified': items, 'total_values_dict': totals}, indent=2)
+
+def category_output(items):
+    return json.dumps({'categories': [item['category'] for item in items]}, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--receipts', type=int, default=200)
+    parser.add_argument('--max-lines', type=int, default=120)
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+    recorded = [{'item': n, 'quantity': '1', 'price': p, 'category': c} for n, p, c in RECORDED_ITEMS]
+    tokens_per_char = RECORDED_OUTPUT_TOKENS / len(full_output(recorded, {'total_amount': '94.78', 'net_amount': '87.25', 'total_tax_amount': '7.53'}))
+
+    rng = random.Random(args.seed)
+    corpus = [sample_receipt()] + [make_receipt(rng, rng.randint(5, args.max_lines)) for _ in range(args.receipts - 1)]
+    full, category, confidences, parse_seconds, parsed_receipts = [], [], [], 0.0, 0
+    for receipt in corpus:
+        start = time.perf_counter()
+        parsed = parse_line_items(receipt['line_items'])
+        parse_seconds += time.perf_counter() - start
+        confidences += [p['confidence'] for p in parsed]
+        if not all(p['price'] is not None and p['confidence'] >= PARSER_MIN_CONFIDENCE for p in parsed):
+            continue
+        parsed_receipts += 1
+        items = [dict(item, category=rng.choice(["Groceries", "Fast Food", "Others"])) for item in prompt_items(parsed)]
+        full.append(len(full_output(items, receipt['receipt_total_value'])) * tokens_per_char)
+        category.append(len(category_output(items)) * tokens_per_char)
+
+    print(f"receipts parsed with confidence >= {PARSER_MIN_CONFIDENCE}: {parsed_receipts}/{len(corpus)}, "
+          f"mean item confidence {statistics.mean(confidences):.2f}, parse {parse_seconds / len(corpus) * 1e6:.0f} us per receipt")
+    print(f"full classification : mean {statistics.mean(full):6.0f} output tokens per receipt")
+    print(f"category-only       : mean {statistics.mean(category):6.0f} output tokens per receipt")
+    print(f"output tokens saved : {1 - sum(category) / sum(full):.0%}")
+
+if __name__ == '__main__':
+    main()
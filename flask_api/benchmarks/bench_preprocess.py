@@ -0,0 +1,64 @@
+"""
+Benchmark the pre-OCR image normalisation over a directory of sample receipts.
+
+    python benchmarks/bench_preprocess.py path/to/images            # bytes only
+    python benchmarks/bench_preprocess.py path/to/images --ocr      # + Document AI latency (needs .env)
+
+Reports per image and in total: original vs processed bytes and, with --ocr,
+Document AI latency for the original and the preprocessed upload.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_preprocess import preprocess_image, detect_mime_type
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff', '.gif')
+
+def timed_ocr(image_data, mime_type):
+    from gcp_docai import extract_receipt_data_from_bytes
+    start = time.perf_counter()
+    _, document = extract_receipt_data_from_bytes(image_data, mime_type)
+    return time.perf_counter() - start, len(document.entities)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('images', help="Directory with sample receipt images")
+    parser.add_argument('--max-dimension', type=int, default=2000)
+    parser.add_argument('--quality', type=int, default=85)
+    parser.add_argument('--color', action='store_true', help="Keep colour instead of greyscale")
+    parser.add_argument('--ocr', action='store_true', help="Also measure Document AI latency before/after")
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.images, f) for f in os.listdir(args.images) if f.lower().endswith(IMAGE_EXTENSIONS))
+    totals = {'original': 0, 'processed': 0, 'prep_s': 0.0, 'ocr_before_s': 0.0, 'ocr_after_s': 0.0}
+    for path in paths:
+        with open(path, 'rb') as f:
+            original = f.read()
+        start = time.perf_counter()
+        processed, mime_type, stats = preprocess_image(original, args.max_dimension, not args.color, args.quality)
+        prep_s = time.perf_counter() - start
+        totals['original'] += len(original)
+        totals['processed'] += len(processed)
+        totals['prep_s'] += prep_s
+        line = f"{os.path.basename(path)}: {len(original)} -> {len(processed)} bytes ({stats.get('original_size')} -> {stats.get('processed_size')}), prep {prep_s * 1000:.1f} ms"
+        if args.ocr:
+            before_s, before_entities = timed_ocr(original, detect_mime_type(original))
+            after_s, after_entities = timed_ocr(processed, mime_type)
+            totals['ocr_before_s'] += before_s
+            totals['ocr_after_s'] += after_s
+            line += f", OCR {before_s:.2f}s ({before_entities} entities) -> {after_s:.2f}s ({after_entities} entities)"
+        print(line)
+    if not paths:
+        print("No images found")
+        return
+    saved = totals['original'] - totals['processed']
+    print(f"\n{len(paths)} images: {totals['original']} -> {totals['processed']} bytes, saved {saved} ({saved / totals['original'] * 100:.1f}%)")
+    print(f"average preprocessing time: {totals['prep_s'] / len(paths) * 1000:.1f} ms")
+    if args.ocr:
+        print(f"average OCR latency: {totals['ocr_before_s'] / len(paths):.2f}s -> {totals['ocr_after_s'] / len(paths):.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Classification prompt size: json.dumps(..., indent=2) of the full request vs prompt_builder.
+
+Sample corpus: adk_pipeline/evals/test_data.json plus synthetic receipts with the
+same `grouped` shape (every line item repeated under line_item, supplier address,
+phone, times), 5 to --max-lines lines, some repeated items and long OCR names.
+Tokens are estimated as characters / 4. Latency is the estimated prefill time at
+--prefill-ms per 1k prompt tokens, paid once per LLM call that sees the request
+(--calls; 1 with PIPELINE_CONTEXT_MODE=state, one per agent call with history).
+
+    python benchmarks/bench_prompt_builder.py --receipts 200 --max-lines 120
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from prompt_builder import build_classification_prompt, estimate_tokens
+
+NAMES = ["Coffee", "Blue Moon Tap", "Fren Onion Soup", "Pork Chop", "Bread", "Milk 2L", "Bananas",
+         "USB-C Cable", "T-Shirt", "Shampoo", "Chicken Breast", "Tomatoes", "Rice 5kg", "Toothpaste"]
+
+def sample_receipt():
+    with open(os.path.join(HERE, '..', '..', 'adk_pipeline', 'evals', 'test_data.json')) as f:
+        return json.load(f)
+
+def make_receipt(rng, lines):
+    line_items = []
+    for _ in range(lines):
+        name = rng.choice(NAMES) if rng.random() < 0.2 else f"{rng.choice(NAMES)} {rng.randint(1, 60)}" # ~20% repeats
+        if rng.random() < 0.1:
+            name += " " + " ".join(rng.choice(["ORG", "PLU", "4011", "LB", "@", "0.79/LB", "SALE"]) for _ in range(12))
+        line_items.append(f"1 {name} {rng.randint(99, 2999) / 100:.2f}")
+    net = sum(float(line.rsplit(' ', 1)[1]) for line in line_items)
+    tax = round(net * 0.08, 2)
+    totals = {'total_amount': f"{net + tax:.2f}", 'net_amount': f"{net:.2f}", 'total_tax_amount': f"{tax:.2f}"}
+    grouped = {
+        'net_amount': [totals['net_amount']], 'total_amount': [totals['total_amount']], 'total_tax_amount': [totals['total_tax_amount']],
+        'currency': ["$"], 'purchase_time': ["08:22PM"], 'receipt_date': ["09/24/2016"], 'supplier_name': ["Nancy"],
+        'supplier_phone': ["718.343-4616"], 'supplier_address': ["255-41 Jericho Turnpike\nFloral Park, NY 11001"],
+        'line_item': list(line_items), 'supplier_city': [""],
+    }
+    return {'line_items': line_items, 'receipt_total_value': totals, 'grouped': grouped}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--receipts', type=int, default=200)
+    parser.add_argument('--max-lines', type=int, default=120)
+    parser.add_argument('--prefill-ms', type=float, default=60, help="Estimated prefill ms per 1k prompt tokens")
+    parser.add_argument('--calls', type=int, default=1, help="LLM calls that see the request per run")
+    parser.add_argument('--seed', type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    corpus = [sample_receipt()] + [make_receipt(rng, rng.randint(5, args.max_lines)) for _ in range(args.receipts - 1)]
+
+    before, after, merged, omitted, build_seconds = [], [], 0, 0, 0.0
+    for receipt in corpus:
+        before.append(estimate_tokens(json.dumps(receipt, indent=2)))
+        start = time.perf_counter()
+        prompt, report = build_classification_prompt(receipt['line_items'], receipt['receipt_total_value'], receipt['grouped'])
+        build_seconds += time.perf_counter() - start
+        after.append(report['tokens'])
+        merged += report['merged']
+        omitted += len(report['omitted'])
+
+    for name, tokens in (('indent=2', before), ('compact', after)):
+        ms = statistics.mean(tokens) / 1000 * args.prefill_ms * args.calls
+        print(f"{name:9}: mean {statistics.mean(tokens):7.0f} tokens, p95 {sorted(tokens)[int(len(tokens) * 0.95)]:6d}, est. prefill {ms:6.1f} ms per run")
+    print(f"saved: {1 - sum(after) / sum(before):.0%} of prompt tokens, "
+          f"{(statistics.mean(before) - statistics.mean(after)) / 1000 * args.prefill_ms * args.calls:.1f} ms per run (est.); "
+          f"build {build_seconds / len(corpus) * 1e6:.0f} us per receipt; {merged} lines merged, {omitted} over budget")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Raw document storage benchmark: inline Firestore RAW_DATA doc vs compressed blob + pointer.
+
+Serialises a synthetic Document AI response the way persist_stage does and reports,
+per receipt, the bytes each option stores and the write latency:
+  firestore : sanitized dict stored inline (size approximated by its JSON length,
+              real write timed only with --firestore and valid credentials)
+  gzip/zstd : RawDocumentArchive on a LocalBlobStore in a temp directory
+
+    python benchmarks/bench_raw_archive.py --pages 10 --tokens 800
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('GOOGLE_APPLICATION_PATH', os.path.abspath(__file__)) # gcp_docai only checks the path exists
+
+from bench_entity_extraction import build_document
+from gcp_docai import document_to_dict, replace_nested_lists_with_json
+from raw_archive import LocalBlobStore, RawDocumentArchive, zstandard
+
+FIRESTORE_DOC_LIMIT = 1024 * 1024
+
+def bench_archive(codec, document_dict, iterations):
+    with tempfile.TemporaryDirectory() as root:
+        archive = RawDocumentArchive(LocalBlobStore(root), codec)
+        timings = []
+        for i in range(iterations):
+            start = time.perf_counter()
+            pointer = archive.archive('2025-01-01', f'bench-{i}', document_dict)
+            timings.append((time.perf_counter() - start) * 1000)
+        assert archive.load(pointer) == json.loads(json.dumps(document_dict, default=str))
+    return {
+        'stored_bytes': pointer['stored_bytes'],
+        'pointer_bytes': len(json.dumps(pointer)),
+        'write_ms_p50': round(statistics.median(timings), 2),
+    }
+
+def bench_firestore(document_dict, iterations, write):
+    timings = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        sanitized = json.loads(json.dumps(document_dict, default=str))
+        replace_nested_lists_with_json(sanitized)
+        if write:
+            from firebase_store import save_raw_data
+            save_raw_data('bench', f'bench-{i}', sanitized, '2025-01-01T00:00:00')
+        timings.append((time.perf_counter() - start) * 1000)
+    stored = len(json.dumps(sanitized))
+    return {
+        'stored_bytes': stored,
+        'over_doc_limit': stored > FIRESTORE_DOC_LIMIT,
+        'write_ms_p50' if write else 'prepare_ms_p50': round(statistics.median(timings), 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--tokens', type=int, default=800, help="Tokens per page")
+    parser.add_argument('--line-items', type=int, default=80)
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--firestore', action='store_true', help="Really write to DATA/RAW_DATA/bench (needs credentials)")
+    args = parser.parse_args()
+    document_dict = document_to_dict(build_document(args.pages, args.tokens, args.line_items))
+    raw = len(json.dumps(document_dict, separators=(',', ':'), default=str))
+    print(f"document: {args.pages} pages x {args.tokens} tokens, {raw} JSON bytes")
+    print(f"firestore inline : {bench_firestore(document_dict, args.iterations, args.firestore)}")
+    print(f"gzip blob        : {bench_archive('gzip', document_dict, args.iterations)}")
+    if zstandard:
+        print(f"zstd blob        : {bench_archive('zstd', document_dict, args.iterations)}")
+    else:
+        print("zstd blob        : skipped (zstandard not installed)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+SQLite storage benchmark: write throughput of the upload path and /summary latency.
+
+Fills a temporary SQLite database (storage.SQLiteStorage, WAL) with --users users of
+--sessions receipts each the way the API does (session meta, raw data, receipt,
+summary + spend aggregates), then times per request:
+  summary   : get_spend_aggregates + summary_from_aggregates (the /summary path,
+              GROUP BY on the (user_id, date) index)
+  recompute : iter_summaries + summary_contribution for the same user (the rebuild
+              path, indexed join of sessions and summaries)
+  get_data  : the rows /get_data flattens, for one user
+Writes use --threads threads to show WAL concurrency.
+
+    python benchmarks/bench_storage.py --users 50 --sessions 200 --threads 4
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spend_aggregates import empty_aggregates, summary_contribution, add_contribution, summary_from_aggregates, compare_aggregates
+from storage import SQLiteStorage
+
+CATEGORIES = ['Groceries', 'Fast Food', 'Household', 'Personal Care', 'Clothing', 'Others', 'Tax']
+
+def make_summary(rng):
+    return {'categories': [{'category': c, 'items': [f'{c} item'], 'total_price': f'{rng.randint(0, 5000) / 100:.2f}'}
+                           for c in rng.sample(CATEGORIES, 4)]}
+
+def save_receipt(store, user_id, session_id, day, rng):
+    """The storage calls of one upload: persist stage, then the classification save."""
+    timestamp = f'{day}T12:00:00'
+    store.set_session(session_id, {'timestamp': timestamp, 'main_user': user_id, 'source': 'WEB'})
+    store.save_raw_data(day, session_id, {'timestamp': timestamp, 'entities': {'line_item': ['1 Milk 1.99'] * 20}})
+    store.save_receipt(day, session_id, {'entities': {'total_amount': ['12.34']}})
+    summary = make_summary(rng)
+    store.save_summary(day, session_id, summary)
+    store.update_spend_aggregates(user_id, session_id, summary_contribution(summary['categories'], day))
+
+def timed(fn, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 3)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--sessions', type=int, default=200, help="Receipts per user")
+    parser.add_argument('--threads', type=int, default=4, help="Concurrent writers")
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = SQLiteStorage(os.path.join(root, 'bench.db'))
+        start_day = date(2025, 1, 1)
+        jobs = [(f'user-{u}', f'session-{u}-{s}', str(start_day + timedelta(days=s % 365)))
+                for u in range(args.users) for s in range(args.sessions)]
+        random.Random(0).shuffle(jobs)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(lambda job: save_receipt(store, *job, random.Random(job[1])), jobs))
+        elapsed = time.perf_counter() - start
+        print(f"writes    : {len(jobs)} receipts in {elapsed:.2f}s ({len(jobs) / elapsed:.0f} receipts/s, {args.threads} threads)")
+
+        user_id = 'user-0'
+        def recompute():
+            aggregates = empty_aggregates()
+            for _, date_str, _, sum_doc in store.iter_summaries(user_id):
+                add_contribution(aggregates, summary_contribution(sum_doc['categories'], date_str))
+            return aggregates
+        assert not compare_aggregates(store.get_spend_aggregates(user_id), recompute())
+        print(f"summary   : {timed(lambda: summary_from_aggregates(store.get_spend_aggregates(user_id)), args.iterations)} ms p50")
+        print(f"recompute : {timed(recompute, args.iterations)} ms p50")
+        print(f"get_data  : {timed(lambda: list(store.iter_summaries(user_id)), args.iterations)} ms p50 "
+              f"({args.sessions} sessions of {args.users * args.sessions})")
+
+if __name__ == '__main__':
+    main()
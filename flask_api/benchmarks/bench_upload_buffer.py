@@ -0,0 +1,70 @@
+"""
+Compare the old disk round trip (FileStorage.save + re-read) with passing the
+request buffer straight to OCR, for a synthetic upload of a given size.
+
+    python benchmarks/bench_upload_buffer.py --size-mb 4 --iterations 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from werkzeug.datastructures import FileStorage
+from upload_archive import UploadArchive
+
+def make_upload(payload):
+    # Werkzeug spools large request files to a temporary file; mimic that
+    stream = tempfile.SpooledTemporaryFile(max_size=500 * 1024)
+    stream.write(payload)
+    stream.seek(0)
+    return FileStorage(stream=stream, filename='receipt.jpg', content_type='image/jpeg')
+
+def disk_round_trip(file, upload_dir, i):
+    save_path = os.path.join(upload_dir, f'{i}_{file.filename}')
+    file.save(save_path)
+    with open(save_path, 'rb') as f:
+        return f.read()
+
+def in_memory(file, archive, i):
+    image_data = file.read()
+    if archive:
+        archive.archive_async(str(i), file.filename, image_data)
+    return image_data
+
+def measure(fn, payload, iterations):
+    latencies = []
+    tracemalloc.start()
+    for i in range(iterations):
+        file = make_upload(payload)
+        start = time.perf_counter()
+        data = fn(file, i)
+        latencies.append(time.perf_counter() - start)
+        assert len(data) == len(payload)
+        del data
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    latencies.sort()
+    return {'p50_ms': round(latencies[len(latencies) // 2] * 1000, 3), 'max_ms': round(latencies[-1] * 1000, 3), 'peak_mb': round(peak / 1024 / 1024, 2)}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size-mb', type=float, default=4)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+    payload = b'\xff\xd8\xff' + os.urandom(int(args.size_mb * 1024 * 1024))
+
+    with tempfile.TemporaryDirectory() as upload_dir, tempfile.TemporaryDirectory() as archive_dir:
+        old = measure(lambda f, i: disk_round_trip(f, upload_dir, i), payload, args.iterations)
+        new = measure(lambda f, i: in_memory(f, None, i), payload, args.iterations)
+        archive = UploadArchive(archive_dir, max_files=10)
+        archived = measure(lambda f, i: in_memory(f, archive, i), payload, args.iterations)
+        archive._pool().shutdown(wait=True)
+    print(f"disk save + re-read          : {old}")
+    print(f"in-memory, no archive        : {new}")
+    print(f"in-memory + background archive: {archived} (request path only)")
+
+if __name__ == '__main__':
+    main()
@@ -1,68 +1,64 @@
-import os
+"""
+User, session and receipt data of the API, on the storage backend configured by
+STORAGE_BACKEND (storage.py: Firestore or embedded SQLite). Firebase is only
+initialised when a Firestore call or a Firebase Auth token check needs it.
+"""
 import logging
-from datetime import datetime
 import uuid
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import auth, credentials, firestore # , realtime
 import pandas as pd
 from flask import request, jsonify
+from spend_aggregates import (
+    empty_aggregates, summary_contribution, add_contribution, compare_aggregates
+)
+from item_cache import count_item_categories
+from storage import create_storage, firebase_app
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 
 load_dotenv()
 
-cred_path = os.getenv('FIREBASE_CREDENTIALS', 'firebase_credentials.json')
-logging.info(f"Loading Firebase credentials from: {cred_path}")
-if not cred_path or not os.path.exists(cred_path):
-    code_current_dir = os.path.dirname(os.path.abspath(__file__))
-    msg = f"Firebase credentials file not found at: {cred_path}"
-    logging.error(msg)
-    # raise FileNotFoundError(msg)
-    # Look in current directory for `firebase_credentials.json`
-    cred_path = os.path.join(code_current_dir, 'firebase_credentials.json')
-    if not os.path.exists(cred_path):
-        logging.error(f"Firebase credentials file not found at: {cred_path}")
-        raise FileNotFoundError(msg)
-
-cred = credentials.Certificate(cred_path)
-firebase_admin.initialize_app(cred)
-db = firestore.client()
-logging.info("Initialized Firebase Admin SDK")
+store = create_storage()
+
+def _verify_id_token(id_token):
+    from firebase_admin import auth
+    return auth.verify_id_token(id_token, app=firebase_app())
 
 
 def create_user(primary_id, source, identifier, session_id=None):
     logging.info(f"create_user: primary_id={primary_id}, source={source}, identifier={identifier}")
-    user_ref = db.collection('USERDATA').document(primary_id)
     # Check for session_id in existing user
     if session_id is None:
-        if user_ref.get().to_dict() is not None:
-            if 'session_id' in user_ref.get().to_dict():
-                session_id = user_ref.get().to_dict()['session_id']
+        user_doc = store.get_user(primary_id)
+        if user_doc is not None:
+            if 'session_id' in user_doc:
+                session_id = user_doc['session_id']
                 logging.info(f"Using existing session_id={session_id} for primary_id={primary_id}")
             else:
                 session_id = str(uuid.uuid4())
         else:
             session_id = str(uuid.uuid4())
-    user_ref.set({
+    store.merge_user(primary_id, {
         source: identifier,
         'session_id': session_id,
         'WEB': primary_id,  # Always set WEB as primary_id for web dashboard
-    }, merge=True)
+    })
     logging.info("User record created/merged")
     return session_id
 
 def authenticate(main_source, session_id):
-    # Search if any db.collection('USERDATA').document(primary_id) has this session_id and return the primary_id
-    primary_id = db.collection('USERDATA').where('session_id', '==', session_id).limit(1).get()[0].id
+    # Search if any USERDATA document has this session_id and return the primary_id
+    primary_id = store.find_user('session_id', session_id)
+    if primary_id is None:
+        return jsonify({"status": "error", "message": "Unknown session"}), 401
     # main_source can be 'TRUE' or 'FALSE' | it refers to wheter the source of the request is main (api) or not (e.g. web dashboard)
     id_token = request.json.get('idToken')
     # is_new_user = request.json.get('isNewUser')  # <--- NEW
     try:
-        decoded_token = auth.verify_id_token(id_token)  # Verify the ID token
+        decoded_token = _verify_id_token(id_token)  # Verify the ID token
         # Prevent overwriting an existing auth identifier
-        user_doc = db.collection('USERDATA').document(primary_id).get().to_dict() or {}
+        user_doc = store.get_user(primary_id) or {}
         if 'auth' in user_doc and user_doc['auth'] != decoded_token['uid']:
             logging.warning(
                 f"Registration blocked for {primary_id}: already linked to another auth account"
@@ -112,11 +108,10 @@ def login_check():
     """Verify Google ID token and check if a corresponding user exists."""
     id_token = request.json.get('idToken')
     try:
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = _verify_id_token(id_token)
         uid = decoded_token['uid']
-        docs = db.collection('USERDATA').where('auth', '==', uid).limit(1).get()
-        if docs:
-            primary_id = docs[0].id
+        primary_id = store.find_user('auth', uid)
+        if primary_id:
             session_id = create_user(primary_id, 'auth', uid)
             create_user(primary_id, 'decoded_token', dict(decoded_token), session_id)
             return jsonify({
@@ -132,17 +127,14 @@ def login_check():
 
 def get_primary_id(source, identifier):
     logging.info(f"get_primary_id: source={source}, identifier={identifier}")
-    docs = db.collection('USERDATA').where(source, '==', identifier).limit(1).get()
-    primary = docs[0].id if docs else None
+    primary = store.find_user(source, identifier)
     logging.info(f"Found primary_id={primary}" if primary else "No primary_id found")
     return primary
 
 def get_user_document(primary_id):
     """Return the USERDATA document for the given primary_id or None."""
     logging.info(f"get_user_document: {primary_id}")
-    doc_ref = db.collection('USERDATA').document(primary_id)
-    doc = doc_ref.get()
-    doc_dict = doc.to_dict() if doc.exists else None
+    doc_dict = store.get_user(primary_id)
     if doc_dict is not None:
         if 'decoded_token' in doc_dict:
             del doc_dict['decoded_token'] # Remove the decoded_token field to avoid sending sensitive data
@@ -150,23 +142,47 @@ def get_user_document(primary_id):
 
 def save_session_meta(session_id, timestamp, main_user, source):
     logging.info(f"save_session_meta: session_id={session_id}, main_user={main_user}, source={source}, timestamp={timestamp}")
-    sess_ref = db.collection('SESSIONS').document(session_id)
-    sess_ref.set({
+    store.set_session(session_id, {
         'timestamp': timestamp,
         'main_user': main_user,
         'source': source
     })
     logging.info("Session metadata saved")
 
+def save_job_status(session_id, status):
+    """
+    Mirror an upload job's status onto SESSIONS -> {session_id} -> job,
+    so any API worker can answer /jobs/<session_id>.
+    """
+    store.set_session(session_id, {'job': status}, merge=True)
+
+def save_agent_metrics(session_id, summary):
+    """Store the per-agent latency/token summary of the classification run on SESSIONS -> {session_id} -> agent_metrics."""
+    store.set_session(session_id, {'agent_metrics': summary}, merge=True)
+
+def get_job_status(session_id):
+    """Return the job status stored on the session document or None."""
+    return (store.get_session(session_id) or {}).get('job')
+
+def get_ocr_cache_entry(key):
+    """Return the OCR_CACHE entry ({'stored_at', 'value'}) for an image hash or None."""
+    return store.get_ocr_cache_entry(key)
+
+def save_ocr_cache_entry(key, entry, ttl_seconds):
+    """Store an OCR result under OCR_CACHE -> {key} (Firestore skips oversized results)."""
+    store.save_ocr_cache_entry(key, entry, ttl_seconds)
+
+def delete_ocr_cache_entry(key):
+    store.delete_ocr_cache_entry(key)
+
 def save_raw_data(date_str, session_id, data_dict, timestamp):
     """
     Store raw extracted data under:
       DATA -> RAW_DATA -> {date_str} -> {session_id}
     """
     logging.info(f"save_raw_data: date={date_str}, session_id={session_id}")
-    raw_ref = db.collection('DATA').document('RAW_DATA').collection(date_str).document(session_id)
     payload = {'timestamp': timestamp, **data_dict}
-    raw_ref.set(payload)
+    store.save_raw_data(date_str, session_id, payload)
     logging.info("Raw data saved under DATA/RAW_DATA")
 
 def save_receipt_data(date_str, session_id, receipt_dict, timestamp):
@@ -175,9 +191,8 @@ def save_receipt_data(date_str, session_id, receipt_dict, timestamp):
       DATA -> RECEIPTS -> {date_str} -> {session_id}
     """
     logging.info(f"save_receipt_data: date={date_str}, session_id={session_id}")
-    rec_ref = db.collection('DATA').document('RECEIPTS').collection(date_str).document(session_id)
     payload = {'entities': receipt_dict} # 'timestamp': timestamp, 
-    rec_ref.set(payload)
+    store.save_receipt(date_str, session_id, payload)
     logging.info("Receipt data saved under DATA/RECEIPTS")
 
 def save_summarised_data(date_str, session_id, summary_dict, timestamp):
@@ -186,54 +201,128 @@ def save_summarised_data(date_str, session_id, summary_dict, timestamp):
       DATA -> SUMMARISED_DATA -> {date_str} -> {session_id}
     """
     logging.info(f"save_summarised_data: date={date_str}, session_id={session_id}")
-    sum_ref = db.collection('DATA').document('SUMMARISED_DATA').collection(date_str).document(session_id)
     payload = {**summary_dict} # 'timestamp': timestamp, 
-    sum_ref.set(payload)
+    store.save_summary(date_str, session_id, payload)
     logging.info("Summarised data saved under DATA/SUMMARISED_DATA")
+    session_doc = store.get_session(session_id) or {}
+    if session_doc.get('main_user'):
+        session_date = session_doc.get('timestamp', '').split('T')[0] or date_str
+        update_spend_aggregates(session_doc['main_user'], session_id, session_date, payload.get('categories'))
+    else:
+        logging.warning(f"No session metadata for {session_id}, spend aggregates not updated")
+
+def _summarised_rows(sum_doc, user_id, date_str):
+    """
+    Flatten one SUMMARISED_DATA document into per-category rows.
+    """
+    # {'time_taken_seconds': 65.73, 'categories': [{'category': 'Fast Food', 'total': 43.85, 'items': ['Pork Quesadilla', 'Fren Onion Soup', 'Pork Chop', 'Hanger Sizzle']}, {'category': 'Groceries', 'total': 9.95, 'items': ['Mozzarella&Tomato']}, {'category': 'Others', 'total': 0, 'items': []}], 'overall_total': '86.50'}
+    items = []
+    for key in sum_doc['categories']:
+        if float(key['total_price']) != 0 and key['category'] != 'Tax':
+            items.append({
+                'user_id': user_id,
+                'date': date_str,
+                # 'session_id': uu_id,
+                'category': key['category'],
+                'total': float(key['total_price']),
+            })
+    return items
+
+def get_sessions_for_user(USERNAME=None):
+    """
+    Return [(session_id, session_doc)] for a user (filtered on main_user by the backend),
+    or every session when no USERNAME is given.
+    """
+    return store.list_sessions(USERNAME)
 
 def get_all_summarised_data_as_df(USERNAME=None):
     """
-    Get all summarised data as a DataFrame
+    Get all summarised data as a DataFrame.
+    With USERNAME only that user's sessions are queried (Firestore: batched multi-document
+    reads of SUMMARY_READ_BATCH_SIZE; SQLite: one indexed join).
     """
-    logging.info("get_all_summarised_data_as_df")
+    logging.info(f"get_all_summarised_data_as_df: USERNAME={USERNAME}")
     all_data = []
-    # Get all the Timestams and their Corresponding Session IDs
-    sessions_to_check = {}
-    users_for_session = {}
-    collections = db.collection('SESSIONS').get()
-    for doc in collections:
-        session_id = doc.id
-        date_str = doc.to_dict().get('timestamp', '').split('T')[0]
-        if date_str in sessions_to_check.keys():
-            sessions_to_check[date_str].append(session_id)
-        else:
-            sessions_to_check[date_str] = [session_id]
-        users_for_session[session_id] = doc.to_dict().get('main_user', None)
-    for date_str, session_ids in sessions_to_check.items():
-        for uu_id in session_ids:
-            logging.info(f"Fetching summarised data for {date_str}/{uu_id}")
-            try:
-                sum_ref = db.collection('DATA').document('SUMMARISED_DATA').collection(date_str).document(uu_id)
-                sum_doc = sum_ref.get().to_dict()
-                if sum_doc: # sum_doc is not None and not sum_doc == {}:
-                    # {'time_taken_seconds': 65.73, 'categories': [{'category': 'Fast Food', 'total': 43.85, 'items': ['Pork Quesadilla', 'Fren Onion Soup', 'Pork Chop', 'Hanger Sizzle']}, {'category': 'Groceries', 'total': 9.95, 'items': ['Mozzarella&Tomato']}, {'category': 'Others', 'total': 0, 'items': []}], 'overall_total': '86.50'}
-                    items = []
-                    for key in sum_doc['categories']:
-                        if float(key['total_price']) != 0 and key['category'] != 'Tax':
-                            items.append({
-                                'user_id': users_for_session[uu_id],
-                                'date': date_str,
-                                # 'session_id': uu_id,
-                                'category': key['category'],
-                                'total': float(key['total_price']),
-                            })
-                    all_data += items
-            except Exception as e:
-                logging.error(f"Error fetching summarised data for {date_str}/{uu_id}: {e}")
-                continue
-    logging.info(f"Total summarised records found: {all_data}")
+    for uu_id, date_str, user_id, sum_doc in store.iter_summaries(USERNAME):
+        try:
+            all_data += _summarised_rows(sum_doc, user_id, date_str)
+        except Exception as e:
+            logging.error(f"Error fetching summarised data for {date_str}/{uu_id}: {e}")
+            continue
+    logging.info(f"Total summarised records found: {len(all_data)}")
     df = pd.DataFrame(all_data)
     if USERNAME and not df.empty:
         df = df[df['user_id'] == USERNAME]
     return df
-# print(get_all_summarised_data_as_df().to_dict(orient='records'))
\ No newline at end of file
+
+def update_spend_aggregates(user_id, session_id, date_str, categories):
+    """
+    Apply a session's summary to the user's running aggregates
+    (SPEND_AGGREGATES on Firestore, spend_lines on SQLite).
+    The session's previous contribution is replaced, so re-saves are idempotent.
+    """
+    logging.info(f"update_spend_aggregates: user_id={user_id}, session_id={session_id}, date={date_str}")
+    store.update_spend_aggregates(user_id, session_id, summary_contribution(categories, date_str))
+    logging.info("Spend aggregates updated")
+
+def get_spend_aggregates(user_id):
+    """Return the user's spend aggregates or None."""
+    return store.get_spend_aggregates(user_id)
+
+def recompute_spend_aggregates(user_id):
+    """
+    Recompute a user's aggregates from SUMMARISED_DATA.
+    Returns (aggregates, {session_id: contribution}).
+    """
+    aggregates = empty_aggregates()
+    contributions = {}
+    for session_id, date_str, _, sum_doc in store.iter_summaries(user_id):
+        contributions[session_id] = summary_contribution(sum_doc.get('categories'), date_str)
+        add_contribution(aggregates, contributions[session_id])
+    return aggregates, contributions
+
+def rebuild_spend_aggregates(user_id):
+    """
+    Backfill: overwrite a user's aggregates and session contributions with a full recomputation.
+    """
+    logging.info(f"rebuild_spend_aggregates: user_id={user_id}")
+    aggregates, contributions = recompute_spend_aggregates(user_id)
+    store.replace_spend_aggregates(user_id, aggregates, contributions)
+    logging.info(f"Rebuilt spend aggregates for {user_id} from {len(contributions)} sessions")
+    return aggregates
+
+def check_spend_aggregates(user_id, tolerance=0.01):
+    """
+    Consistency check: compare the stored aggregates with a full recomputation.
+    Returns a list of mismatches (empty when consistent).
+    """
+    recomputed, _ = recompute_spend_aggregates(user_id)
+    return compare_aggregates(get_spend_aggregates(user_id), recomputed, tolerance)
+
+def list_users_with_sessions():
+    """Return the distinct main_user values found in SESSIONS."""
+    return sorted({session_doc.get('main_user') for _, session_doc in get_sessions_for_user()} - {None})
+
+def get_item_categories(keys=None):
+    """Return the learned item categories as {key: {'item', 'counts'}} from ITEM_CATEGORIES (only `keys` when given)."""
+    return store.get_item_categories(keys)
+
+def record_item_categories(observations):
+    """
+    Count one observation per item under ITEM_CATEGORIES -> {key}:
+      {'item': name, 'counts': {category: n}, 'updated_at': ...}
+    observations: {key: {'item', 'category'}}
+    """
+    store.record_item_categories(observations)
+
+def rebuild_item_categories(USERNAME=None):
+    """
+    Seed ITEM_CATEGORIES from SUMMARISED_DATA (all users by default).
+    Overwrites the counts of every item found; returns the number of items written.
+    """
+    logging.info(f"rebuild_item_categories: USERNAME={USERNAME}")
+    entries = count_item_categories(sum_doc.get('categories') for _, _, _, sum_doc in store.iter_summaries(USERNAME))
+    store.replace_item_categories(entries)
+    logging.info(f"Seeded {len(entries)} item categories")
+    return len(entries)
+# print(get_all_summarised_data_as_df().to_dict(orient='records'))
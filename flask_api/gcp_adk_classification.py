@@ -1,11 +1,124 @@
-import requests, json, logging
+import requests, json, logging, os, threading, time
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ADK_POOL_SIZE = int(os.getenv('ADK_POOL_SIZE', 10))
+ADK_CONNECT_TIMEOUT = float(os.getenv('ADK_CONNECT_TIMEOUT', 5))
+ADK_READ_TIMEOUT = float(os.getenv('ADK_READ_TIMEOUT', 300)) # run_sse keeps the stream open for the whole multi-agent run
+# iter_sse stops reading once one of these state keys / final responses from these authors arrives
+ADK_TERMINAL_STATE_KEYS = tuple(k.strip() for k in os.getenv('ADK_TERMINAL_STATE_KEYS', 'firebase_save_result').split(',') if k.strip())
+ADK_TERMINAL_AUTHORS = tuple(a.strip() for a in os.getenv('ADK_TERMINAL_AUTHORS', '').split(',') if a.strip())
+
+_http_session = None
+_http_session_pid = None
+_http_session_lock = threading.Lock()
+
+def get_http_session():
+    """Process-wide keep-alive session shared by every ADKClient (rebuilt after a fork)."""
+    global _http_session, _http_session_pid
+    with _http_session_lock:
+        if _http_session is None or _http_session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=ADK_POOL_SIZE, pool_maxsize=ADK_POOL_SIZE)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_session, _http_session_pid = session, os.getpid()
+        return _http_session
+
+def parse_sse_line(line):
+    """Parse one SSE line (bytes or str); returns the event dict, or None for comments/blank/undecodable lines."""
+    if isinstance(line, str):
+        line = line.encode('utf-8')
+    line = line.rstrip(b'\r\n')
+    if line.startswith(b'data: '):
+        json_bytes = line[len(b'data: '):].strip()
+        if json_bytes:
+            try:
+                return json.loads(json_bytes) # json accepts UTF-8 bytes, no separate decode pass
+            except json.JSONDecodeError:
+                logging.warning(f"Error decoding SSE event ({len(json_bytes)} bytes): {json_bytes[:200]!r}")
+    elif line.strip():
+        logging.debug(f"Non-data line: {line[:200]!r}")
+    return None
+
+def event_state_keys(event):
+    return list(((event.get('actions') or {}).get('stateDelta') or {}).keys())
+
+def is_terminal_event(event, terminal_authors=(), terminal_state_keys=()):
+    """
+    True when the event ends the part of the run the caller is waiting for: its state delta
+    sets one of terminal_state_keys, or it is a final response (no function call/response
+    parts) from one of terminal_authors.
+    """
+    if terminal_state_keys and any(key in terminal_state_keys for key in event_state_keys(event)):
+        return True
+    if terminal_authors and event.get('author') in terminal_authors:
+        parts = (event.get('content') or {}).get('parts') or []
+        return not any('functionCall' in part or 'functionResponse' in part for part in parts)
+    return False
+
+def progress_info(event, events, started):
+    """Summary passed to on_progress callbacks (never the full event payload)."""
+    return {
+        'events': events,
+        'author': event.get('author'),
+        'state_keys': event_state_keys(event),
+        'elapsed': round(time.perf_counter() - started, 3),
+    }
+
+def follow_events(events, terminal_authors=(), terminal_state_keys=(), on_progress=None, started=None):
+    """
+    Yield events (dicts) until the first terminal one, calling on_progress(progress_info) for each.
+    Shared by the HTTP client and the in-process runner (adk_inprocess.py).
+    """
+    started = started or time.perf_counter()
+    count = 0
+    for event in events:
+        count += 1
+        if on_progress:
+            on_progress(progress_info(event, count, started))
+        yield event
+        if is_terminal_event(event, terminal_authors, terminal_state_keys):
+            logging.info(f"Terminal event from {event.get('author')} after {count} events, closing stream")
+            return
+
+def state_values(events, key):
+    """Values written to a session state key over the events, in order."""
+    return [event['actions']['stateDelta'][key] for event in events or [] if key in event_state_keys(event)]
+
+def extract_saved_categories(events, state_key='firebase_save_result'):
+    """
+    Return the category list the pipeline saved (the `data` of the last
+    firebase_save_result written by the response agent), or None when the run
+    did not save anything.
+    """
+    for event in reversed(events or []):
+        saved = ((event.get('actions') or {}).get('stateDelta') or {}).get(state_key)
+        if not isinstance(saved, dict) or 'result' not in saved:
+            continue
+        if saved.get('result') != 'success':
+            return None
+        data = saved.get('data')
+        if isinstance(data, dict):
+            data = data.get('categories')
+        return data if isinstance(data, list) else None
+    return None
+
 class ADKClient:
-    def __init__(self, adk_url, app_name, user_id="user", session_id=None):
+    def __init__(self, adk_url, app_name, user_id="user", session_id=None, http_session=None, timeout=None):
         self.adk_url = adk_url.rstrip('/')
         self.app_name = app_name
         self.user_id = user_id
         self.session_id = session_id
         self.headers = {"Content-Type": "application/json"}
+        self.http = http_session or self.default_http_session()
+        self.timeout = timeout or (ADK_CONNECT_TIMEOUT, ADK_READ_TIMEOUT)
+
+    def default_http_session(self):
+        """HTTP session used when none is passed: the process-wide requests pool."""
+        return get_http_session()
 
     def random_session_url(self):
         return f"{self.adk_url}/apps/{self.app_name}/users/{self.user_id}/sessions"
@@ -25,9 +138,9 @@ class ADKClient:
 
         try:
             if method.upper() == "POST":
-                resp = requests.post(url, headers=self.headers, data=json.dumps(payload))
+                resp = self.http.post(url, headers=self.headers, data=json.dumps(payload), timeout=self.timeout)
             elif method.upper() == "GET":
-                resp = requests.get(url, headers=self.headers)
+                resp = self.http.get(url, headers=self.headers, timeout=self.timeout)
             else:
                 raise ValueError("method must be 'POST' or 'GET'")
             resp.raise_for_status()
@@ -38,13 +151,8 @@ class ADKClient:
                 logging.error(f"Server response: {e.response.text}")
             return None
 
-    def run_sse(self, session_id, prompt_text, streaming=False):
-        """
-        Sends a message to the run_sse endpoint using the given session_id and prompt_text.
-        Returns a list of parsed event JSONs (raw).
-        """
-        url = f"{self.adk_url}/run_sse"
-        payload = {
+    def run_sse_payload(self, session_id, prompt_text, streaming=False):
+        return {
             "appName": self.app_name,
             "userId": self.user_id,
             "sessionId": session_id,
@@ -55,29 +163,32 @@ class ADKClient:
             "streaming": streaming
         }
 
-        logging.info(f"POST {url} with: {json.dumps(payload, indent=2)}")
-
-        try:
-            response = requests.post(url, headers=self.headers, data=json.dumps(payload), stream=True)
+    def iter_sse(self, session_id, prompt_text, streaming=False, terminal_authors=ADK_TERMINAL_AUTHORS,
+                 terminal_state_keys=ADK_TERMINAL_STATE_KEYS, on_progress=None):
+        """
+        Sends a message to the run_sse endpoint and yields parsed events as they arrive.
+        The stream is closed right after the first terminal event (see is_terminal_event).
+        on_progress(info) is called for every event with a small summary (see progress_info).
+        Raises requests.exceptions.RequestException on transport errors.
+        """
+        url = f"{self.adk_url}/run_sse"
+        payload = self.run_sse_payload(session_id, prompt_text, streaming)
+        logging.info(f"POST {url} for session {session_id} ({len(prompt_text)} prompt chars)")
+        started = time.perf_counter()
+        with self.http.post(url, headers=self.headers, data=json.dumps(payload), stream=True, timeout=self.timeout) as response:
             response.raise_for_status()
+            # chunk_size=None hands over data as soon as it arrives instead of waiting for 512-byte chunks
+            parsed = (parse_sse_line(line) for line in response.iter_lines(chunk_size=None))
+            yield from follow_events((event for event in parsed if event is not None),
+                                     terminal_authors, terminal_state_keys, on_progress, started)
 
-            all_events = []
-
-            for line in response.iter_lines():
-                line = line.decode('utf-8')
-                if line.startswith('data: '):
-                    json_str = line[len('data: '):].strip()
-                    if json_str:
-                        try:
-                            event_data = json.loads(json_str)
-                            all_events.append(event_data)
-                        except json.JSONDecodeError:
-                            logging.warning(f"Error decoding: {json_str}")
-                elif line.strip():
-                    logging.info(f"Non-data line: {line}")
-
-            return all_events
-
+    def run_sse(self, session_id, prompt_text, streaming=False):
+        """
+        Sends a message to the run_sse endpoint using the given session_id and prompt_text.
+        Returns a list of parsed event JSONs (raw), read until the stream closes.
+        """
+        try:
+            return list(self.iter_sse(session_id, prompt_text, streaming, terminal_authors=(), terminal_state_keys=()))
         except requests.exceptions.RequestException as e:
             logging.error(f"Error in run_sse: {e}")
             return None
@@ -227,4 +338,86 @@ class ADKClient:
             return value
         except Exception as e:
             logging.warning(f"Failed to parse JSON: {e}")
-            return {}
\ No newline at end of file
+            return {}
+
+class AsyncADKClient(ADKClient):
+    """
+    asyncio variant of ADKClient (requires aiohttp) with the same methods as coroutines.
+    Pass a shared aiohttp.ClientSession to pool connections across clients; otherwise the
+    client owns one, released by close() or `async with`.
+    """
+    def __init__(self, adk_url, app_name, user_id="user", session_id=None, http_session=None, timeout=None):
+        import aiohttp
+        self._aiohttp = aiohttp
+        super().__init__(adk_url, app_name, user_id=user_id, session_id=session_id, http_session=http_session, timeout=timeout)
+        self._owns_http = http_session is None
+        self.client_timeout = aiohttp.ClientTimeout(connect=self.timeout[0], sock_read=self.timeout[1])
+
+    def _session(self):
+        if self.http is None or self.http.closed:
+            connector = self._aiohttp.TCPConnector(limit=ADK_POOL_SIZE, keepalive_timeout=60)
+            # SSE events carry whole receipts in their state deltas; allow lines larger than the 64 KiB default
+            self.http = self._aiohttp.ClientSession(connector=connector, timeout=self.client_timeout, read_bufsize=2 ** 20)
+            self._owns_http = True
+        return self.http
+
+    def default_http_session(self):
+        return None # created lazily by _session(), on the running event loop
+
+    async def close(self):
+        if self._owns_http and self.http is not None and not self.http.closed:
+            await self.http.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def get_or_create_session(self, method="POST", payload={}, custom_session=False):
+        if self.session_id is None or not custom_session:
+            url = self.random_session_url()
+        else:
+            url = self.custom_session_url()
+        payload = payload or {}
+        if method.upper() not in ("POST", "GET"):
+            raise ValueError("method must be 'POST' or 'GET'")
+        try:
+            data = json.dumps(payload) if method.upper() == "POST" else None
+            async with self._session().request(method.upper(), url, headers=self.headers, data=data) as resp:
+                if resp.status >= 400:
+                    logging.error(f"Server response: {await resp.text()}")
+                resp.raise_for_status()
+                return await resp.json()
+        except self._aiohttp.ClientError as e:
+            logging.error(f"Error with {method} request to {url}: {e}")
+            return None
+
+    async def iter_sse(self, session_id, prompt_text, streaming=False, terminal_authors=ADK_TERMINAL_AUTHORS,
+                       terminal_state_keys=ADK_TERMINAL_STATE_KEYS, on_progress=None):
+        """Async-iterator version of ADKClient.iter_sse (raises aiohttp.ClientError on transport errors)."""
+        url = f"{self.adk_url}/run_sse"
+        payload = self.run_sse_payload(session_id, prompt_text, streaming)
+        logging.info(f"POST {url} for session {session_id} ({len(prompt_text)} prompt chars)")
+        started = time.perf_counter()
+        events = 0
+        async with self._session().post(url, headers=self.headers, data=json.dumps(payload)) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                event_data = parse_sse_line(line)
+                if event_data is None:
+                    continue
+                events += 1
+                if on_progress:
+                    on_progress(progress_info(event_data, events, started))
+                yield event_data
+                if is_terminal_event(event_data, terminal_authors, terminal_state_keys):
+                    logging.info(f"Terminal event from {event_data.get('author')} after {events} events, closing stream")
+                    return
+
+    async def run_sse(self, session_id, prompt_text, streaming=False):
+        try:
+            return [event async for event in self.iter_sse(session_id, prompt_text, streaming, terminal_authors=(), terminal_state_keys=())]
+        except self._aiohttp.ClientError as e:
+            logging.error(f"Error in run_sse: {e}")
+            return None
@@ -1,9 +1,13 @@
 import os
+import json
 import logging
+import functools
+import threading
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from google.cloud import documentai_v1 as documentai
 from google.protobuf.json_format import MessageToDict
+from line_item_parser import entity_properties
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
@@ -26,41 +30,152 @@ def set_gc_credentials():
 
 set_gc_credentials()
 
+# Number of Document AI clients (each with its own gRPC channel) shared by the process
+DOCUMENT_AI_POOL_SIZE = int(os.getenv('DOCUMENT_AI_POOL_SIZE', 2))
+DOCUMENT_AI_WARMUP = os.getenv('DOCUMENT_AI_WARMUP', 'False').lower() == 'true'
+# When False the full Document dict is never built: only the entities are read from the proto
+STORE_RAW_DOCUMENT = os.getenv('STORE_RAW_DOCUMENT', 'True').lower() == 'true'
+
+@functools.lru_cache(maxsize=None)
 def parse_processor_url(url):
     logging.info(f"Parsing processor URL: {url}")
-    parts = urlparse(url).path.strip('/').split('/')
+    parsed = urlparse(url)
+    parts = parsed.path.strip('/').split('/')
     config = {
         'project_id': parts[2],
         'location': parts[4],
-        'processor_id': parts[6].split(':')[0]
+        'processor_id': parts[6].split(':')[0],
+        'api_endpoint': parsed.netloc or None,
     }
     logging.info(f"Parsed config: {config}")
     return config
 
-def extract_receipt_data(file_path, mime_type='image/jpeg'):
-    # set_gc_credentials()
+def get_processor_config():
     processor_url = os.getenv('DOCUMENT_AI_PROCESSOR_URL')
     if not processor_url:
         msg = "DOCUMENT_AI_PROCESSOR_URL environment variable is not set"
         logging.error(msg)
         raise ValueError(msg)
-    config = parse_processor_url(processor_url)
+    return parse_processor_url(processor_url)
 
-    client = documentai.DocumentProcessorServiceClient()
-    name = f"projects/{config['project_id']}/locations/{config['location']}/processors/{config['processor_id']}"
-    logging.info(f"Processor name: {name}")
+def _default_client_factory():
+    config = get_processor_config()
+    client_options = {'api_endpoint': config['api_endpoint']} if config['api_endpoint'] else None
+    return documentai.DocumentProcessorServiceClient(client_options=client_options)
 
-    with open(file_path, 'rb') as f:
-        image_data = f.read()
-    logging.info(f"Read image data ({len(image_data)} bytes) from {file_path}")
+class DocumentAIClientManager:
+    """
+    Process-wide pool of Document AI clients.
+    Clients (and their gRPC channels / TLS sessions) are created once and handed
+    out round-robin. The pool is dropped in forked children (gunicorn workers)
+    because gRPC channels must not be shared across a fork.
+    """
+    def __init__(self, pool_size=DOCUMENT_AI_POOL_SIZE, client_factory=None):
+        self.pool_size = max(1, pool_size)
+        self.client_factory = client_factory or _default_client_factory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._clients = []
+        self._next = 0
+        self._pid = os.getpid()
+
+    def reset_after_fork(self):
+        # Do not close the parent's channels from the child, just forget them
+        self._lock = threading.Lock()
+        self._reset()
+
+    def get_client(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if len(self._clients) < self.pool_size:
+                self._clients.append(self.client_factory())
+                logging.info(f"Created Document AI client {len(self._clients)}/{self.pool_size}")
+                return self._clients[-1]
+            client = self._clients[self._next % len(self._clients)]
+            self._next += 1
+            return client
+
+    def warm_up(self):
+        """Create every pooled client up front (and validate the processor URL)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            while len(self._clients) < self.pool_size:
+                self._clients.append(self.client_factory())
+        logging.info(f"Warmed up {len(self._clients)} Document AI clients")
+
+_client_manager = DocumentAIClientManager()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_client_manager.reset_after_fork)
+
+def get_client_manager():
+    return _client_manager
+
+def warm_up_document_ai():
+    _client_manager.warm_up()
+
+def get_processor_name():
+    config = get_processor_config()
+    return f"projects/{config['project_id']}/locations/{config['location']}/processors/{config['processor_id']}"
+
+def process_receipt(image_data, mime_type='image/jpeg'):
+    """Run Document AI on the image bytes and return the Document proto (no dict conversion)."""
+    client = _client_manager.get_client()
+    name = get_processor_name()
+    logging.info(f"Processor name: {name}")
 
     raw_document = documentai.RawDocument(content=image_data, mime_type=mime_type)
     request = documentai.ProcessRequest(name=name, raw_document=raw_document)
-    logging.info("Sending request to Document AI")
+    logging.info(f"Sending request to Document AI ({len(image_data)} bytes)")
     result = client.process_document(request=request)
     logging.info("Received response from Document AI")
+    return result.document
 
-    document_dict = MessageToDict(result._pb.document, preserving_proto_field_name=True)
+def group_entities(document):
+    """Organize the top-level entities by type, straight from the proto."""
+    grouped = {}
+    for entity in document.entities:
+        grouped.setdefault(entity.type_, []).append(entity.mention_text)
+    return grouped
+
+def line_item_properties(document):
+    """Properties of each line_item entity (see line_item_parser.entity_properties), aligned with group_entities()['line_item']."""
+    return [entity_properties(entity) for entity in document.entities if entity.type_ == 'line_item']
+
+def document_to_dict(document):
+    """Full Document -> dict conversion (pages, tokens, layout...). Only needed for raw storage."""
+    document_dict = MessageToDict(document._pb, preserving_proto_field_name=True)
     logging.info("Converted Document AI response to dict")
+    return document_dict
+
+def replace_nested_lists_with_json(obj):
+    if isinstance(obj, list):
+        new_list = []
+        for item in obj:
+            if isinstance(item, list):
+                # If the item is a list, replace with its JSON string
+                new_list.append(json.dumps(item))
+            elif isinstance(item, dict):
+                new_list.append(replace_nested_lists_with_json(item))
+            else:
+                new_list.append(item)
+        return new_list
+    elif isinstance(obj, dict):
+        # For each dict value, check for lists, dicts, or other types
+        return {k: replace_nested_lists_with_json(v) for k, v in obj.items()}
+    else:
+        return obj
 
-    return document_dict, result.document
+def extract_receipt_data_from_bytes(image_data, mime_type='image/jpeg'):
+    document = process_receipt(image_data, mime_type)
+    return document_to_dict(document), document
+
+def extract_receipt_data(file_path, mime_type='image/jpeg'):
+    # set_gc_credentials()
+    with open(file_path, 'rb') as f:
+        image_data = f.read()
+    logging.info(f"Read image data ({len(image_data)} bytes) from {file_path}")
+    return extract_receipt_data_from_bytes(image_data, mime_type)
@@ -0,0 +1,8 @@
+# gunicorn.conf.py
+# gRPC channels cannot cross a fork: gcp_docai drops its client pool in every
+# worker, so warm it up again here when DOCUMENT_AI_WARMUP is enabled.
+
+def post_fork(server, worker):
+    from gcp_docai import warm_up_document_ai, DOCUMENT_AI_WARMUP
+    if DOCUMENT_AI_WARMUP:
+        warm_up_document_ai()
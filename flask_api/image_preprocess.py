@@ -0,0 +1,81 @@
+"""
+Pre-OCR image normalisation.
+
+Phone photos arrive as multi-megabyte originals. Before Document AI they can be
+auto-rotated (EXIF), downscaled, converted to greyscale and re-encoded as JPEG,
+which cuts upload bytes and OCR latency without hurting text recognition.
+"""
+import io
+import logging
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+OCR_PREPROCESS = os.getenv('OCR_PREPROCESS', 'False').lower() == 'true'
+OCR_MAX_DIMENSION = int(os.getenv('OCR_MAX_DIMENSION', 2000))
+OCR_GRAYSCALE = os.getenv('OCR_GRAYSCALE', 'True').lower() == 'true'
+OCR_JPEG_QUALITY = int(os.getenv('OCR_JPEG_QUALITY', 85))
+
+_SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'BM', 'image/bmp'),
+    (b'%PDF', 'application/pdf'),
+]
+
+def detect_mime_type(image_data, default='image/jpeg'):
+    """Detect the real file type from its magic bytes (uploads are not always JPEG)."""
+    for signature, mime_type in _SIGNATURES:
+        if image_data.startswith(signature):
+            return mime_type
+    if image_data[:4] == b'RIFF' and image_data[8:12] == b'WEBP':
+        return 'image/webp'
+    if image_data[4:12] in (b'ftypheic', b'ftypheix', b'ftypmif1'):
+        return 'image/heic'
+    return default
+
+def preprocess_image(image_data, max_dimension=OCR_MAX_DIMENSION, grayscale=OCR_GRAYSCALE, jpeg_quality=OCR_JPEG_QUALITY):
+    """
+    Normalise an image for OCR.
+    Returns (image_bytes, mime_type, stats). The original bytes are returned when the
+    file is not an image Pillow can handle or when re-encoding would not help.
+    """
+    mime_type = detect_mime_type(image_data)
+    stats = {'original_bytes': len(image_data), 'processed_bytes': len(image_data), 'mime_type': mime_type, 'changed': False}
+    if mime_type == 'application/pdf':
+        return image_data, mime_type, stats
+    try:
+        from PIL import Image, ImageOps
+        with Image.open(io.BytesIO(image_data)) as img:
+            stats['original_size'] = list(img.size)
+            needs_rotation = img.getexif().get(0x0112, 1) != 1 # EXIF Orientation tag
+            rotated = ImageOps.exif_transpose(img)
+            needs_resize = max(rotated.size) > max_dimension
+            if needs_resize:
+                rotated.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            rotated = rotated.convert('L' if grayscale else 'RGB')
+            buffer = io.BytesIO()
+            rotated.save(buffer, format='JPEG', quality=jpeg_quality, optimize=True)
+            stats['processed_size'] = list(rotated.size)
+    except Exception as e:
+        logging.warning(f"Image preprocessing skipped ({mime_type}): {e}")
+        return image_data, mime_type, stats
+    processed = buffer.getvalue()
+    if len(processed) >= len(image_data) and not needs_resize and not needs_rotation:
+        # Already small enough; keep the original encoding
+        return image_data, mime_type, stats
+    stats.update({'processed_bytes': len(processed), 'mime_type': 'image/jpeg', 'changed': True})
+    logging.info(f"Preprocessed image {stats['original_size']} -> {stats['processed_size']}, {len(image_data)} -> {len(processed)} bytes")
+    return processed, 'image/jpeg', stats
+
+def prepare_for_ocr(image_data):
+    """Apply the configured preprocessing (OCR_PREPROCESS) and return (image_bytes, mime_type, stats)."""
+    if OCR_PREPROCESS:
+        return preprocess_image(image_data)
+    mime_type = detect_mime_type(image_data)
+    return image_data, mime_type, {'original_bytes': len(image_data), 'processed_bytes': len(image_data), 'mime_type': mime_type, 'changed': False}
@@ -0,0 +1,233 @@
+"""
+Learned item -> category cache.
+
+Receipts from the same places repeat the same line items ("Blue Moon Tap",
+"Fren Onion Soup"). Every successfully classified receipt records which category
+each item ended up in; items seen often enough with a stable category are then
+classified locally and only the unknown items are sent to the ADK pipeline.
+The cache is seeded from the historical SUMMARISED_DATA (see seed_item_cache.py).
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from decimal import Decimal, InvalidOperation
+
+# "2 Bread 1.05", "1x Coffee $3.50", "Blue Moon Tap 5.50"
+LINE_ITEM_RE = re.compile(r'^\s*(?:(\d+(?:\.\d+)?)\s*[xX]?\s+)?(.+?)\s+\$?(-?\d+[.,]\d{1,2})\s*$')
+EXCLUDED_CATEGORIES = ('Tax',)
+
+def parse_line_item(line):
+    """Split an OCR line item into {'item', 'quantity', 'price'}; None when no trailing price is found."""
+    match = LINE_ITEM_RE.match(line or '')
+    if not match:
+        return None
+    quantity, item, price = match.groups()
+    return {'item': item.strip(), 'quantity': quantity or '1', 'price': price.replace(',', '.')}
+
+def normalize_item(name):
+    return ' '.join(re.sub(r'[^\w&%+]+', ' ', name.lower()).split())
+
+def item_key(name):
+    return hashlib.sha1(normalize_item(name).encode('utf-8')).hexdigest()
+
+def count_item_categories(summaries):
+    """
+    Count item -> category observations in summarised receipts (lists of
+    {'category', 'items', 'total_price'}). Returns {key: {'item', 'counts'}}.
+    """
+    entries = {}
+    for categories in summaries:
+        for group in categories or []:
+            category = group.get('category')
+            if not category or category in EXCLUDED_CATEGORIES:
+                continue
+            for item in group.get('items') or []:
+                if not isinstance(item, str) or not normalize_item(item):
+                    continue
+                entry = entries.setdefault(item_key(item), {'item': item, 'counts': {}})
+                entry['counts'][category] = entry['counts'].get(category, 0) + 1
+    return entries
+
+def _to_decimal(value):
+    try:
+        return Decimal(str(value).replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        return None
+
+def group_known_items(known):
+    """Group locally classified items into the SUMMARISED_DATA category schema."""
+    groups = {}
+    for entry in known:
+        group = groups.setdefault(entry['category'], {'category': entry['category'], 'items': [], 'total': Decimal('0')})
+        group['items'].append(entry['item'])
+        group['total'] += _to_decimal(entry['price'])
+    return [{'category': g['category'], 'items': g['items'], 'total_price': f"{g['total']:.2f}"} for g in groups.values()]
+
+def merge_categories(*category_lists):
+    """Merge category lists, concatenating items and summing total_price per category."""
+    merged = {}
+    for categories in category_lists:
+        for group in categories or []:
+            total = _to_decimal(group.get('total_price', '0')) or Decimal('0')
+            target = merged.setdefault(group['category'], {'category': group['category'], 'items': [], 'total': Decimal('0')})
+            target['items'] += list(group.get('items') or [])
+            target['total'] += total
+    return [{'category': g['category'], 'items': g['items'], 'total_price': f"{g['total']:.2f}"} for g in merged.values()]
+
+def adjusted_totals(receipt_total_value, known_total):
+    """Receipt totals left for the items the pipeline still has to classify."""
+    adjusted = dict(receipt_total_value)
+    for key in ('total_amount', 'net_amount'):
+        value = _to_decimal(receipt_total_value.get(key))
+        if value is not None:
+            adjusted[key] = f"{value - known_total:.2f}"
+    return adjusted
+
+class StoredItemCategories:
+    """
+    Learned items on the STORAGE_BACKEND (Firestore ITEM_CATEGORIES/{key} documents or the
+    SQLite item tables), as {key: {'item', 'counts': {category: n}}}.
+    """
+    def __init__(self):
+        from firebase_store import get_item_categories, record_item_categories
+        self.load, self.record = get_item_categories, record_item_categories
+
+class ItemCategoryCache:
+    def __init__(self, store=None, min_count=2, min_share=0.8, refresh_seconds=600):
+        """
+        store: optional persistence with load(keys) -> {key: entry} (the stored entries among
+            keys) and record({key: {'item', 'category'}}).
+        min_count / min_share: an item is classified locally once it was seen at least min_count
+            times and its most frequent category accounts for at least min_share of them.
+        refresh_seconds: how long a loaded entry (or a key the store doesn't have) is trusted
+            before it is read again, to pick up what other workers learned.
+        """
+        self.store = store
+        self.min_count = min_count
+        self.min_share = min_share
+        self.refresh_seconds = refresh_seconds
+        self._entries = {} # key -> entry, None when the store has none
+        self._loaded_at = {} # key -> time it was read from the store
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.learned = 0
+        self.receipts = {'local': 0, 'partial': 0, 'llm': 0}
+
+    def _refresh(self, keys):
+        """Read the given keys from the store unless they were read within refresh_seconds."""
+        if self.store is None:
+            return
+        now = time.time()
+        with self._lock:
+            stale = sorted({key for key in keys if now - self._loaded_at.get(key, 0) >= self.refresh_seconds})
+        if not stale:
+            return
+        try:
+            entries = self.store.load(stale)
+        except Exception as e:
+            logging.error(f"Failed to load item categories: {e}")
+            entries = None
+        with self._lock:
+            for key in stale:
+                if entries is not None:
+                    self._entries[key] = entries.get(key)
+                self._loaded_at[key] = now
+
+    def category_for(self, name):
+        """Return the learned category for an item name, or None when unknown/ambiguous."""
+        key = item_key(name)
+        self._refresh([key])
+        return self._category(key)
+
+    def _category(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            counts = dict(entry['counts']) if entry else {}
+        seen = sum(counts.values())
+        if seen >= self.min_count:
+            category, votes = max(counts.items(), key=lambda kv: kv[1])
+            if votes / seen >= self.min_share:
+                return category
+        return None
+
+    def split_line_items(self, line_items):
+        """
+        Partition OCR line items into (known, unknown): known entries are dicts with
+        item/quantity/price/category, unknown are the original line strings.
+        """
+        parsed_lines = [(line, parse_line_item(line)) for line in line_items]
+        self._refresh([item_key(parsed['item']) for _, parsed in parsed_lines if parsed]) # one read for the receipt
+        known, unknown = [], []
+        for line, parsed in parsed_lines:
+            category = self._category(item_key(parsed['item'])) if parsed else None
+            if category:
+                known.append({**parsed, 'category': category})
+            else:
+                unknown.append(line)
+        with self._lock:
+            self.hits += len(known)
+            self.misses += len(unknown)
+            if line_items:
+                self.receipts['llm' if not known else 'partial' if unknown else 'local'] += 1
+        return known, unknown
+
+    def learn(self, categories):
+        """Record the final categories of a successfully classified receipt."""
+        observations = {}
+        for key, entry in count_item_categories([categories]).items():
+            for category in entry['counts']:
+                observations[key] = {'item': entry['item'], 'category': category}
+        if not observations:
+            return
+        with self._lock:
+            for key, observation in observations.items():
+                entry = self._entries.get(key) or {'item': observation['item'], 'counts': {}}
+                self._entries[key] = entry
+                entry['counts'][observation['category']] = entry['counts'].get(observation['category'], 0) + 1
+            self.learned += len(observations)
+        if self.store is not None:
+            try:
+                self.store.record(observations)
+            except Exception as e:
+                logging.error(f"Failed to record item categories: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': sum(1 for entry in self._entries.values() if entry),
+                'item_hits': self.hits,
+                'item_misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'receipts': dict(self.receipts),
+                'learned': self.learned,
+            }
+
+def create_item_cache():
+    """
+    Build the cache configured by ITEM_CACHE_BACKEND: 'store' (learned items kept on the
+    STORAGE_BACKEND and shared by every worker), 'memory' (per process) or 'none' (default).
+    Returns None when disabled: every line item goes to the pipeline.
+    """
+    backend = os.getenv('ITEM_CACHE_BACKEND', 'none').lower()
+    if backend == 'firestore':
+        logging.warning("ITEM_CACHE_BACKEND=firestore is now called 'store'")
+        backend = 'store'
+    if backend == 'store':
+        store = StoredItemCategories()
+    elif backend == 'memory':
+        store = None
+    else:
+        logging.info("Item category cache disabled")
+        return None
+    logging.info(f"Item category cache enabled: backend={backend}")
+    return ItemCategoryCache(
+        store,
+        min_count=int(os.getenv('ITEM_CACHE_MIN_COUNT', 2)),
+        min_share=float(os.getenv('ITEM_CACHE_MIN_SHARE', 0.8)),
+        refresh_seconds=int(os.getenv('ITEM_CACHE_REFRESH_SECONDS', 600)),
+    )
@@ -0,0 +1,102 @@
+"""
+Deterministic parsing of receipt line items into name, quantity and prices.
+
+The Document AI expense parser returns each line_item entity with properties
+(line_item/description, line_item/quantity, line_item/unit_price,
+line_item/amount); when they are available they are used, otherwise the line text
+("1 Pork Chop 21.95", "Mozzarella&Tomato 9.95") is parsed. Every item gets a
+confidence score, so the caller can hand the LLM only the category decision when
+all items parsed cleanly and fall back to full LLM classification otherwise.
+"""
+from decimal import Decimal, InvalidOperation
+from item_cache import LINE_ITEM_RE
+
+PROPERTY_FIELDS = {
+    'line_item/description': 'description',
+    'line_item/quantity': 'quantity',
+    'line_item/unit_price': 'unit_price',
+    'line_item/amount': 'amount',
+}
+CENT = Decimal('0.01')
+
+def to_decimal(value):
+    """Parse "21.95", "$21.95", "21,95" or "1,299.00" as a Decimal; None when it isn't a number."""
+    if value is None:
+        return None
+    text = str(value).replace('$', '').replace(' ', '').strip()
+    if ',' in text and '.' in text:
+        text = text.replace(',', '') # thousands separator
+    else:
+        text = text.replace(',', '.')
+    try:
+        return Decimal(text)
+    except (InvalidOperation, ValueError):
+        return None
+
+def entity_properties(entity):
+    """{'description', 'quantity', 'unit_price', 'amount'} of a Document AI line_item entity (proto)."""
+    properties = {}
+    for prop in entity.properties:
+        field = PROPERTY_FIELDS.get(prop.type_)
+        if field:
+            properties[field] = prop.mention_text or prop.normalized_value.text
+    return properties
+
+def _from_text(line):
+    match = LINE_ITEM_RE.match(line or '')
+    if not match:
+        return {'item': ' '.join(str(line or '').split()), 'quantity': Decimal('1'), 'unit_price': None,
+                'price': None, 'confidence': 0.0, 'source': 'unparsed'}
+    quantity, item, price = match.groups()
+    price = to_decimal(price)
+    confidence = 0.9 if quantity else 0.8 # quantity defaulted to 1
+    if ',' in match.group(3):
+        confidence -= 0.1 # decimal comma: could be a thousands separator
+    quantity = to_decimal(quantity) or Decimal('1')
+    return {'item': item.strip(), 'quantity': quantity, 'unit_price': (price / quantity).quantize(CENT) if quantity else None,
+            'price': price, 'confidence': round(confidence, 2), 'source': 'text'}
+
+def _from_properties(line, properties):
+    parsed = _from_text(line)
+    description = ' '.join((properties.get('description') or '').split())
+    quantity = to_decimal(properties.get('quantity'))
+    unit_price = to_decimal(properties.get('unit_price'))
+    amount = to_decimal(properties.get('amount'))
+    if amount is None and quantity and unit_price is not None:
+        amount = (quantity * unit_price).quantize(CENT)
+    if not description or amount is None:
+        return parsed # not enough structure, keep the text parse
+    quantity = quantity or parsed['quantity']
+    confidence = 0.95
+    if unit_price is not None and abs(quantity * unit_price - amount) < CENT:
+        confidence = 1.0 # quantity x unit price agrees with the amount
+    if parsed['price'] is not None and parsed['price'] != amount:
+        confidence = min(confidence, 0.7) # text and entity disagree
+    return {'item': description, 'quantity': quantity,
+            'unit_price': unit_price if unit_price is not None else (amount / quantity).quantize(CENT),
+            'price': amount, 'confidence': confidence, 'source': 'entity'}
+
+def parse_line_item(line, properties=None):
+    """
+    Parse one line item.
+
+    Returns:
+        {'item', 'quantity': Decimal, 'unit_price': Decimal or None, 'price': Decimal or None (line total),
+         'confidence': 0..1, 'source': 'entity' | 'text' | 'unparsed', 'line'}
+    """
+    parsed = _from_properties(line, properties) if properties else _from_text(line)
+    parsed['line'] = line
+    return parsed
+
+def parse_line_items(line_items, properties=None):
+    """Parse lines; properties maps line text -> entity properties (see properties_by_line)."""
+    properties = properties or {}
+    return [parse_line_item(line, properties.get(line)) for line in line_items]
+
+def properties_by_line(line_items, properties):
+    """Map line text -> properties from the aligned lists of line_item mentions and their properties."""
+    return {line: props for line, props in zip(line_items or [], properties or []) if props}
+
+def prompt_items(parsed_items):
+    """The parsed items as sent to the pipeline: strings, no confidence/source fields."""
+    return [{'item': p['item'], 'quantity': f"{p['quantity'].normalize():f}", 'price': f"{p['price']:.2f}"} for p in parsed_items]
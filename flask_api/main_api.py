@@ -1,18 +1,35 @@
 from flask import Flask, request, jsonify, send_from_directory, render_template, url_for
 # from flask_cors import CORS
-import os, logging, json # , base64, sys
+import os, logging, json, time # , base64, sys
 import uuid
 from dotenv import load_dotenv
-from gcp_docai import extract_receipt_data #, set_gc_credentials
+from gcp_docai import (
+    process_receipt, group_entities, line_item_properties, document_to_dict, replace_nested_lists_with_json,
+    warm_up_document_ai, DOCUMENT_AI_WARMUP, STORE_RAW_DOCUMENT
+) #, set_gc_credentials
 from firebase_store import (
     get_primary_id, create_user,
-    save_session_meta, save_raw_data, save_receipt_data, # save_summarised_data,
-    authenticate, login_check, get_all_summarised_data_as_df, get_user_document
+    save_session_meta, save_raw_data, save_receipt_data, save_summarised_data,
+    authenticate, login_check, get_all_summarised_data_as_df, get_user_document,
+    get_spend_aggregates, rebuild_spend_aggregates, save_job_status, get_job_status,
+    save_agent_metrics
 )
-from gcp_adk_classification import ADKClient
+from spend_aggregates import summary_from_aggregates
+from gcp_adk_classification import ADKClient, extract_saved_categories, state_values
+from adk_inprocess import InProcessPipeline, InProcessADKClient, is_inprocess
+from upload_jobs import UploadJobQueue, QueueFullError
+from ocr_cache import create_ocr_cache, image_key
+from image_preprocess import prepare_for_ocr
+from upload_archive import create_upload_archive
+from raw_archive import create_raw_archive
+from item_cache import create_item_cache, group_known_items, merge_categories, adjusted_totals, parse_line_item
+from prompt_builder import build_classification_prompt
+from line_item_parser import properties_by_line
+from agent_metrics import AgentMetrics, summarize_events
+from batch_classification import ClassificationBatcher, build_batch_prompt, split_batch_results, saved_categories, CLASSIFY_BATCH_SIZE
 from datetime import datetime
-import pandas as pd
-import calendar
+from decimal import Decimal
+from collections import Counter
 
 code_dir = os.path.dirname(os.path.abspath(__file__))
 DASHBOARD_DIR = os.path.join(code_dir, "dashboard") # Directory to serve the dashboard HTML from
@@ -22,10 +39,24 @@ load_dotenv()
 API_PORT = int(os.getenv('API_PORT', 8080))
 CLASSIFICATION_URL = os.getenv('CLASSIFICATION_URL', 'http://localhost:8000')
 CLASSIFICATION_APP = os.getenv('CLASSIFICATION_APP_NAME', 'receipt-classifier')
+UPLOAD_MODE = os.getenv('UPLOAD_MODE', 'sync').lower() # 'sync' or 'async' (202 + background job)
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', 4))
+UPLOAD_QUEUE_SIZE = int(os.getenv('UPLOAD_QUEUE_SIZE', 100))
+UPLOAD_OCR_CONCURRENCY = int(os.getenv('UPLOAD_OCR_CONCURRENCY', 4))
+UPLOAD_PERSIST_CONCURRENCY = int(os.getenv('UPLOAD_PERSIST_CONCURRENCY', 4))
+UPLOAD_CLASSIFY_CONCURRENCY = int(os.getenv('UPLOAD_CLASSIFY_CONCURRENCY', 2))
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 app = Flask(__name__, template_folder=DASHBOARD_DIR)
+ocr_cache = create_ocr_cache()
+upload_archive = create_upload_archive()
+raw_archive = create_raw_archive()
+item_cache = create_item_cache()
+pipeline_counters = Counter() # Pipeline outcomes seen in ADK events (e.g. refinement loops skipped/run)
+agent_metrics = AgentMetrics() # Recent per-agent latency/token summaries of ADK runs
+if DOCUMENT_AI_WARMUP:
+    warm_up_document_ai() # Under gunicorn the pool is rebuilt per worker (see gunicorn.conf.py)
 # CORS(app)  # This allows all origins; restrict for production!
 
 def safe_sum(val1, val2):
@@ -99,37 +130,14 @@ def summary():
     if not user_doc or 'auth' not in user_doc:
         return jsonify({'error': 'Unauthorized'}), 401
 
-    df = get_all_summarised_data_as_df(USERNAME=user_id)
-    if df.empty:
+    aggregates = get_spend_aggregates(user_id)
+    if aggregates is None:
+        # First request for this user: backfill the aggregates from SUMMARISED_DATA
+        aggregates = rebuild_spend_aggregates(user_id)
+    summary_payload = summary_from_aggregates(aggregates)
+    if summary_payload is None:
         return jsonify({'error': 'No data found'}), 404
-
-    total_spend = df['total'].sum()
-    avg_daily_spend = total_spend / df['date'].nunique()
-
-    category_totals = df.groupby('category')['total'].sum().to_dict()
-    top_category = max(category_totals.items(), key=lambda x: x[1])
-
-    expense_by_category = {
-        'labels': list(category_totals.keys()),
-        'values': [round(v, 2) for v in category_totals.values()]
-    }
-
-    df['weekday'] = pd.to_datetime(df['date']).dt.day_name()
-    weekly = df.groupby('weekday')['total'].sum().to_dict()
-    ordered_week = [calendar.day_name[i] for i in range(7)]
-    weekly_spending = {
-        'labels': ordered_week,
-        'values': [round(weekly.get(day, 0.0), 2) for day in ordered_week]
-    }
-
-    return jsonify({
-        'total_monthly_spend': round(total_spend, 2),
-        'average_daily_spend': round(avg_daily_spend, 2),
-        'top_category': top_category[0],
-        'top_category_total': round(top_category[1], 2),
-        'expense_by_category': expense_by_category,
-        'weekly_spending': weekly_spending
-    })
+    return jsonify(summary_payload)
 
 # def image_to_base64(image_path):
 #     with Image.open(image_path) as img:
@@ -148,6 +156,19 @@ def health_check():
         'service': 'spendify-api'
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """In-process counters for caches and background workers"""
+    return jsonify({
+        'ocr_cache': ocr_cache.stats() if ocr_cache else None,
+        'upload_jobs': upload_jobs.stats(),
+        'upload_archive': upload_archive.stats() if upload_archive else None,
+        'item_cache': item_cache.stats() if item_cache else None,
+        'adk_pipeline': dict(pipeline_counters),
+        'agents': agent_metrics.stats(),
+        'classification_batches': classification_batcher.stats() if classification_batcher else None,
+    }), 200
+
 @app.route('/register', methods=['POST'])
 def register():
     payload = request.get_json() or {}
@@ -195,92 +216,50 @@ def get_user():
         return jsonify({'error': 'not found'}), 404
     return jsonify(user_doc), 200
 
-@app.route('/upload', methods=['POST'])
-def upload():
-    logging.info("Upload endpoint hit")
-    file = request.files.get('file')
-    session_id = request.form.get('session_id')
-    identifier = request.form.get('identifier')
-    source = request.form.get('source')
-    timestamp = request.form.get('timestamp')
-    # --- Parse these with type safety ---
-    optimize = request.form.get("optimize", "True")
-    optimize = optimize if isinstance(optimize, bool) else (optimize.lower() == "true")
-    logging.info(f"Params: session_id={session_id}, identifier={identifier}, source={source}, timestamp={timestamp}")
-    if not file or not session_id or not identifier or not source or not timestamp:
-        logging.error("Missing parameters in upload request")
-        return jsonify({'error': 'Missing parameters'}), 400
-
-    # Lookup primary user
-    primary = get_primary_id(source, identifier)
-    if not primary:
-        logging.error(f"User not registered: {source}:{identifier}")
-        return jsonify({'error': 'User not registered'}), 403
-
-    # Save session metadata
-    logging.info(f"Saving session metadata for session {session_id}")
-    save_session_meta(session_id, timestamp, primary, source)
-
-    # Save uploaded file
-    upload_dir = 'uploads'
-    os.makedirs(upload_dir, exist_ok=True)
-    save_path = os.path.join(upload_dir, f'{session_id}_{file.filename}')
-    file.save(save_path)
-    logging.info(f"Saved file to {save_path}")
-
-    # Process with GCP
-    try:
-        logging.info("Calling GCP Document AI")
-        print(f"Processing file: {save_path}")
-        document_dict, document_proto = extract_receipt_data(save_path)
-        logging.info(f"GCP returned document with {len(document_proto.entities)} entities")
-
-        # Sanitize document_dict to ensure Firestore compatibility
-        try:
-            # Convert non-serializable parts to strings or standard Python dicts/lists.
-            # default=str helps convert types like datetime objects to strings if they are not already.
-            json_string = json.dumps(document_dict, default=str)
-            sanitized_document_dict = json.loads(json_string)
-        except Exception as e:
-            logging.error(f"Error sanitizing document_dict for Firestore using json.dumps/loads: {e}. Original type: {type(document_dict)}. Falling back to a basic error structure.")
-            # Fallback to a simple error structure to avoid passing potentially complex/problematic original dict
-            sanitized_document_dict = {
-                "error_message": "Failed to sanitize document_dict for Firestore.",
-                "original_type": str(type(document_dict)),
-                "exception_details": str(e)
-            }
-
-    except Exception as e:
-        logging.exception("GCP processing failed")
-        return jsonify({'error': 'GCP failed', 'details': str(e)}), 500
-
-    # Organize entities by type
-    grouped = {}
-    for entity in document_proto.entities:
-        grouped.setdefault(entity.type_, []).append(entity.mention_text)
+def ocr_stage(job):
+    """Stage 1: Document AI extraction + entity grouping (skipped on an OCR cache hit)."""
+    image_data = job['image_data']
+    cache_key = image_key(image_data)
+    cached = ocr_cache.get(cache_key) if ocr_cache else None
+    if cached:
+        logging.info(f"OCR cache hit for session {job['session_id']} ({cache_key[:12]})")
+        job['ocr_cache'] = 'hit'
+        job['document_dict'] = cached['document_dict']
+        job['grouped'] = cached['grouped']
+        job['line_item_properties'] = cached.get('line_item_properties')
+        return
+
+    image_data, mime_type, job['preprocess'] = prepare_for_ocr(image_data)
+    logging.info("Calling GCP Document AI")
+    logging.info(f"Processing file: {job['filename']}")
+    document_proto = process_receipt(image_data, mime_type)
+    logging.info(f"GCP returned document with {len(document_proto.entities)} entities")
+
+    grouped = group_entities(document_proto)
     logging.info(f"Grouped entities: { {k: len(v) for k,v in grouped.items()} }")
+    job['ocr_cache'] = 'miss'
+    job['document'] = document_proto
+    job['document_dict'] = None
+    job['grouped'] = grouped
+    job['line_item_properties'] = line_item_properties(document_proto)
+    if ocr_cache:
+        ocr_cache.set(cache_key, {'grouped': grouped, 'document_dict': raw_document_dict(job),
+                                  'line_item_properties': job['line_item_properties']})
+
+def raw_document_dict(job):
+    """
+    The full Document AI dict, built on first use and only when raw storage is enabled.
+    """
+    if not STORE_RAW_DOCUMENT:
+        return None
+    if job.get('document_dict') is None and job.get('document') is not None:
+        job['document_dict'] = document_to_dict(job['document'])
+    return job.get('document_dict')
 
-    # Store raw & receipts under DATA collection
-    date_str = timestamp.split('T')[0]
+def save_raw_inline(date_str, session_id, document_dict, timestamp, grouped):
+    """Store the sanitized document in RAW_DATA, or an error document when that fails."""
     logging.info("Saving raw data under DATA/RAW_DATA")
-    def replace_nested_lists_with_json(obj):
-            if isinstance(obj, list):
-                new_list = []
-                for item in obj:
-                    if isinstance(item, list):
-                        # If the item is a list, replace with its JSON string
-                        new_list.append(json.dumps(item))
-                    elif isinstance(item, dict):
-                        new_list.append(replace_nested_lists_with_json(item))
-                    else:
-                        new_list.append(item)
-                return new_list
-            elif isinstance(obj, dict):
-                # For each dict value, check for lists, dicts, or other types
-                return {k: replace_nested_lists_with_json(v) for k, v in obj.items()}
-            else:
-                return obj
-    sanitized_payload = replace_nested_lists_with_json(sanitized_document_dict)
+    sanitized_payload = replace_nested_lists_with_json(document_dict)
     try:
         save_raw_data(date_str, session_id, sanitized_payload, timestamp) # Use sanitized_payload
     except Exception as e:
@@ -292,9 +271,130 @@ def upload():
             "original_keys": list(sanitized_payload.keys()),
             "needed_values": grouped
         }, timestamp)
+
+def persist_stage(job):
+    """Stage 2: Store raw & receipts under DATA collection."""
+    session_id, timestamp, grouped = job['session_id'], job['timestamp'], job['grouped']
+    date_str = timestamp.split('T')[0]
+    document_dict = raw_document_dict(job)
+    if document_dict is None:
+        logging.info("Raw document storage disabled, skipping DATA/RAW_DATA")
+    elif raw_archive:
+        try:
+            pointer = raw_archive.archive(date_str, session_id, document_dict)
+        except Exception as e:
+            # Blob store unavailable: keep the receipt moving with the inline RAW_DATA save
+            logging.exception(f"Archiving raw document for {session_id} failed, storing it inline: {e}")
+            save_raw_inline(date_str, session_id, document_dict, timestamp, grouped)
+        else:
+            logging.info("Saving raw data pointer under DATA/RAW_DATA")
+            save_raw_data(date_str, session_id, {'archive': pointer}, timestamp)
+    else:
+        save_raw_inline(date_str, session_id, document_dict, timestamp, grouped)
     logging.info("Saving receipt data under DATA/RECEIPTS")
     save_receipt_data(date_str, session_id, grouped, timestamp)
 
+def save_classified_summary(job, categories):
+    """Save a summary classified (partly) on the API side in the pipeline's SUMMARISED_DATA format."""
+    timestamp = job['timestamp']
+    final_total = float(sum(Decimal(group['total_price']) for group in categories))
+    save_summarised_data(timestamp.split('T')[0], job['session_id'], {
+        'categories': categories,
+        'timestamp': timestamp,
+        'final_total': final_total,
+    }, timestamp)
+
+# CLASSIFICATION_URL=inprocess runs the ADK pipeline inside this process instead of over HTTP + SSE
+adk_pipeline = InProcessPipeline(CLASSIFICATION_APP) if is_inprocess(CLASSIFICATION_URL) else None
+
+def create_adk_client(session_id):
+    if adk_pipeline:
+        return InProcessADKClient(adk_pipeline, user_id="user", session_id=session_id)
+    return ADKClient(CLASSIFICATION_URL, CLASSIFICATION_APP, user_id="user", session_id=session_id)
+
+def record_adk_run(session_id, events, run_started, metrics_ids, **extra):
+    """Summarise an ADK run per agent, keep it for /metrics and save it under each session in metrics_ids."""
+    if not events:
+        logging.warning(f"No events received from ADK classification for session {session_id}")
+        return
+    logging.info(f"Received {len(events)} events from ADK classification for session {session_id}, last from {events[-1].get('author')}")
+    run_summary = summarize_events(events, started=run_started)
+    agent_metrics.record(run_summary)
+    total = run_summary['total']
+    logging.info(f"ADK run for session {session_id}: {total['seconds']}s, {total['llm_calls']} LLM calls, "
+                 f"{total['total_tokens']} tokens, {run_summary['loop_iterations']} loop iterations")
+    for metrics_id in metrics_ids:
+        try:
+            save_agent_metrics(metrics_id, {**run_summary, **extra})
+        except Exception as e:
+            logging.error(f"Failed to save agent metrics for session {metrics_id}: {e}")
+
+def model_tier(events):
+    """The model tier ('fast' or 'strong') that served an ADK run, None when no LLM was called."""
+    tiers = state_values(events, 'model_tier')
+    return tiers[-1] if tiers else None
+
+def run_classification(job, session_id, prompt_txt):
+    """One single-receipt ADK run; returns the categories the pipeline saved (None when it saved nothing)."""
+    adk = create_adk_client(session_id)
+    # Create a new session (POST)
+    session_resp = adk.get_or_create_session(method="POST", custom_session=True)
+    if not session_resp or 'id' not in session_resp:
+        # The run would fail against a missing session; classify_stage logs it and saves nothing
+        raise RuntimeError(f"Could not create the ADK session for session {session_id}")
+    session_id = session_resp['id']
+    last_author = [None]
+    def on_progress(info):
+        # Publish agent transitions only, not every event
+        if info['author'] != last_author[0]:
+            last_author[0] = info['author']
+            upload_jobs.report_progress(job['session_id'], 'classify', info)
+    run_started = time.time()
+    events = list(adk.iter_sse(session_id, prompt_txt, on_progress=on_progress))
+    tier = model_tier(events)
+    if tier: # None when the run made no LLM call
+        pipeline_counters[f'model_tier_{tier}'] += 1
+    record_adk_run(session_id, events, run_started, [job['session_id']], model_tier=tier)
+    for outcome in state_values(events, 'refinement_loop'):
+        pipeline_counters[f'refinement_loop_{outcome}'] += 1
+    categories = extract_saved_categories(events)
+    if categories is None:
+        logging.warning(f"ADK classification did not save a summary for session {session_id}")
+    return categories
+
+def run_classification_batch(receipts):
+    """One ADK run for several receipts: [(receipt_id, prompt_text)] -> {receipt_id: batch result}."""
+    batch_id = f"batch-{uuid.uuid4().hex[:12]}"
+    adk = create_adk_client(batch_id)
+    session_resp = adk.get_or_create_session(method="POST", custom_session=True)
+    if not session_resp or 'id' not in session_resp:
+        # The batcher counts a failed batch and its receipts are classified one run each
+        raise RuntimeError(f"Could not create the ADK session for batch {batch_id}")
+    run_started = time.time()
+    events = list(adk.iter_sse(batch_id, build_batch_prompt(receipts), terminal_authors=(), terminal_state_keys=('batch_results',)))
+    receipt_ids = [receipt_id for receipt_id, _ in receipts]
+    tier = model_tier(events)
+    record_adk_run(batch_id, events, run_started, receipt_ids, batch={'id': batch_id, 'receipts': len(receipts)}, model_tier=tier)
+    results = split_batch_results(events)
+    pipeline_counters['batch_runs'] += 1
+    for result in results.values():
+        if result.get('firebase_save_result'):
+            pipeline_counters[f"refinement_loop_{result.get('refinement_loop')}"] += 1
+            if tier:
+                pipeline_counters[f'model_tier_{tier}'] += 1
+        else:
+            # Residual or unsaved: classify_stage runs the receipt alone, and that run is what gets counted
+            pipeline_counters['batch_fallbacks'] += 1
+    logging.info(f"Batch {batch_id}: {len(results)}/{len(receipts)} receipts answered, "
+                 f"{sum(1 for r in results.values() if r.get('firebase_save_result'))} saved")
+    return results
+
+# CLASSIFY_BATCH_SIZE > 1: concurrent classify stages share one ADK run (see batch_classification.py)
+classification_batcher = ClassificationBatcher(run_classification_batch) if CLASSIFY_BATCH_SIZE > 1 else None
+
+def classify_stage(job):
+    """Stage 3: ADK classification of the line items."""
+    session_id, grouped = job['session_id'], job['grouped']
     # # === CLASSIFICATION & SUMMARY SECTION ===
     # logging.info("Converting image to base64 for classification")
     # image_b64 = image_to_base64(save_path)
@@ -327,28 +427,60 @@ def upload():
     # If it's a list, take the first value
     receipt_total_value = {k: (v[0] if isinstance(v, list) else v) for k, v in total_candidates.items()}
 
+    # 3. Items the cache already knows are classified locally; only the rest go to ADK
+    known = []
+    if line_items and item_cache:
+        all_items = line_items
+        known, line_items = item_cache.split_line_items(all_items)
+    known_categories = group_known_items(known)
+    if known:
+        logging.info(f"{len(known)} items classified from the item cache for session {session_id}, {len(line_items)} left for ADK")
+        known_total = sum(Decimal(group['total_price']) for group in known_categories)
+        receipt_total_value = adjusted_totals(receipt_total_value, known_total)
+        grouped = {k: (line_items if v is all_items else v) for k, v in grouped.items()}
+        if not line_items:
+            try:
+                save_classified_summary(job, known_categories)
+            except Exception as e:
+                logging.exception(f"Saving cached classification failed for session {session_id}: {e}")
+                raise
+            pipeline_counters['model_tier_cache'] += 1
+            logging.info(f"Session {session_id} classified entirely from the item cache")
+            return
+
     if line_items:
         logging.info(f"Classifying {len(line_items)} items for session {session_id} with totals {receipt_total_value}")
+        properties = properties_by_line(job['grouped'].get('line_item'), job.get('line_item_properties'))
+        prompt_txt, prompt_report = build_classification_prompt(line_items, receipt_total_value, grouped, properties=properties)
+        logging.info(f"Classification prompt for session {session_id}: {prompt_report['tokens']} tokens (est.), "
+                     f"{prompt_report['lines_sent']}/{prompt_report['lines_in']} lines, {prompt_report['merged']} merged, "
+                     f"{'parsed items' if prompt_report['parsed'] else 'raw lines'} (min confidence {prompt_report['min_confidence']})")
+        if prompt_report['omitted']:
+            # Over the token budget: the lines left out are stored as Others next to the pipeline's result
+            known += [{**(parse_line_item(line) or {'item': line, 'quantity': '1', 'price': '0'}), 'category': 'Others'}
+                      for line in prompt_report['omitted']]
+            known_categories = group_known_items(known)
         try:
-            adk = ADKClient(CLASSIFICATION_URL, CLASSIFICATION_APP, user_id="user", session_id=session_id)
-            prompt_txt = json.dumps({
-                "line_items": line_items,
-                "receipt_total_value": receipt_total_value,
-                "grouped": grouped
-            }, indent=2)
-            # Create a new session (POST)
-            session_resp = adk.get_or_create_session(method="POST", custom_session=True)
-            if session_resp and 'id' in session_resp:
-                session_id = session_resp['id']
-                # print(f"Session created: {session_id}")
+            batch_result = classification_batcher.classify(session_id, prompt_txt) if classification_batcher else None
+            if batch_result and batch_result.get('firebase_save_result'):
+                # Classified, reconciled and saved as part of a batch
+                categories = saved_categories(batch_result)
             else:
-                pass # Handle session creation failure if needed | NOTE-TODO
-            events = adk.run_sse(session_id, prompt_txt)
-            if events is not None:
-                logging.info(f"Received {len(events)} events from ADK classification for session {session_id}")
-                logging.info(f"Events: {events}")  # Log first 5 events for brevity
-            else:
-                logging.warning(f"No events received from ADK classification for session {session_id}")
+                if batch_result:
+                    logging.info(f"Session {session_id} did not reconcile in its batch ({batch_result.get('refinement_loop')}), classifying it alone")
+                categories = run_classification(job, session_id, prompt_txt)
+            if categories is None:
+                if known:
+                    # Saving only the cached/omitted items would under-report the receipt's spend
+                    pipeline_counters['partial_summaries_skipped'] += 1
+                    logging.error(f"Classification saved nothing for session {session_id}; "
+                                  f"its {len(known)} locally classified items are not saved on their own")
+                raise RuntimeError(f"ADK classification saved no summary for session {session_id}")
+            if item_cache:
+                item_cache.learn(categories)
+            if known:
+                # The pipeline only saw the unknown items; store the complete receipt
+                save_classified_summary(job, merge_categories(known_categories, categories))
             '''
             if events is not None:
                 # Extract JSON only if you expect a structured response
@@ -377,12 +509,89 @@ def upload():
             logging.info("Classification completed, Summarised Data should be saved now.")
         except Exception as e:
             logging.exception(f"Classification failed for session {session_id}: {e}")
+            raise # the job (and /jobs/<session_id>) reports the classify stage as failed
     else:
         logging.warning(f"No 'item' candidates found for classification for session {session_id}")
 
+UPLOAD_STAGES = [('ocr', ocr_stage), ('persist', persist_stage), ('classify', classify_stage)]
+upload_jobs = UploadJobQueue(
+    UPLOAD_STAGES,
+    workers=UPLOAD_WORKERS,
+    max_queue=UPLOAD_QUEUE_SIZE,
+    # Batched receipts wait in the classify stage for each other, so it admits a batch per ADK run
+    stage_limits={'ocr': UPLOAD_OCR_CONCURRENCY, 'persist': UPLOAD_PERSIST_CONCURRENCY,
+                  'classify': UPLOAD_CLASSIFY_CONCURRENCY * (CLASSIFY_BATCH_SIZE if classification_batcher else 1)},
+    on_update=save_job_status,
+)
+
+@app.route('/upload', methods=['POST'])
+def upload():
+    logging.info("Upload endpoint hit")
+    file = request.files.get('file')
+    session_id = request.form.get('session_id')
+    identifier = request.form.get('identifier')
+    source = request.form.get('source')
+    timestamp = request.form.get('timestamp')
+    # --- Parse these with type safety ---
+    optimize = request.form.get("optimize", "True")
+    optimize = optimize if isinstance(optimize, bool) else (optimize.lower() == "true")
+    run_async = request.form.get("async", str(UPLOAD_MODE == 'async'))
+    run_async = run_async.lower() == "true"
+    logging.info(f"Params: session_id={session_id}, identifier={identifier}, source={source}, timestamp={timestamp}, async={run_async}")
+    if not file or not session_id or not identifier or not source or not timestamp:
+        logging.error("Missing parameters in upload request")
+        return jsonify({'error': 'Missing parameters'}), 400
+
+    # Lookup primary user
+    primary = get_primary_id(source, identifier)
+    if not primary:
+        logging.error(f"User not registered: {source}:{identifier}")
+        return jsonify({'error': 'User not registered'}), 403
+
+    # Save session metadata
+    logging.info(f"Saving session metadata for session {session_id}")
+    save_session_meta(session_id, timestamp, primary, source)
+
+    # Keep the upload in memory for OCR; archiving to disk happens in the background
+    image_data = file.read()
+    logging.info(f"Received {len(image_data)} bytes for session {session_id}")
+    if upload_archive:
+        upload_archive.archive_async(session_id, file.filename, image_data)
+
+    job = {'session_id': session_id, 'timestamp': timestamp, 'image_data': image_data, 'filename': file.filename}
+    if run_async:
+        try:
+            upload_jobs.submit(session_id, job)
+        except QueueFullError as e:
+            logging.error(f"Rejecting upload for session {session_id}: {e}")
+            return jsonify({'error': 'Upload queue is full, retry later'}), 503
+        logging.info(f"Queued processing for session {session_id}")
+        return jsonify({'status': 'queued', 'session_id': session_id, 'status_url': url_for('job_status', session_id=session_id)}), 202
+
+    # Process with GCP
+    try:
+        ocr_stage(job)
+    except Exception as e:
+        logging.exception("GCP processing failed")
+        return jsonify({'error': 'GCP failed', 'details': str(e)}), 500
+    persist_stage(job)
+    try:
+        classify_stage(job)
+    except Exception:
+        # Already logged by classify_stage; the upload itself succeeded, as before the job queue
+        return jsonify({'status': 'processing', 'session_id': session_id}), 200
+
     logging.info(f"Completed processing for session {session_id}")
     return jsonify({'status': 'processing', 'session_id': session_id}), 200
 
+@app.route('/jobs/<session_id>', methods=['GET'])
+def job_status(session_id):
+    """Status and per-stage timings of an asynchronous upload job."""
+    status = upload_jobs.get(session_id) or get_job_status(session_id)
+    if not status:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(status), 200
+
 @app.route('/get_data', methods=['GET'])
 def get_data():
     # If Username is provided, return summarised data for that user
@@ -0,0 +1,193 @@
+"""
+OCR result cache keyed by the SHA-256 of the uploaded image bytes.
+
+Re-sent receipts (same photo through the bot and the upload page, timeout
+retries...) reuse the stored Document AI result instead of paying another
+OCR round trip. Backends: in-process LRU, local disk, Firestore.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+def image_key(image_data):
+    return hashlib.sha256(image_data).hexdigest()
+
+class MemoryLRUBackend:
+    """In-process LRU bounded by entry count and serialized size."""
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (entry, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def set(self, key, entry):
+        size = len(json.dumps(entry, default=str))
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (entry, size)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+
+class DiskBackend:
+    """Gzipped JSON files in a local directory; oldest files are evicted past the size/count limits."""
+    def __init__(self, cache_dir, max_entries=10000, max_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json.gz')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path) # Keep recently used entries on disk
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Unreadable OCR cache entry {path}: {e}")
+            self.delete(key)
+            return None
+
+    def set(self, key, entry):
+        tmp_path = self._path(key) + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            files = []
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json.gz'):
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                    files.append((stat.st_mtime, stat.st_size, name))
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            while files and (len(files) > self.max_entries or total > self.max_bytes):
+                _, size, name = files.pop(0)
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+                self.evictions += 1
+
+class FirestoreBackend:
+    """OCR_CACHE/{key} documents; expiry is left to the TTL check (and an optional Firestore TTL policy on expires_at)."""
+    def __init__(self, ttl_seconds):
+        from firebase_store import get_ocr_cache_entry, save_ocr_cache_entry, delete_ocr_cache_entry
+        self._get, self._save, self._delete = get_ocr_cache_entry, save_ocr_cache_entry, delete_ocr_cache_entry
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+
+    def get(self, key):
+        return self._get(key)
+
+    def set(self, key, entry):
+        self._save(key, entry, self.ttl_seconds)
+
+    def delete(self, key):
+        self._delete(key)
+
+class OCRCache:
+    def __init__(self, backend, ttl_seconds=7 * 24 * 3600):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key):
+        """Return the cached value for the image key, or None on a miss/expired entry."""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logging.error(f"OCR cache read failed for {key}: {e}")
+            self.errors += 1
+            entry = None
+        if entry and self.ttl_seconds and time.time() - entry['stored_at'] > self.ttl_seconds:
+            entry = None
+            try:
+                self.backend.delete(key)
+            except Exception as e:
+                # The entry stays expired; the next lookup tries again
+                logging.error(f"OCR cache delete failed for {key}: {e}")
+                self.errors += 1
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry['value']
+
+    def set(self, key, value):
+        try:
+            self.backend.set(key, {'stored_at': time.time(), 'value': value})
+        except Exception as e:
+            logging.error(f"OCR cache write failed for {key}: {e}")
+            self.errors += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evictions': getattr(self.backend, 'evictions', 0),
+            'errors': self.errors,
+        }
+
+def create_ocr_cache():
+    """
+    Build the cache configured by OCR_CACHE_BACKEND ('memory', 'disk', 'firestore' or 'none').
+    Returns None when caching is disabled.
+    """
+    backend_name = os.getenv('OCR_CACHE_BACKEND', 'memory').lower()
+    ttl_seconds = int(os.getenv('OCR_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+    max_entries = int(os.getenv('OCR_CACHE_MAX_ENTRIES', 256))
+    max_bytes = int(os.getenv('OCR_CACHE_MAX_MB', 64)) * 1024 * 1024
+    if backend_name == 'memory':
+        backend = MemoryLRUBackend(max_entries, max_bytes)
+    elif backend_name == 'disk':
+        backend = DiskBackend(os.getenv('OCR_CACHE_DIR', 'ocr_cache'), max_entries, max_bytes)
+    elif backend_name == 'firestore':
+        backend = FirestoreBackend(ttl_seconds)
+    else:
+        logging.info("OCR cache disabled")
+        return None
+    logging.info(f"OCR cache enabled: backend={backend_name}, ttl={ttl_seconds}s")
+    return OCRCache(backend, ttl_seconds)
@@ -0,0 +1,158 @@
+"""
+Compact classification prompt for the ADK pipeline.
+
+The pipeline only needs the line items, the receipt totals and a little context
+(who the supplier is). The OCR `grouped` dict repeats every line item and adds
+addresses, phone numbers and timestamps the classifier ignores, so only the
+whitelisted fields are sent, as whitespace-free JSON.
+
+Long receipts are reduced deterministically until they fit the token budget:
+  1. lines with the same item name are merged (quantities and prices summed),
+  2. item names are cut to PROMPT_MAX_ITEM_CHARS,
+  3. lines still over budget are left out of the prompt and returned as `omitted`
+     for the caller to classify locally; the prompt's total_amount / net_amount
+     are reduced by their prices, like items classified by the item cache.
+Category totals are unchanged by 1 and 2.
+
+With PROMPT_PARSED_ITEMS, the lines are parsed locally (line_item_parser.py) and,
+when every item parsed with at least PARSER_MIN_CONFIDENCE, sent as `parsed_items`
+({item, quantity, price}) instead of `line_items`: the pipeline then only asks the
+LLM for a category per item name.
+"""
+import json
+import logging
+import os
+from decimal import Decimal, InvalidOperation
+from dotenv import load_dotenv
+from item_cache import parse_line_item, normalize_item, adjusted_totals
+from line_item_parser import parse_line_items, prompt_items
+
+load_dotenv()
+
+PROMPT_GROUPED_FIELDS = tuple(f.strip() for f in os.getenv('PROMPT_GROUPED_FIELDS', 'supplier_name').split(',') if f.strip())
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 2000))
+PROMPT_MAX_ITEM_CHARS = int(os.getenv('PROMPT_MAX_ITEM_CHARS', 60))
+PROMPT_MAX_FIELD_VALUES = 3 # values kept per whitelisted grouped field
+PROMPT_PARSED_ITEMS = os.getenv('PROMPT_PARSED_ITEMS', 'True').lower() == 'true'
+PARSER_MIN_CONFIDENCE = float(os.getenv('PARSER_MIN_CONFIDENCE', 0.75))
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English/JSON text)."""
+    return (len(text) + 3) // 4
+
+def dumps(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+def whitelisted_fields(grouped, fields=PROMPT_GROUPED_FIELDS):
+    """The whitelisted grouped fields with non-empty values, at most PROMPT_MAX_FIELD_VALUES each."""
+    selected = {}
+    for field in fields:
+        values = (grouped or {}).get(field)
+        values = values if isinstance(values, list) else [values]
+        values = [' '.join(str(v).split()) for v in values if v not in (None, '')][:PROMPT_MAX_FIELD_VALUES]
+        if values:
+            selected[field] = values
+    return selected
+
+def _decimal(text, default):
+    try:
+        return Decimal(str(text).replace(',', '.'))
+    except (InvalidOperation, ValueError):
+        return default
+
+def _format_number(value):
+    return f"{value.normalize():f}"
+
+def merge_duplicate_lines(line_items):
+    """
+    Merge lines with the same item name ("1 Coffee 3.50" twice -> "2 Coffee 7.00"), keeping
+    first-seen order. Lines without a parsable price are kept as they are.
+    """
+    merged, order = {}, []
+    for line in line_items:
+        parsed = parse_line_item(line)
+        key = normalize_item(parsed['item']) if parsed else None
+        if not key:
+            order.append((None, ' '.join(str(line).split())))
+            continue
+        if key not in merged:
+            merged[key] = {'item': parsed['item'], 'quantity': Decimal('0'), 'price': Decimal('0'), 'lines': []}
+            order.append((key, None))
+        entry = merged[key]
+        entry['quantity'] += _decimal(parsed['quantity'], Decimal('1'))
+        entry['price'] += _decimal(parsed['price'], Decimal('0'))
+        entry['lines'].append(line)
+    lines = []
+    for key, raw in order:
+        entry = merged.get(key)
+        if entry is None:
+            lines.append(raw)
+        elif len(entry['lines']) == 1:
+            lines.append(entry['lines'][0]) # unchanged
+        else:
+            lines.append(f"{_format_number(entry['quantity'])} {entry['item']} {entry['price']:.2f}")
+    return lines
+
+def shorten_item(line, max_chars=PROMPT_MAX_ITEM_CHARS):
+    """Cut the item name of a line to max_chars, keeping quantity and price."""
+    parsed = parse_line_item(line)
+    if not parsed:
+        return line[:max_chars]
+    if len(parsed['item']) <= max_chars:
+        return line
+    return f"{parsed['quantity']} {parsed['item'][:max_chars].rstrip()} {parsed['price']}"
+
+def build_classification_prompt(line_items, receipt_total_value, grouped=None, fields=PROMPT_GROUPED_FIELDS,
+                                token_budget=PROMPT_TOKEN_BUDGET, max_item_chars=PROMPT_MAX_ITEM_CHARS,
+                                parse_items=PROMPT_PARSED_ITEMS, properties=None, min_confidence=PARSER_MIN_CONFIDENCE):
+    """
+    Build the pipeline prompt.
+
+    properties: line text -> Document AI line_item properties, used by the parser.
+
+    Returns:
+        (prompt_text, report) where report is {'tokens', 'lines_in', 'lines_sent', 'merged',
+        'shortened', 'parsed' (bool), 'min_confidence', 'omitted': [original lines left out]}.
+    """
+    context = whitelisted_fields(grouped, fields)
+    lines = merge_duplicate_lines(line_items)
+    shortened = [shorten_item(line, max_item_chars) for line in lines]
+    report = {
+        'lines_in': len(line_items),
+        'merged': len(line_items) - len(lines),
+        'shortened': sum(1 for a, b in zip(lines, shortened) if a != b),
+        'parsed': False,
+        'min_confidence': None,
+        'omitted': [],
+    }
+    items_key = 'line_items'
+    if parse_items and lines:
+        parsed = parse_line_items(lines, properties)
+        report['min_confidence'] = min(p['confidence'] for p in parsed)
+        if all(p['price'] is not None for p in parsed) and report['min_confidence'] >= min_confidence:
+            shortened = [dict(item, item=item['item'][:max_item_chars].rstrip()) for item in prompt_items(parsed)]
+            items_key, report['parsed'] = 'parsed_items', True
+
+    def render(items):
+        return dumps({items_key: items, 'receipt_total_value': receipt_total_value, 'grouped': context})
+
+    prompt = render(shortened)
+    if estimate_tokens(prompt) > token_budget:
+        # Keep the longest prefix of lines that fits; each line costs its JSON string plus a comma
+        budget_chars = token_budget * 4 - len(render([]))
+        kept = []
+        for line in shortened:
+            cost = len(dumps(line)) + 1
+            if cost > budget_chars:
+                break
+            kept.append(line)
+            budget_chars -= cost
+        report['omitted'] = lines[len(kept):] # merged lines, item names untruncated
+        omitted_total = sum((_decimal((parse_line_item(line) or {}).get('price'), Decimal('0')) for line in report['omitted']), Decimal('0'))
+        receipt_total_value = adjusted_totals(receipt_total_value, omitted_total)
+        logging.warning(f"Prompt over the {token_budget} token budget: {len(shortened) - len(kept)} of {len(shortened)} lines left out")
+        shortened = kept
+        prompt = render(shortened)
+    report['lines_sent'] = len(shortened)
+    report['tokens'] = estimate_tokens(prompt)
+    return prompt, report
@@ -0,0 +1,117 @@
+"""
+Compressed archive for raw Document AI documents.
+
+The full document dict is serialised, compressed (zstd when `zstandard` is
+installed, gzip otherwise) and written to a blob store. DATA/RAW_DATA then only
+keeps a small pointer with size/codec metadata, so large receipts no longer hit
+Firestore's 1 MiB document limit.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+
+try:
+    import zstandard
+except ImportError: # optional dependency
+    zstandard = None
+
+CODEC_EXTENSIONS = {'zstd': 'zst', 'gzip': 'gz'}
+
+def compress(data, codec, level=None):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level or 10).compress(data)
+    return gzip.compress(data, compresslevel=level or 6)
+
+def decompress(data, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+class LocalBlobStore:
+    """Blobs as files under a root directory (single node deployments and tests)."""
+    def __init__(self, root):
+        self.root = root
+
+    def put(self, key, data):
+        path = os.path.join(self.root, *key.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        return f'file://{os.path.abspath(path)}'
+
+    def get(self, uri):
+        with open(uri[len('file://'):], 'rb') as f:
+            return f.read()
+
+class GCSBlobStore:
+    """Blobs in a Google Cloud Storage bucket (requires google-cloud-storage)."""
+    def __init__(self, bucket_name, prefix=''):
+        from google.cloud import storage
+        self.bucket = storage.Client().bucket(bucket_name)
+        self.prefix = prefix.strip('/')
+
+    def put(self, key, data):
+        name = f'{self.prefix}/{key}' if self.prefix else key
+        self.bucket.blob(name).upload_from_string(data, content_type='application/octet-stream')
+        return f'gs://{self.bucket.name}/{name}'
+
+    def get(self, uri):
+        name = uri[len(f'gs://{self.bucket.name}/'):]
+        return self.bucket.blob(name).download_as_bytes()
+
+class RawDocumentArchive:
+    def __init__(self, store, codec='auto', level=None):
+        if codec == 'auto':
+            codec = 'zstd' if zstandard else 'gzip'
+        if codec == 'zstd' and zstandard is None:
+            logging.warning("zstandard is not installed, falling back to gzip for raw archives")
+            codec = 'gzip'
+        self.store = store
+        self.codec = codec
+        self.level = level
+
+    def archive(self, date_str, session_id, document_dict):
+        """Compress and store the document. Returns the pointer saved in DATA/RAW_DATA."""
+        start = time.perf_counter()
+        raw = json.dumps(document_dict, separators=(',', ':'), default=str).encode('utf-8')
+        blob = compress(raw, self.codec, self.level)
+        key = f'RAW_DATA/{date_str}/{session_id}.json.{CODEC_EXTENSIONS[self.codec]}'
+        uri = self.store.put(key, blob)
+        pointer = {
+            'blob_uri': uri,
+            'codec': self.codec,
+            'raw_bytes': len(raw),
+            'stored_bytes': len(blob),
+            'sha256': hashlib.sha256(raw).hexdigest(),
+            'write_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+        logging.info(f"Archived raw document for {session_id}: {len(raw)} -> {len(blob)} bytes ({self.codec}) at {uri}")
+        return pointer
+
+    def load(self, pointer):
+        """Read back a document from its RAW_DATA pointer."""
+        return json.loads(decompress(self.store.get(pointer['blob_uri']), pointer['codec']))
+
+def create_raw_archive():
+    """
+    Build the archive configured by RAW_ARCHIVE_BACKEND ('local' or 'gcs').
+    Returns None for 'firestore' (default): the document is stored inline in RAW_DATA as before.
+    """
+    backend = os.getenv('RAW_ARCHIVE_BACKEND', 'firestore').lower()
+    codec = os.getenv('RAW_ARCHIVE_CODEC', 'auto').lower()
+    if backend == 'local':
+        store = LocalBlobStore(os.getenv('RAW_ARCHIVE_DIR', 'raw_archive'))
+    elif backend == 'gcs':
+        bucket = os.getenv('RAW_ARCHIVE_BUCKET')
+        if not bucket:
+            raise ValueError("RAW_ARCHIVE_BACKEND=gcs needs RAW_ARCHIVE_BUCKET")
+        store = GCSBlobStore(bucket, os.getenv('RAW_ARCHIVE_PREFIX', ''))
+    else:
+        return None
+    archive = RawDocumentArchive(store, codec)
+    logging.info(f"Raw document archive enabled: backend={backend}, codec={archive.codec}")
+    return archive
@@ -0,0 +1,40 @@
+"""
+Rebuild or check the per-user spend aggregates used by /summary.
+
+Usage:
+    python rebuild_aggregates.py                # backfill every user with sessions
+    python rebuild_aggregates.py --user alice   # backfill one user
+    python rebuild_aggregates.py --check        # only compare stored vs recomputed
+"""
+import argparse
+import logging
+import sys
+from firebase_store import list_users_with_sessions, rebuild_spend_aggregates, check_spend_aggregates
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or verify SPEND_AGGREGATES documents.")
+    parser.add_argument('--user', action='append', help="primary_id to process (repeatable). Defaults to every user with sessions.")
+    parser.add_argument('--check', action='store_true', help="Only run the consistency check, do not rewrite anything.")
+    parser.add_argument('--tolerance', type=float, default=0.01, help="Allowed absolute difference per value.")
+    args = parser.parse_args()
+
+    users = args.user or list_users_with_sessions()
+    inconsistent = 0
+    for user_id in users:
+        if args.check:
+            mismatches = check_spend_aggregates(user_id, args.tolerance)
+            if mismatches:
+                inconsistent += 1
+                for field, key, stored, recomputed in mismatches:
+                    logging.warning(f"{user_id}: {field}[{key}] stored={stored} recomputed={recomputed}")
+            else:
+                logging.info(f"{user_id}: aggregates consistent")
+        else:
+            aggregates = rebuild_spend_aggregates(user_id)
+            logging.info(f"{user_id}: total_spend={round(aggregates['total_spend'], 2)}")
+    if args.check:
+        logging.info(f"{inconsistent}/{len(users)} users with inconsistent aggregates")
+    return 1 if inconsistent else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,22 @@
+"""
+Seed the learned item -> category cache (ITEM_CATEGORIES) from SUMMARISED_DATA.
+
+Usage:
+    python seed_item_cache.py                # every user's receipts
+    python seed_item_cache.py --user alice   # one user's receipts
+"""
+import argparse
+import logging
+import sys
+from firebase_store import rebuild_item_categories
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed ITEM_CATEGORIES from historical summaries.")
+    parser.add_argument('--user', help="primary_id whose receipts to use. Defaults to every user.")
+    args = parser.parse_args()
+    count = rebuild_item_categories(args.user)
+    logging.info(f"{count} items in ITEM_CATEGORIES")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Running spend aggregates per user.
+
+Every summarised receipt contributes its category totals to a per-user aggregate
+document (total, per category, per weekday, per day), so /summary reads one
+precomputed document instead of rebuilding everything with pandas.
+"""
+import calendar
+from datetime import datetime
+
+EXCLUDED_CATEGORIES = ('Tax',)
+
+def empty_aggregates():
+    return {'total_spend': 0.0, 'categories': {}, 'weekdays': {}, 'days': {}}
+
+def summary_contribution(categories, date_str):
+    """
+    Contribution of one summarised receipt, using the same rules as
+    firebase_store.get_all_summarised_data_as_df (no zero totals, no 'Tax').
+    """
+    contribution = empty_aggregates()
+    weekday = datetime.strptime(date_str, '%Y-%m-%d').strftime('%A') if date_str else None
+    for entry in categories or []:
+        try:
+            total = float(entry['total_price'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        category = entry.get('category')
+        if total == 0 or not category or category in EXCLUDED_CATEGORIES:
+            continue
+        contribution['total_spend'] += total
+        contribution['categories'][category] = contribution['categories'].get(category, 0.0) + total
+        if weekday:
+            contribution['weekdays'][weekday] = contribution['weekdays'].get(weekday, 0.0) + total
+            contribution['days'][date_str] = contribution['days'].get(date_str, 0.0) + total
+    return contribution
+
+def contribution_delta(new, old):
+    """
+    Difference between a session's new and previous contribution, so re-saving
+    a summary never double counts.
+    """
+    old = old or empty_aggregates()
+    delta = {'total_spend': new['total_spend'] - old.get('total_spend', 0.0)}
+    for field in ('categories', 'weekdays', 'days'):
+        keys = set(new[field]) | set(old.get(field, {}))
+        delta[field] = {
+            k: new[field].get(k, 0.0) - old.get(field, {}).get(k, 0.0)
+            for k in keys
+        }
+        delta[field] = {k: v for k, v in delta[field].items() if v != 0}
+    return delta
+
+def add_contribution(aggregates, contribution):
+    aggregates['total_spend'] += contribution['total_spend']
+    for field in ('categories', 'weekdays', 'days'):
+        for k, v in contribution[field].items():
+            aggregates[field][k] = aggregates[field].get(k, 0.0) + v
+    return aggregates
+
+def summary_from_aggregates(aggregates):
+    """
+    Build the /summary payload from an aggregate document.
+    Returns None when the user has no spend recorded.
+    """
+    if not aggregates:
+        return None
+    categories = {k: v for k, v in (aggregates.get('categories') or {}).items() if round(v, 2) != 0}
+    active_days = [d for d, v in (aggregates.get('days') or {}).items() if round(v, 2) != 0]
+    if not categories or not active_days:
+        return None
+    total_spend = aggregates.get('total_spend', 0.0)
+    top_category = max(categories.items(), key=lambda x: x[1])
+    labels = sorted(categories.keys())
+    weekly = aggregates.get('weekdays') or {}
+    ordered_week = [calendar.day_name[i] for i in range(7)]
+    return {
+        'total_monthly_spend': round(total_spend, 2),
+        'average_daily_spend': round(total_spend / len(active_days), 2),
+        'top_category': top_category[0],
+        'top_category_total': round(top_category[1], 2),
+        'expense_by_category': {
+            'labels': labels,
+            'values': [round(categories[k], 2) for k in labels]
+        },
+        'weekly_spending': {
+            'labels': ordered_week,
+            'values': [round(weekly.get(day, 0.0), 2) for day in ordered_week]
+        }
+    }
+
+def compare_aggregates(stored, recomputed, tolerance=0.01):
+    """
+    Compare stored aggregates with a full recomputation.
+    Returns a list of (field, key, stored_value, recomputed_value) mismatches.
+    """
+    stored = stored or empty_aggregates()
+    mismatches = []
+    if abs(stored.get('total_spend', 0.0) - recomputed['total_spend']) > tolerance:
+        mismatches.append(('total_spend', None, stored.get('total_spend', 0.0), recomputed['total_spend']))
+    for field in ('categories', 'weekdays', 'days'):
+        stored_field = stored.get(field) or {}
+        for k in set(stored_field) | set(recomputed[field]):
+            a, b = stored_field.get(k, 0.0), recomputed[field].get(k, 0.0)
+            if abs(a - b) > tolerance:
+                mismatches.append((field, k, a, b))
+    return mismatches
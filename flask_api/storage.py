@@ -0,0 +1,554 @@
+"""
+Storage backends for users, sessions, raw data, receipts, summaries, spend
+aggregates, learned item categories and OCR cache entries.
+
+firebase_store keeps the functions the API calls (create_user, save_summarised_data,
+get_spend_aggregates, ...) and runs them on the backend picked by STORAGE_BACKEND:
+
+  firestore : the Firestore collections used so far (USERDATA, SESSIONS, DATA/...,
+              SPEND_AGGREGATES, ITEM_CATEGORIES, OCR_CACHE). firebase_admin is
+              initialised on first use, not at import.
+  sqlite    : one embedded SQLite database (SQLITE_PATH) in WAL mode, for single-node
+              deployments and benchmarks that run without network or credentials.
+              Spend aggregates are not stored as counters: every summarised session
+              keeps its per-category totals in spend_lines, indexed on (user, date),
+              and /summary aggregates them with SQL.
+
+The adk_pipeline's classification_response/firebase_store.py imports this module and
+spend_aggregates.py (deploy.sh copies both into the deployed pipeline), so both
+services write the same schema on the backend set by STORAGE_BACKEND and SQLITE_PATH.
+"""
+import abc
+import calendar
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+from spend_aggregates import empty_aggregates, contribution_delta
+
+load_dotenv()
+
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'firestore').lower()
+# Absolute, so the API and an in-process pipeline open the same file whatever their working directory
+SQLITE_PATH = os.path.abspath(os.getenv('SQLITE_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'spendify.db'))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+# Number of documents fetched per batched get_all() round trip
+SUMMARY_READ_BATCH_SIZE = int(os.getenv('SUMMARY_READ_BATCH_SIZE', 100))
+
+_firebase_lock = threading.Lock()
+
+def firebase_app():
+    """
+    Initialise firebase_admin from FIREBASE_CREDENTIALS on first call (reusing an app
+    initialised elsewhere in the process) and return it.
+    """
+    import firebase_admin
+    from firebase_admin import credentials
+    with _firebase_lock:
+        if firebase_admin._apps:
+            return firebase_admin.get_app()
+        cred_path = os.getenv('FIREBASE_CREDENTIALS', 'firebase_credentials.json')
+        logging.info(f"Loading Firebase credentials from: {cred_path}")
+        if not cred_path or not os.path.exists(cred_path):
+            code_current_dir = os.path.dirname(os.path.abspath(__file__))
+            msg = f"Firebase credentials file not found at: {cred_path}"
+            logging.error(msg)
+            # Look in current directory for `firebase_credentials.json`
+            cred_path = os.path.join(code_current_dir, 'firebase_credentials.json')
+            if not os.path.exists(cred_path):
+                logging.error(f"Firebase credentials file not found at: {cred_path}")
+                raise FileNotFoundError(msg)
+        app = firebase_admin.initialize_app(credentials.Certificate(cred_path))
+        logging.info("Initialized Firebase Admin SDK")
+        return app
+
+class Storage(abc.ABC):
+    """
+    Interface of a storage backend. Documents are plain dicts; the higher level
+    rules (user/session linking, spend contributions, item counting) live in
+    firebase_store and spend_aggregates.
+    """
+    # Users: USERDATA documents keyed by primary_id
+    @abc.abstractmethod
+    def get_user(self, primary_id):
+        """The user document or None."""
+
+    @abc.abstractmethod
+    def merge_user(self, primary_id, fields):
+        """Create the user or merge fields into it."""
+
+    @abc.abstractmethod
+    def find_user(self, field, value):
+        """primary_id of a user whose document has field == value, or None."""
+
+    # Sessions: one document per upload (timestamp, main_user, source, job, agent_metrics)
+    @abc.abstractmethod
+    def get_session(self, session_id):
+        """The session document or None."""
+
+    @abc.abstractmethod
+    def set_session(self, session_id, fields, merge=False):
+        """Write the session document, or merge fields into it."""
+
+    @abc.abstractmethod
+    def list_sessions(self, main_user=None):
+        """[(session_id, session_doc)] of a user, or of everyone without main_user."""
+
+    # Raw OCR data, grouped receipt entities and summaries, per date and session
+    @abc.abstractmethod
+    def save_raw_data(self, date_str, session_id, payload):
+        """Raw OCR data of a session (DATA/RAW_DATA)."""
+
+    @abc.abstractmethod
+    def save_receipt(self, date_str, session_id, payload):
+        """Grouped receipt entities of a session (DATA/RECEIPTS)."""
+
+    @abc.abstractmethod
+    def save_summary(self, date_str, session_id, payload):
+        """Summary of a session (DATA/SUMMARISED_DATA)."""
+
+    @abc.abstractmethod
+    def iter_summaries(self, main_user=None):
+        """Yield (session_id, date_str, user_id, summary_doc) for every summarised session (of main_user)."""
+
+    # Spend aggregates (see spend_aggregates.py)
+    @abc.abstractmethod
+    def get_spend_aggregates(self, user_id):
+        """{'total_spend', 'categories', 'weekdays', 'days'} of the user, or None when nothing is stored."""
+
+    @abc.abstractmethod
+    def update_spend_aggregates(self, user_id, session_id, contribution):
+        """Replace the session's contribution to the user's aggregates (idempotent)."""
+
+    @abc.abstractmethod
+    def replace_spend_aggregates(self, user_id, aggregates, contributions):
+        """Overwrite the user's aggregates and {session_id: contribution} with a recomputation."""
+
+    # Learned item categories (see item_cache.py)
+    @abc.abstractmethod
+    def get_item_categories(self, keys=None):
+        """{key: {'item', 'counts'}} of the given keys that are stored (every item when keys is None)."""
+
+    @abc.abstractmethod
+    def record_item_categories(self, observations):
+        """Count one observation per item; observations: {key: {'item', 'category'}}."""
+
+    @abc.abstractmethod
+    def replace_item_categories(self, entries):
+        """Overwrite the counts of every given item; entries: {key: {'item', 'counts'}}."""
+
+    # OCR cache entries (see ocr_cache.py)
+    @abc.abstractmethod
+    def get_ocr_cache_entry(self, key):
+        """{'stored_at', 'value'} or None."""
+
+    @abc.abstractmethod
+    def save_ocr_cache_entry(self, key, entry, ttl_seconds):
+        """Store {'stored_at', 'value'}, expiring ttl_seconds after stored_at."""
+
+    @abc.abstractmethod
+    def delete_ocr_cache_entry(self, key):
+        """Remove the entry (no-op when missing)."""
+
+class FirestoreStorage(Storage):
+    """The Firestore collections; the client is created on first use."""
+    def __init__(self):
+        self._client = None
+
+    @property
+    def db(self):
+        if self._client is None:
+            from firebase_admin import firestore
+            self._client = firestore.client(firebase_app())
+        return self._client
+
+    def _summary_ref(self, date_str, session_id):
+        return self.db.collection('DATA').document('SUMMARISED_DATA').collection(date_str).document(session_id)
+
+    def get_user(self, primary_id):
+        doc = self.db.collection('USERDATA').document(primary_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def merge_user(self, primary_id, fields):
+        self.db.collection('USERDATA').document(primary_id).set(fields, merge=True)
+
+    def find_user(self, field, value):
+        docs = self.db.collection('USERDATA').where(field, '==', value).limit(1).get()
+        return docs[0].id if docs else None
+
+    def get_session(self, session_id):
+        doc = self.db.collection('SESSIONS').document(session_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def set_session(self, session_id, fields, merge=False):
+        self.db.collection('SESSIONS').document(session_id).set(fields, merge=merge)
+
+    def list_sessions(self, main_user=None):
+        sessions = self.db.collection('SESSIONS')
+        if main_user:
+            sessions = sessions.where('main_user', '==', main_user) # server-side filter
+        return [(doc.id, doc.to_dict() or {}) for doc in sessions.get()]
+
+    def save_raw_data(self, date_str, session_id, payload):
+        self.db.collection('DATA').document('RAW_DATA').collection(date_str).document(session_id).set(payload)
+
+    def save_receipt(self, date_str, session_id, payload):
+        self.db.collection('DATA').document('RECEIPTS').collection(date_str).document(session_id).set(payload)
+
+    def save_summary(self, date_str, session_id, payload):
+        self._summary_ref(date_str, session_id).set(payload)
+
+    def iter_summaries(self, main_user=None):
+        """Summaries are fetched with batched multi-document reads (SUMMARY_READ_BATCH_SIZE per round trip)."""
+        refs = []
+        session_info = {}
+        for session_id, session_doc in self.list_sessions(main_user):
+            date_str = session_doc.get('timestamp', '').split('T')[0]
+            if not date_str:
+                continue
+            session_info[session_id] = (date_str, session_doc.get('main_user', None))
+            refs.append(self._summary_ref(date_str, session_id))
+        logging.info(f"Fetching summarised data for {len(refs)} sessions in batches of {SUMMARY_READ_BATCH_SIZE}")
+        for i in range(0, len(refs), SUMMARY_READ_BATCH_SIZE):
+            for sum_snap in self.db.get_all(refs[i:i + SUMMARY_READ_BATCH_SIZE]):
+                date_str, user_id = session_info[sum_snap.id]
+                sum_doc = sum_snap.to_dict() if sum_snap.exists else None
+                if sum_doc:
+                    yield sum_snap.id, date_str, user_id, sum_doc
+
+    def _aggregate_refs(self, user_id, session_id):
+        agg_ref = self.db.collection('SPEND_AGGREGATES').document(user_id)
+        return agg_ref, agg_ref.collection('SESSIONS').document(session_id)
+
+    def get_spend_aggregates(self, user_id):
+        doc = self.db.collection('SPEND_AGGREGATES').document(user_id).get()
+        return doc.to_dict() if doc.exists else None
+
+    def update_spend_aggregates(self, user_id, session_id, contribution):
+        """
+        SPEND_AGGREGATES -> {user_id}                            (totals per category, weekday, day)
+        SPEND_AGGREGATES -> {user_id} -> SESSIONS -> {session_id}  (this session's contribution)
+        Only the delta against the previous contribution is added. The read of the previous
+        contribution and both writes run in one transaction (retried on contention), so
+        concurrent saves of the same session by the API and the pipeline can't both apply
+        their delta against the same previous contribution.
+        """
+        from firebase_admin import firestore
+        agg_ref, contrib_ref = self._aggregate_refs(user_id, session_id)
+
+        @firestore.transactional
+        def apply(transaction):
+            previous = contrib_ref.get(transaction=transaction)
+            delta = contribution_delta(contribution, previous.to_dict() if previous.exists else None)
+            update = {'total_spend': firestore.Increment(delta['total_spend']), 'updated_at': datetime.now().isoformat()}
+            for field in ('categories', 'weekdays', 'days'):
+                if delta[field]:
+                    update[field] = {k: firestore.Increment(v) for k, v in delta[field].items()}
+            transaction.set(agg_ref, update, merge=True)
+            transaction.set(contrib_ref, contribution)
+
+        apply(self.db.transaction())
+
+    def replace_spend_aggregates(self, user_id, aggregates, contributions):
+        agg_ref = self.db.collection('SPEND_AGGREGATES').document(user_id)
+        for old in agg_ref.collection('SESSIONS').list_documents():
+            if old.id not in contributions:
+                old.delete()
+        batch = self.db.batch()
+        for i, (session_id, contribution) in enumerate(contributions.items(), start=1):
+            batch.set(agg_ref.collection('SESSIONS').document(session_id), contribution)
+            if i % 400 == 0: # Firestore batches are limited to 500 writes
+                batch.commit()
+                batch = self.db.batch()
+        batch.set(agg_ref, {**aggregates, 'updated_at': datetime.now().isoformat()})
+        batch.commit()
+
+    def get_item_categories(self, keys=None):
+        collection = self.db.collection('ITEM_CATEGORIES')
+        if keys is None:
+            return {doc.id: doc.to_dict() for doc in collection.stream()}
+        keys = list(keys)
+        entries = {}
+        for i in range(0, len(keys), SUMMARY_READ_BATCH_SIZE):
+            for snap in self.db.get_all([collection.document(key) for key in keys[i:i + SUMMARY_READ_BATCH_SIZE]]):
+                if snap.exists:
+                    entries[snap.id] = snap.to_dict()
+        return entries
+
+    def _write_item_categories(self, docs, merge):
+        batch = self.db.batch()
+        for i, (key, doc) in enumerate(docs.items(), start=1):
+            batch.set(self.db.collection('ITEM_CATEGORIES').document(key), doc, merge=merge)
+            if i % 400 == 0: # Firestore batches are limited to 500 writes
+                batch.commit()
+                batch = self.db.batch()
+        batch.commit()
+
+    def record_item_categories(self, observations):
+        from firebase_admin import firestore
+        now = datetime.now().isoformat()
+        self._write_item_categories({key: {
+            'item': observation['item'],
+            'counts': {observation['category']: firestore.Increment(1)},
+            'updated_at': now,
+        } for key, observation in observations.items()}, merge=True)
+
+    def replace_item_categories(self, entries):
+        now = datetime.now().isoformat()
+        self._write_item_categories({key: {**entry, 'updated_at': now} for key, entry in entries.items()}, merge=False)
+
+    def get_ocr_cache_entry(self, key):
+        doc = self.db.collection('OCR_CACHE').document(key).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        return {'stored_at': data['stored_at'], 'value': json.loads(data['value'])}
+
+    def save_ocr_cache_entry(self, key, entry, ttl_seconds):
+        """
+        The value is kept as a JSON string (Document AI dicts contain nested lists
+        Firestore can't store); oversized results are skipped.
+        """
+        value = json.dumps(entry['value'], default=str)
+        if len(value) > 900_000:
+            logging.warning(f"OCR cache entry {key} too large for Firestore ({len(value)} bytes), not cached")
+            return
+        self.db.collection('OCR_CACHE').document(key).set({
+            'stored_at': entry['stored_at'],
+            'expires_at': datetime.fromtimestamp(entry['stored_at'] + ttl_seconds),
+            'value': value,
+        })
+
+    def delete_ocr_cache_entry(self, key):
+        self.db.collection('OCR_CACHE').document(key).delete()
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (primary_id TEXT PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS user_identifiers (
+    field TEXT NOT NULL, value TEXT NOT NULL, primary_id TEXT NOT NULL, PRIMARY KEY (field, value));
+CREATE INDEX IF NOT EXISTS idx_user_identifiers_user ON user_identifiers (primary_id);
+CREATE TABLE IF NOT EXISTS sessions (session_id TEXT PRIMARY KEY, main_user TEXT, date TEXT, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_date ON sessions (main_user, date);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions (date);
+CREATE TABLE IF NOT EXISTS raw_data (session_id TEXT PRIMARY KEY, date TEXT NOT NULL, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_raw_data_date ON raw_data (date);
+CREATE TABLE IF NOT EXISTS receipts (session_id TEXT PRIMARY KEY, date TEXT NOT NULL, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_receipts_date ON receipts (date);
+CREATE TABLE IF NOT EXISTS summaries (session_id TEXT PRIMARY KEY, date TEXT NOT NULL, data TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_summaries_date ON summaries (date);
+CREATE TABLE IF NOT EXISTS spend_lines (
+    user_id TEXT NOT NULL, session_id TEXT NOT NULL, date TEXT, category TEXT NOT NULL, total REAL NOT NULL,
+    PRIMARY KEY (user_id, session_id, category));
+CREATE INDEX IF NOT EXISTS idx_spend_lines_user_date ON spend_lines (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_spend_lines_session ON spend_lines (session_id);
+CREATE TABLE IF NOT EXISTS item_categories (key TEXT PRIMARY KEY, item TEXT NOT NULL, updated_at TEXT);
+CREATE TABLE IF NOT EXISTS item_category_counts (
+    key TEXT NOT NULL, category TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (key, category));
+CREATE TABLE IF NOT EXISTS ocr_cache (key TEXT PRIMARY KEY, stored_at REAL NOT NULL, expires_at REAL NOT NULL, value TEXT NOT NULL);
+"""
+
+def _dumps(doc):
+    return json.dumps(doc, default=str, ensure_ascii=False)
+
+def spend_lines(contribution):
+    """(date, category, total) rows of a session contribution (one date per session)."""
+    date_str = next(iter(contribution.get('days') or {}), None)
+    return [(date_str, category, total) for category, total in contribution['categories'].items()]
+
+class SQLiteStorage(Storage):
+    """
+    One SQLite database in WAL mode (readers never block the writer). Each thread of
+    each process opens its own connection; writes run in short BEGIN IMMEDIATE
+    transactions. Documents are stored as JSON next to the indexed columns.
+    """
+    def __init__(self, path=SQLITE_PATH, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._conn().executescript(SQLITE_SCHEMA)
+        logging.info(f"SQLite storage at {os.path.abspath(path)}")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid(): # no connection reuse across fork()
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _one(self, sql, params=()):
+        return self._conn().execute(sql, params).fetchone()
+
+    def get_user(self, primary_id):
+        row = self._one('SELECT data FROM users WHERE primary_id = ?', (primary_id,))
+        return json.loads(row[0]) if row else None
+
+    def merge_user(self, primary_id, fields):
+        with self._write() as conn:
+            row = conn.execute('SELECT data FROM users WHERE primary_id = ?', (primary_id,)).fetchone()
+            doc = {**(json.loads(row[0]) if row else {}), **fields}
+            conn.execute('INSERT OR REPLACE INTO users (primary_id, data) VALUES (?, ?)', (primary_id, _dumps(doc)))
+            # Identifiers (source ids, session_id, auth uid) are looked up by find_user
+            identifiers = [(field, value, primary_id) for field, value in fields.items() if isinstance(value, str)]
+            conn.executemany('DELETE FROM user_identifiers WHERE field = ? AND primary_id = ?',
+                             [(field, primary_id) for field, _, _ in identifiers])
+            conn.executemany('INSERT OR REPLACE INTO user_identifiers (field, value, primary_id) VALUES (?, ?, ?)', identifiers)
+
+    def find_user(self, field, value):
+        row = self._one('SELECT primary_id FROM user_identifiers WHERE field = ? AND value = ?', (field, str(value)))
+        return row[0] if row else None
+
+    def get_session(self, session_id):
+        row = self._one('SELECT data FROM sessions WHERE session_id = ?', (session_id,))
+        return json.loads(row[0]) if row else None
+
+    def set_session(self, session_id, fields, merge=False):
+        with self._write() as conn:
+            doc = fields
+            if merge:
+                row = conn.execute('SELECT data FROM sessions WHERE session_id = ?', (session_id,)).fetchone()
+                doc = {**(json.loads(row[0]) if row else {}), **fields}
+            date_str = str(doc.get('timestamp') or '').split('T')[0] or None
+            conn.execute('INSERT OR REPLACE INTO sessions (session_id, main_user, date, data) VALUES (?, ?, ?, ?)',
+                         (session_id, doc.get('main_user'), date_str, _dumps(doc)))
+
+    def list_sessions(self, main_user=None):
+        if main_user:
+            rows = self._conn().execute('SELECT session_id, data FROM sessions WHERE main_user = ?', (main_user,))
+        else:
+            rows = self._conn().execute('SELECT session_id, data FROM sessions')
+        return [(session_id, json.loads(data)) for session_id, data in rows]
+
+    def _save(self, table, date_str, session_id, payload):
+        with self._write() as conn:
+            conn.execute(f'INSERT OR REPLACE INTO {table} (session_id, date, data) VALUES (?, ?, ?)',
+                         (session_id, date_str, _dumps(payload)))
+
+    def save_raw_data(self, date_str, session_id, payload):
+        self._save('raw_data', date_str, session_id, payload)
+
+    def save_receipt(self, date_str, session_id, payload):
+        self._save('receipts', date_str, session_id, payload)
+
+    def save_summary(self, date_str, session_id, payload):
+        self._save('summaries', date_str, session_id, payload)
+
+    def iter_summaries(self, main_user=None):
+        """One indexed join of sessions (main_user, date) and summaries (session_id)."""
+        sql = ('SELECT s.session_id, s.date, s.main_user, m.data FROM sessions s '
+               'JOIN summaries m ON m.session_id = s.session_id AND m.date = s.date')
+        params = ()
+        if main_user:
+            sql += ' WHERE s.main_user = ?'
+            params = (main_user,)
+        for session_id, date_str, user_id, data in self._conn().execute(sql + ' ORDER BY s.date', params).fetchall():
+            sum_doc = json.loads(data)
+            if sum_doc:
+                yield session_id, date_str, user_id, sum_doc
+
+    def get_spend_aggregates(self, user_id):
+        """Aggregated from the user's spend_lines with GROUP BY queries on the (user_id, date) index."""
+        conn = self._conn()
+        categories = dict(conn.execute(
+            'SELECT category, SUM(total) FROM spend_lines WHERE user_id = ? GROUP BY category', (user_id,)).fetchall())
+        if not categories:
+            return None
+        aggregates = empty_aggregates()
+        aggregates['categories'] = categories
+        aggregates['total_spend'] = sum(categories.values())
+        aggregates['days'] = dict(conn.execute(
+            'SELECT date, SUM(total) FROM spend_lines WHERE user_id = ? AND date IS NOT NULL GROUP BY date', (user_id,)).fetchall())
+        for date_str, total in aggregates['days'].items():
+            weekday = calendar.day_name[datetime.strptime(date_str, '%Y-%m-%d').weekday()]
+            aggregates['weekdays'][weekday] = aggregates['weekdays'].get(weekday, 0.0) + total
+        return aggregates
+
+    def update_spend_aggregates(self, user_id, session_id, contribution):
+        with self._write() as conn:
+            conn.execute('DELETE FROM spend_lines WHERE user_id = ? AND session_id = ?', (user_id, session_id))
+            conn.executemany('INSERT INTO spend_lines (user_id, session_id, date, category, total) VALUES (?, ?, ?, ?, ?)',
+                             [(user_id, session_id, *line) for line in spend_lines(contribution)])
+
+    def replace_spend_aggregates(self, user_id, aggregates, contributions):
+        with self._write() as conn:
+            conn.execute('DELETE FROM spend_lines WHERE user_id = ?', (user_id,))
+            conn.executemany('INSERT INTO spend_lines (user_id, session_id, date, category, total) VALUES (?, ?, ?, ?, ?)',
+                             [(user_id, session_id, *line)
+                              for session_id, contribution in contributions.items() for line in spend_lines(contribution)])
+
+    def get_item_categories(self, keys=None):
+        conn = self._conn()
+        if keys is None:
+            items = conn.execute('SELECT key, item, updated_at FROM item_categories').fetchall()
+            counts = conn.execute('SELECT key, category, count FROM item_category_counts').fetchall()
+        else:
+            keys = list(keys)
+            items, counts = [], []
+            for i in range(0, len(keys), 500): # stay under SQLite's bound parameter limit
+                chunk = keys[i:i + 500]
+                marks = ','.join('?' * len(chunk))
+                items += conn.execute(f'SELECT key, item, updated_at FROM item_categories WHERE key IN ({marks})', chunk).fetchall()
+                counts += conn.execute(f'SELECT key, category, count FROM item_category_counts WHERE key IN ({marks})', chunk).fetchall()
+        entries = {key: {'item': item, 'counts': {}, 'updated_at': updated_at} for key, item, updated_at in items}
+        for key, category, count in counts:
+            if key in entries:
+                entries[key]['counts'][category] = count
+        return entries
+
+    def record_item_categories(self, observations):
+        now = datetime.now().isoformat()
+        with self._write() as conn:
+            conn.executemany('INSERT OR REPLACE INTO item_categories (key, item, updated_at) VALUES (?, ?, ?)',
+                             [(key, observation['item'], now) for key, observation in observations.items()])
+            conn.executemany('INSERT INTO item_category_counts (key, category, count) VALUES (?, ?, 1) '
+                             'ON CONFLICT (key, category) DO UPDATE SET count = count + 1',
+                             [(key, observation['category']) for key, observation in observations.items()])
+
+    def replace_item_categories(self, entries):
+        now = datetime.now().isoformat()
+        with self._write() as conn:
+            conn.executemany('INSERT OR REPLACE INTO item_categories (key, item, updated_at) VALUES (?, ?, ?)',
+                             [(key, entry['item'], now) for key, entry in entries.items()])
+            conn.executemany('DELETE FROM item_category_counts WHERE key = ?', [(key,) for key in entries])
+            conn.executemany('INSERT INTO item_category_counts (key, category, count) VALUES (?, ?, ?)',
+                             [(key, category, count) for key, entry in entries.items() for category, count in entry['counts'].items()])
+
+    def get_ocr_cache_entry(self, key):
+        row = self._one('SELECT stored_at, value FROM ocr_cache WHERE key = ?', (key,))
+        return {'stored_at': row[0], 'value': json.loads(row[1])} if row else None
+
+    def save_ocr_cache_entry(self, key, entry, ttl_seconds):
+        with self._write() as conn:
+            conn.execute('INSERT OR REPLACE INTO ocr_cache (key, stored_at, expires_at, value) VALUES (?, ?, ?, ?)',
+                         (key, entry['stored_at'], entry['stored_at'] + ttl_seconds, json.dumps(entry['value'], default=str)))
+
+    def delete_ocr_cache_entry(self, key):
+        with self._write() as conn:
+            conn.execute('DELETE FROM ocr_cache WHERE key = ?', (key,))
+
+def create_storage(backend_name=None):
+    """Build the backend configured by STORAGE_BACKEND ('firestore' or 'sqlite')."""
+    backend_name = (backend_name or STORAGE_BACKEND).lower()
+    if backend_name == 'sqlite':
+        return SQLiteStorage(SQLITE_PATH)
+    if backend_name != 'firestore':
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend_name}")
+    logging.info("Firestore storage (initialised on first use)")
+    return FirestoreStorage()
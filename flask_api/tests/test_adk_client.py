@@ -0,0 +1,19 @@
+import asyncio
+from gcp_adk_classification import ADKClient, AsyncADKClient
+
+def test_async_client_shares_the_base_setup():
+    client = AsyncADKClient('http://adk:8000/', 'receipt_classifier', session_id='s1', timeout=(3, 30))
+    base = ADKClient('http://adk:8000/', 'receipt_classifier', session_id='s1', timeout=(3, 30))
+    assert client.custom_session_url() == base.custom_session_url()
+    assert client.headers == base.headers and client.timeout == base.timeout
+    assert client.http is None and client._owns_http
+    assert client.client_timeout.connect == 3 and client.client_timeout.sock_read == 30
+
+def test_async_client_owns_its_session_until_closed():
+    async def run():
+        client = AsyncADKClient('http://adk:8000', 'receipt_classifier')
+        session = client._session()
+        assert client._session() is session # reused across calls
+        await client.close()
+        assert session.closed
+    asyncio.run(run())
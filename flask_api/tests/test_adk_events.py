@@ -0,0 +1,21 @@
+from gcp_adk_classification import extract_saved_categories, state_values
+
+CATEGORIES = [{'category': 'Groceries', 'items': ['Milk'], 'total_price': '2.50'}]
+
+def state_event(author, **delta):
+    return {'author': author, 'actions': {'stateDelta': delta}}
+
+def test_saved_categories_come_from_the_last_save_result():
+    events = [
+        state_event('ClassifierRouter', stage_init_classification={'classified': []}),
+        state_event('response_agent', firebase_save_result={'result': 'success', 'message': 'saved', 'data': CATEGORIES}),
+        state_event('summary_agent', classification_summary='ok'),
+    ]
+    assert extract_saved_categories(events) == CATEGORIES
+    assert state_values(events, 'classification_summary') == ['ok']
+
+def test_failed_or_missing_save_returns_none():
+    failed = [state_event('response_agent', firebase_save_result={'result': 'error', 'message': 'down'})]
+    assert extract_saved_categories(failed) is None
+    assert extract_saved_categories([state_event('ClassifierRouter', grouped=[])]) is None
+    assert extract_saved_categories(None) is None
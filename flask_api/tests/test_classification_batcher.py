@@ -0,0 +1,66 @@
+"""ClassificationBatcher with a stub run_batch: full batches, the window, receipts left alone and failed batches."""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from batch_classification import ClassificationBatcher, build_batch_prompt, split_batch_results, saved_categories
+
+def prompt(receipt_id):
+    return json.dumps({'line_items': [f'1 {receipt_id} 1.00'], 'receipt_total_value': {'total_amount': '1.00'}})
+
+class StubRun:
+    """Records the batches; every receipt is saved unless listed in residual."""
+    def __init__(self, residual=(), error=None):
+        self.batches = []
+        self.residual = set(residual)
+        self.error = error
+        self.lock = threading.Lock()
+
+    def __call__(self, receipts):
+        with self.lock:
+            self.batches.append([receipt_id for receipt_id, _ in receipts])
+        if self.error:
+            raise self.error
+        return {receipt_id: ({'refinement_loop': 'residual'} if receipt_id in self.residual else
+                             {'refinement_loop': 'skipped', 'firebase_save_result': {'result': 'success', 'data': [receipt_id]}})
+                for receipt_id, _ in receipts}
+
+def classify_all(batcher, receipt_ids):
+    with ThreadPoolExecutor(len(receipt_ids)) as pool:
+        return dict(zip(receipt_ids, pool.map(lambda receipt_id: batcher.classify(receipt_id, prompt(receipt_id)), receipt_ids)))
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    run = StubRun(residual=['r2'])
+    batcher = ClassificationBatcher(run, max_size=3, window=30) # a window the test would time out on
+    results = classify_all(batcher, ['r1', 'r2', 'r3'])
+    assert [sorted(batch) for batch in run.batches] == [['r1', 'r2', 'r3']]
+    assert saved_categories(results['r1']) == ['r1']
+    assert results['r2'] == {'refinement_loop': 'residual'} and saved_categories(results['r2']) is None
+    assert batcher.stats()['batches'] == 1 and batcher.stats()['batched_receipts'] == 3
+
+def test_window_sends_a_partial_batch_once():
+    run = StubRun()
+    batcher = ClassificationBatcher(run, max_size=8, window=0.2)
+    results = classify_all(batcher, ['r1', 'r2', 'r3'])
+    assert len(run.batches) == 1 and sorted(run.batches[0]) == ['r1', 'r2', 'r3']
+    assert all(saved_categories(result) == [receipt_id] for receipt_id, result in results.items())
+    assert batcher.stats()['pending'] == 0
+
+def test_receipt_alone_in_its_window_runs_on_its_own():
+    run = StubRun()
+    batcher = ClassificationBatcher(run, max_size=4, window=0.05)
+    assert batcher.classify('r1', prompt('r1')) is None # the caller runs the single-receipt pipeline
+    assert run.batches == []
+    assert batcher.stats()['alone'] == 1
+
+def test_failed_batch_sends_every_receipt_back():
+    run = StubRun(error=ConnectionError("ADK unavailable"))
+    batcher = ClassificationBatcher(run, max_size=2, window=5)
+    assert classify_all(batcher, ['r1', 'r2']) == {'r1': None, 'r2': None}
+    assert batcher.stats()['failed_batches'] == 1
+
+def test_batch_prompt_and_results():
+    request = json.loads(build_batch_prompt([('r1', prompt('r1'))]))
+    assert request == {'receipts': [{'receipt_id': 'r1', **json.loads(prompt('r1'))}]}
+    events = [{'actions': {'stateDelta': {'batch_results': {'r1': {'refinement_loop': 'skipped'}}}}}, {'actions': {}}]
+    assert split_batch_results(events) == {'r1': {'refinement_loop': 'skipped'}}
+    assert split_batch_results([]) == {}
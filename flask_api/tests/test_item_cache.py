@@ -0,0 +1,70 @@
+from item_cache import ItemCategoryCache, StoredItemCategories, create_item_cache, item_key, merge_categories, adjusted_totals
+
+class CountingStore:
+    """In-memory ITEM_CATEGORIES that records which keys each load() asked for."""
+    def __init__(self, entries):
+        self.entries = entries
+        self.loads = []
+        self.recorded = []
+
+    def load(self, keys=None):
+        self.loads.append(None if keys is None else sorted(keys))
+        return {key: entry for key, entry in self.entries.items() if keys is None or key in keys}
+
+    def record(self, observations):
+        self.recorded.append(observations)
+        for key, observation in observations.items():
+            counts = self.entries.setdefault(key, entry(observation['item']))['counts']
+            counts[observation['category']] = counts.get(observation['category'], 0) + 1
+
+def entry(item, **counts):
+    return {'item': item, 'counts': counts}
+
+def test_only_the_receipts_items_are_loaded():
+    entries = {item_key(f'Item {i}'): entry(f'Item {i}', Groceries=5) for i in range(1000)}
+    entries[item_key('Milk')] = entry('Milk', Groceries=3)
+    store = CountingStore(entries)
+    cache = ItemCategoryCache(store, min_count=2)
+    known, unknown = cache.split_line_items(['1 Milk 2.50', '1 Caviar 99.00'])
+    assert [k['item'] for k in known] == ['Milk'] and unknown == ['1 Caviar 99.00']
+    assert store.loads == [sorted([item_key('Milk'), item_key('Caviar')])]
+
+def test_loaded_and_missing_keys_are_not_read_again_until_stale():
+    store = CountingStore({item_key('Milk'): entry('Milk', Groceries=3)})
+    cache = ItemCategoryCache(store, min_count=2, refresh_seconds=600)
+    cache.split_line_items(['1 Milk 2.50', '1 Caviar 99.00'])
+    cache.split_line_items(['1 Milk 2.50', '1 Caviar 99.00'])
+    assert len(store.loads) == 1
+    cache.refresh_seconds = 0
+    cache.split_line_items(['1 Milk 2.50'])
+    assert store.loads[-1] == [item_key('Milk')]
+
+def test_ambiguous_items_go_to_the_llm():
+    store = CountingStore({item_key('Wrap'): entry('Wrap', **{'Fast Food': 2, 'Groceries': 2})})
+    known, unknown = ItemCategoryCache(store, min_count=2).split_line_items(['1 Wrap 6.00'])
+    assert known == [] and unknown == ['1 Wrap 6.00']
+
+def test_learned_items_are_classified_locally_and_recorded():
+    store = CountingStore({})
+    cache = ItemCategoryCache(store, min_count=2)
+    for _ in range(2):
+        cache.learn([{'category': 'Groceries', 'items': ['Bread'], 'total_price': '1.05'}])
+    known, _ = cache.split_line_items(['2 Bread 2.10'])
+    assert known == [{'item': 'Bread', 'quantity': '2', 'price': '2.10', 'category': 'Groceries'}]
+    assert len(store.recorded) == 2
+
+def test_merge_and_adjusted_totals():
+    merged = merge_categories([{'category': 'Groceries', 'items': ['Milk'], 'total_price': '2.50'}],
+                              [{'category': 'Groceries', 'items': ['Bread'], 'total_price': '1.05'}])
+    assert merged == [{'category': 'Groceries', 'items': ['Milk', 'Bread'], 'total_price': '3.55'}]
+    assert adjusted_totals({'total_amount': '10.00', 'net_amount': '9.00', 'total_tax_amount': '1.00'}, 2) == \
+        {'total_amount': '8.00', 'net_amount': '7.00', 'total_tax_amount': '1.00'}
+
+def test_cache_is_off_unless_configured(monkeypatch):
+    monkeypatch.delenv('ITEM_CACHE_BACKEND', raising=False)
+    assert create_item_cache() is None
+    monkeypatch.setenv('ITEM_CACHE_BACKEND', 'memory')
+    assert create_item_cache().store is None
+    for name in ('store', 'firestore'): # the old name still works
+        monkeypatch.setenv('ITEM_CACHE_BACKEND', name)
+        assert isinstance(create_item_cache().store, StoredItemCategories)
@@ -0,0 +1,49 @@
+"""line_item_parser: text and Document AI property parsing, confidence and the prompt items."""
+from decimal import Decimal
+from line_item_parser import to_decimal, parse_line_item, parse_line_items, properties_by_line, prompt_items
+
+def test_to_decimal():
+    assert to_decimal('$21.95') == Decimal('21.95')
+    assert to_decimal('21,95') == Decimal('21.95')
+    assert to_decimal('1,299.00') == Decimal('1299.00')
+    assert to_decimal('n/a') is None and to_decimal(None) is None
+
+def test_text_line_with_quantity():
+    parsed = parse_line_item('2 Bread 2.10')
+    assert (parsed['item'], parsed['quantity'], parsed['unit_price'], parsed['price']) == ('Bread', Decimal('2'), Decimal('1.05'), Decimal('2.10'))
+    assert parsed['confidence'] == 0.9 and parsed['source'] == 'text' and parsed['line'] == '2 Bread 2.10'
+
+def test_defaulted_quantity_and_decimal_comma_lower_the_confidence():
+    assert parse_line_item('Mozzarella&Tomato 9.95')['confidence'] == 0.8
+    parsed = parse_line_item('Milk 1,99')
+    assert parsed['price'] == Decimal('1.99') and parsed['confidence'] == 0.7
+
+def test_unparsed_line():
+    parsed = parse_line_item('Thank   you')
+    assert parsed['item'] == 'Thank you' and parsed['price'] is None
+    assert parsed['confidence'] == 0.0 and parsed['source'] == 'unparsed'
+
+def test_entity_properties_win_when_consistent():
+    properties = {'description': 'Pork Chop', 'quantity': '2', 'unit_price': '10.00', 'amount': '20.00'}
+    parsed = parse_line_item('2 Pork Chp 20.00', properties)
+    assert parsed['item'] == 'Pork Chop' and parsed['price'] == Decimal('20.00')
+    assert parsed['confidence'] == 1.0 and parsed['source'] == 'entity'
+
+def test_amount_is_computed_and_disagreement_is_flagged():
+    parsed = parse_line_item('3 Eggs 0.99', {'description': 'Eggs', 'quantity': '3', 'unit_price': '0.33'})
+    assert parsed['price'] == Decimal('0.99') and parsed['confidence'] == 1.0
+    parsed = parse_line_item('1 Eggs 0.99', {'description': 'Eggs', 'amount': '1.99'})
+    assert parsed['price'] == Decimal('1.99') and parsed['confidence'] == 0.7
+
+def test_properties_without_amount_fall_back_to_the_text():
+    parsed = parse_line_item('1 Tea 2.00', {'description': 'Tea'})
+    assert parsed['source'] == 'text' and parsed['price'] == Decimal('2.00')
+
+def test_properties_are_matched_by_line_text():
+    lines = ['1 Tea 2.00', '1 Cake 3.00']
+    properties = properties_by_line(lines, [{}, {'description': 'Cheesecake', 'amount': '3.00'}])
+    assert properties == {'1 Cake 3.00': {'description': 'Cheesecake', 'amount': '3.00'}}
+    assert [p['item'] for p in parse_line_items(lines, properties)] == ['Tea', 'Cheesecake']
+
+def test_prompt_items_are_strings():
+    assert prompt_items(parse_line_items(['1.5 Cheese 4.5'])) == [{'item': 'Cheese', 'quantity': '1.5', 'price': '4.50'}]
@@ -0,0 +1,109 @@
+"""OCRCache TTL and error handling, and the memory (LRU by count and bytes) and disk backends' eviction."""
+import os
+import time
+import pytest
+import ocr_cache
+from ocr_cache import OCRCache, MemoryLRUBackend, DiskBackend, create_ocr_cache, image_key
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ocr_cache, 'time', clock)
+    return clock
+
+class BrokenBackend(MemoryLRUBackend):
+    def __init__(self, fail_on):
+        super().__init__()
+        self.fail_on = fail_on
+
+    def get(self, key):
+        if 'get' in self.fail_on:
+            raise ConnectionError("read failed")
+        return super().get(key)
+
+    def delete(self, key):
+        if 'delete' in self.fail_on:
+            raise ConnectionError("delete failed")
+        super().delete(key)
+
+def test_hits_until_the_ttl_expires(clock):
+    cache = OCRCache(MemoryLRUBackend(), ttl_seconds=60)
+    cache.set('k', {'text': 'receipt'})
+    clock.now += 59
+    assert cache.get('k') == {'text': 'receipt'}
+    clock.now += 2
+    assert cache.get('k') is None
+    assert cache.backend.get('k') is None # expired entries are deleted
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1 and cache.stats()['hit_rate'] == 0.5
+
+def test_failed_delete_of_an_expired_entry_is_a_miss(clock):
+    cache = OCRCache(BrokenBackend(fail_on={'delete'}), ttl_seconds=60)
+    cache.set('k', {'text': 'receipt'})
+    clock.now += 61
+    assert cache.get('k') is None
+    assert cache.stats()['errors'] == 1 and cache.stats()['misses'] == 1
+
+def test_read_and_write_errors_are_misses():
+    cache = OCRCache(BrokenBackend(fail_on={'get'}))
+    assert cache.get('k') is None
+    cache.backend = None # set() on a missing backend
+    cache.set('k', {})
+    assert cache.stats()['errors'] == 2
+
+def test_memory_backend_evicts_least_recently_used_by_count():
+    backend = MemoryLRUBackend(max_entries=2)
+    backend.set('a', {'v': 1})
+    backend.set('b', {'v': 2})
+    backend.get('a') # a is now the most recent
+    backend.set('c', {'v': 3})
+    assert backend.get('b') is None and backend.get('a') == {'v': 1} and backend.get('c') == {'v': 3}
+    assert backend.evictions == 1
+
+def test_memory_backend_evicts_by_serialized_size():
+    backend = MemoryLRUBackend(max_entries=100, max_bytes=250)
+    for key in 'abc':
+        backend.set(key, {'v': 'x' * 100})
+    assert backend.get('a') is None and backend.get('c') is not None
+    assert backend._bytes <= 250
+    backend.set('c', {'v': 'y'}) # replacing an entry releases its size
+    backend.delete('b')
+    assert backend._bytes == len('{"v": "y"}')
+
+def test_disk_backend_round_trip_and_eviction(tmp_path):
+    backend = DiskBackend(str(tmp_path), max_entries=2)
+    for i, key in enumerate(['a', 'b', 'c']):
+        backend.set(key, {'stored_at': i, 'value': key})
+        past = time.time() - 100 + i
+        os.utime(tmp_path / f'{key}.json.gz', (past, past)) # distinct mtimes, older than the next write
+    backend.set('d', {'stored_at': 3, 'value': 'd'})
+    assert sorted(os.listdir(tmp_path)) == ['c.json.gz', 'd.json.gz']
+    assert backend.get('c') == {'stored_at': 2, 'value': 'c'}
+    assert backend.evictions == 2
+
+def test_disk_backend_evicts_by_size(tmp_path):
+    backend = DiskBackend(str(tmp_path), max_entries=100, max_bytes=1)
+    backend.set('a', {'value': 'x'})
+    assert os.listdir(tmp_path) == [] and backend.evictions == 1
+
+def test_unreadable_disk_entry_is_removed(tmp_path):
+    backend = DiskBackend(str(tmp_path))
+    (tmp_path / 'bad.json.gz').write_bytes(b'not gzip')
+    assert backend.get('bad') is None
+    assert not (tmp_path / 'bad.json.gz').exists()
+
+def test_create_ocr_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv('OCR_CACHE_BACKEND', 'none')
+    assert create_ocr_cache() is None
+    monkeypatch.setenv('OCR_CACHE_BACKEND', 'disk')
+    monkeypatch.setenv('OCR_CACHE_DIR', str(tmp_path / 'ocr'))
+    monkeypatch.setenv('OCR_CACHE_TTL_SECONDS', '60')
+    cache = create_ocr_cache()
+    assert isinstance(cache.backend, DiskBackend) and cache.ttl_seconds == 60
+    assert image_key(b'abc') == image_key(b'abc') != image_key(b'abd')
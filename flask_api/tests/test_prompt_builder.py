@@ -0,0 +1,52 @@
+"""build_classification_prompt: whitelisted context, duplicate merging, shortening and the token budget."""
+import json
+from prompt_builder import build_classification_prompt, merge_duplicate_lines, shorten_item, whitelisted_fields, estimate_tokens
+
+TOTALS = {'total_amount': '20.00', 'net_amount': '20.00'}
+GROUPED = {
+    'supplier_name': ['  Corner   Shop '],
+    'supplier_address': ['1 Main Street'],
+    'supplier_phone': ['555-0100'],
+    'line_item': ['1 Coffee 3.50', '1 Bagel 2.25'],
+}
+
+def test_only_whitelisted_fields_are_sent():
+    prompt, report = build_classification_prompt(['1 Coffee 3.50'], TOTALS, GROUPED, parse_items=False)
+    payload = json.loads(prompt)
+    assert payload['grouped'] == {'supplier_name': ['Corner Shop']}
+    assert payload['line_items'] == ['1 Coffee 3.50'] and payload['receipt_total_value'] == TOTALS
+    assert prompt == json.dumps(payload, separators=(',', ':'), ensure_ascii=False) # compact JSON
+    assert report['tokens'] == estimate_tokens(prompt) and report['omitted'] == []
+
+def test_whitelisted_fields_drop_empty_values_and_cap_them():
+    assert whitelisted_fields({'supplier_name': ['', None]}) == {}
+    assert whitelisted_fields({'supplier_name': list('abcde')}) == {'supplier_name': ['a', 'b', 'c']}
+    assert whitelisted_fields({'supplier_name': 'Shop'}) == {'supplier_name': ['Shop']}
+
+def test_duplicate_lines_are_merged_keeping_order():
+    lines = ['1 Coffee 3.50', '1 Bagel 2.25', '1 coffee 3.50', 'Thank you']
+    assert merge_duplicate_lines(lines) == ['2 Coffee 7.00', '1 Bagel 2.25', 'Thank you']
+
+def test_long_item_names_are_cut_keeping_quantity_and_price():
+    assert shorten_item('2 ' + 'x' * 80 + ' 4.00', max_chars=10) == '2 xxxxxxxxxx 4.00'
+    assert shorten_item('1 Milk 1.99', max_chars=10) == '1 Milk 1.99'
+
+def test_lines_over_budget_are_omitted_and_totals_reduced():
+    lines = [f'1 Item number {i} 1.00' for i in range(100)]
+    prompt, report = build_classification_prompt(lines, {'total_amount': '100.00'}, token_budget=200, parse_items=False)
+    payload = json.loads(prompt)
+    assert estimate_tokens(prompt) <= 200
+    assert report['lines_sent'] == len(payload['line_items']) < 100
+    assert report['omitted'] == lines[report['lines_sent']:]
+    assert payload['receipt_total_value']['total_amount'] == f"{report['lines_sent']:.2f}"
+
+def test_parsed_items_are_sent_when_every_line_parses():
+    prompt, report = build_classification_prompt(['2 Bread 2.10', '1 Milk 1.99'], TOTALS)
+    assert report['parsed'] is True
+    assert json.loads(prompt)['parsed_items'] == [{'item': 'Bread', 'quantity': '2', 'price': '2.10'},
+                                                  {'item': 'Milk', 'quantity': '1', 'price': '1.99'}]
+
+def test_unparsable_line_falls_back_to_line_items():
+    prompt, report = build_classification_prompt(['2 Bread 2.10', 'Bag fee'], TOTALS)
+    assert report['parsed'] is False and report['min_confidence'] == 0.0
+    assert json.loads(prompt)['line_items'] == ['2 Bread 2.10', 'Bag fee']
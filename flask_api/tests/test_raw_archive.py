@@ -0,0 +1,19 @@
+import pytest
+from raw_archive import LocalBlobStore, RawDocumentArchive, create_raw_archive
+
+def test_archive_round_trip(tmp_path):
+    archive = RawDocumentArchive(LocalBlobStore(str(tmp_path)), 'gzip')
+    document = {'text': 'MILK 2.50', 'pages': [{'tokens': [[0, 4], [5, 9]]}]}
+    pointer = archive.archive('2025-01-01', 'session-1', document)
+    assert pointer['codec'] == 'gzip' and pointer['stored_bytes'] > 0
+    assert archive.load(pointer) == document
+
+def test_gcs_backend_needs_a_bucket(monkeypatch):
+    monkeypatch.setenv('RAW_ARCHIVE_BACKEND', 'gcs')
+    monkeypatch.delenv('RAW_ARCHIVE_BUCKET', raising=False)
+    with pytest.raises(ValueError, match='RAW_ARCHIVE_BUCKET'):
+        create_raw_archive()
+
+def test_firestore_backend_stores_inline(monkeypatch):
+    monkeypatch.setenv('RAW_ARCHIVE_BACKEND', 'firestore')
+    assert create_raw_archive() is None
@@ -0,0 +1,112 @@
+"""
+Spend contribution rules and FirestoreStorage.update_spend_aggregates, whose read of the
+previous contribution and both writes run in one transaction (in-memory stand-in).
+"""
+import pytest
+from firebase_admin import firestore
+from spend_aggregates import empty_aggregates, summary_contribution, contribution_delta, add_contribution, summary_from_aggregates
+from storage import FirestoreStorage
+
+def categories(*totals):
+    return [{'category': category, 'items': [category], 'total_price': total} for category, total in totals]
+
+def test_contribution_skips_tax_zero_and_invalid_totals():
+    contribution = summary_contribution(categories(('Groceries', '10.50'), ('Tax', '1.00'), ('Others', '0'), ('Fast Food', 'n/a')), '2025-03-01')
+    assert contribution == {'total_spend': 10.5, 'categories': {'Groceries': 10.5},
+                            'weekdays': {'Saturday': 10.5}, 'days': {'2025-03-01': 10.5}}
+
+def test_delta_against_the_previous_contribution():
+    old = summary_contribution(categories(('Groceries', '10.00')), '2025-03-01')
+    new = summary_contribution(categories(('Groceries', '6.00'), ('Others', '2.00')), '2025-03-01')
+    delta = contribution_delta(new, old)
+    assert delta['total_spend'] == -2.0
+    assert delta['categories'] == {'Groceries': -4.0, 'Others': 2.0}
+    assert contribution_delta(new, new) == {'total_spend': 0.0, 'categories': {}, 'weekdays': {}, 'days': {}}
+
+def test_summary_payload():
+    aggregates = add_contribution(empty_aggregates(), summary_contribution(categories(('Groceries', '9.00')), '2025-03-01'))
+    add_contribution(aggregates, summary_contribution(categories(('Others', '3.00')), '2025-03-03'))
+    summary = summary_from_aggregates(aggregates)
+    assert summary['total_monthly_spend'] == 12.0 and summary['average_daily_spend'] == 6.0
+    assert summary['top_category'] == 'Groceries'
+    assert summary_from_aggregates(None) is None
+
+class FakeRef:
+    def __init__(self, db, path):
+        self.db, self.path, self.id = db, path, path[-1]
+
+    def collection(self, name):
+        return FakeCollection(self.db, self.path + (name,))
+
+    def get(self, transaction=None):
+        self.db.reads.append((self.path, transaction))
+        data = self.db.docs.get(self.path)
+        return type('Snapshot', (), {'exists': data is not None, 'to_dict': lambda _: dict(data) if data else None})()
+
+class FakeCollection:
+    def __init__(self, db, path):
+        self.db, self.path = db, path
+
+    def document(self, doc_id):
+        return FakeRef(self.db, self.path + (doc_id,))
+
+def merged(doc, data):
+    """Firestore set(merge=True) with Increment transforms."""
+    doc = dict(doc or {})
+    for key, value in data.items():
+        if isinstance(value, firestore.Increment):
+            doc[key] = doc.get(key, 0) + value.value
+        elif isinstance(value, dict):
+            doc[key] = merged(doc.get(key), value)
+        else:
+            doc[key] = value
+    return doc
+
+class FakeTransaction:
+    def __init__(self, db):
+        self.db, self.writes = db, []
+
+    def set(self, ref, data, merge=False):
+        self.writes.append((ref.path, data, merge))
+
+    def commit(self):
+        for path, data, merge in self.writes:
+            self.db.docs[path] = merged(self.db.docs.get(path), data) if merge else dict(data)
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs, self.reads, self.transactions = {}, [], []
+
+    def collection(self, name):
+        return FakeCollection(self, (name,))
+
+    def transaction(self):
+        self.transactions.append(FakeTransaction(self))
+        return self.transactions[-1]
+
+    def batch(self):
+        raise AssertionError("spend aggregates must not be written outside the transaction")
+
+@pytest.fixture
+def db(monkeypatch):
+    def transactional(fn):
+        def run(transaction):
+            result = fn(transaction)
+            transaction.commit()
+            return result
+        return run
+    monkeypatch.setattr(firestore, 'transactional', transactional)
+    return FakeFirestore()
+
+def test_update_reads_and_writes_in_one_transaction(db):
+    store = FirestoreStorage()
+    store._client = db
+    store.update_spend_aggregates('u1', 's1', summary_contribution(categories(('Groceries', '10.00')), '2025-03-01'))
+    store.update_spend_aggregates('u1', 's1', summary_contribution(categories(('Groceries', '6.00'), ('Others', '2.00')), '2025-03-01'))
+    assert len(db.transactions) == 2
+    assert [transaction for _, transaction in db.reads] == db.transactions # previous contribution read inside each
+    assert all(len(transaction.writes) == 2 for transaction in db.transactions)
+    aggregates = db.docs[('SPEND_AGGREGATES', 'u1')]
+    assert aggregates['total_spend'] == 8.0
+    assert aggregates['categories'] == {'Groceries': 6.0, 'Others': 2.0}
+    assert db.docs[('SPEND_AGGREGATES', 'u1', 'SESSIONS', 's1')]['categories'] == {'Groceries': 6.0, 'Others': 2.0}
@@ -0,0 +1,83 @@
+"""SQLiteStorage on a temporary database: documents, the summary join, spend aggregates, item counts and the OCR cache."""
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from spend_aggregates import empty_aggregates, summary_contribution, add_contribution, compare_aggregates
+from storage import SQLiteStorage, create_storage
+
+@pytest.fixture
+def store(tmp_path):
+    return SQLiteStorage(str(tmp_path / 'spendify.db'))
+
+def summary(*totals):
+    return [{'category': category, 'items': [category], 'total_price': total} for category, total in totals]
+
+def save(store, user_id, session_id, date_str, categories):
+    store.set_session(session_id, {'timestamp': f'{date_str}T10:00:00', 'main_user': user_id})
+    store.save_summary(date_str, session_id, {'categories': categories})
+    store.update_spend_aggregates(user_id, session_id, summary_contribution(categories, date_str))
+
+def test_users_merge_and_are_found_by_identifier(store):
+    store.merge_user('u1', {'WEB': 'web-1', 'name': 'A'})
+    store.merge_user('u1', {'WEB': 'web-2'})
+    assert store.get_user('u1') == {'WEB': 'web-2', 'name': 'A'}
+    assert store.find_user('WEB', 'web-2') == 'u1'
+    assert store.find_user('WEB', 'web-1') is None
+    assert store.get_user('missing') is None
+
+def test_sessions_merge_and_list_per_user(store):
+    store.set_session('s1', {'timestamp': '2025-03-01T10:00:00', 'main_user': 'u1'})
+    store.set_session('s1', {'source': 'WEB'}, merge=True)
+    store.set_session('s2', {'timestamp': '2025-03-02T10:00:00', 'main_user': 'u2'})
+    assert store.get_session('s1') == {'timestamp': '2025-03-01T10:00:00', 'main_user': 'u1', 'source': 'WEB'}
+    assert store.list_sessions('u1') == [('s1', store.get_session('s1'))]
+    assert len(store.list_sessions()) == 2
+
+def test_summaries_are_joined_with_their_sessions(store):
+    save(store, 'u1', 's1', '2025-03-01', summary(('Groceries', '10.00')))
+    save(store, 'u2', 's2', '2025-03-02', summary(('Others', '1.00')))
+    assert list(store.iter_summaries('u1')) == [('s1', '2025-03-01', 'u1', {'categories': summary(('Groceries', '10.00'))})]
+    assert [row[0] for row in store.iter_summaries()] == ['s1', 's2']
+
+def test_spend_aggregates_match_a_recomputation_after_resaves(store):
+    save(store, 'u1', 's1', '2025-03-01', summary(('Groceries', '10.00'), ('Tax', '1.00')))
+    save(store, 'u1', 's2', '2025-03-03', summary(('Fast Food', '4.50')))
+    save(store, 'u1', 's1', '2025-03-01', summary(('Groceries', '6.00'), ('Others', '2.00'))) # re-saved summary
+    expected = empty_aggregates()
+    for _, date_str, _, sum_doc in store.iter_summaries('u1'):
+        add_contribution(expected, summary_contribution(sum_doc['categories'], date_str))
+    aggregates = store.get_spend_aggregates('u1')
+    assert not compare_aggregates(aggregates, expected)
+    assert aggregates['categories'] == {'Groceries': 6.0, 'Others': 2.0, 'Fast Food': 4.5}
+    assert aggregates['weekdays'] == {'Saturday': 8.0, 'Monday': 4.5}
+    assert store.get_spend_aggregates('u2') is None
+
+def test_replace_spend_aggregates(store):
+    save(store, 'u1', 's1', '2025-03-01', summary(('Groceries', '10.00')))
+    contribution = summary_contribution(summary(('Others', '3.00')), '2025-03-02')
+    store.replace_spend_aggregates('u1', contribution, {'s2': contribution})
+    assert store.get_spend_aggregates('u1')['categories'] == {'Others': 3.0}
+
+def test_item_categories_count_and_load_by_key(store):
+    store.record_item_categories({'k1': {'item': 'Milk', 'category': 'Groceries'}, 'k2': {'item': 'Soap', 'category': 'Others'}})
+    store.record_item_categories({'k1': {'item': 'Milk', 'category': 'Groceries'}})
+    entries = store.get_item_categories(['k1', 'missing'])
+    assert list(entries) == ['k1'] and entries['k1']['counts'] == {'Groceries': 2}
+    store.replace_item_categories({'k2': {'item': 'Soap', 'counts': {'Personal Care': 3}}})
+    assert store.get_item_categories()['k2']['counts'] == {'Personal Care': 3}
+    assert len(store.get_item_categories([f'k{i}' for i in range(1200)])) == 2 # chunked IN queries
+
+def test_ocr_cache_entries(store):
+    store.save_ocr_cache_entry('doc', {'stored_at': 100.0, 'value': {'text': 'x'}}, ttl_seconds=60)
+    assert store.get_ocr_cache_entry('doc') == {'stored_at': 100.0, 'value': {'text': 'x'}}
+    store.delete_ocr_cache_entry('doc')
+    assert store.get_ocr_cache_entry('doc') is None
+
+def test_concurrent_writers(store):
+    jobs = [(f'u{i % 3}', f's{i}', f'2025-03-{i % 28 + 1:02d}') for i in range(60)]
+    with ThreadPoolExecutor(6) as pool:
+        list(pool.map(lambda job: save(store, *job, summary(('Groceries', '1.00'))), jobs))
+    assert sum(store.get_spend_aggregates(f'u{i}')['total_spend'] for i in range(3)) == pytest.approx(60.0)
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        create_storage('mongo')
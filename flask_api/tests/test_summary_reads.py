@@ -0,0 +1,113 @@
+"""
+Document reads of the per-user summary query (FirestoreStorage.iter_summaries /
+firebase_store.get_all_summarised_data_as_df) against an in-memory Firestore stand-in.
+"""
+import pytest
+import firebase_store
+from storage import FirestoreStorage
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self.db = db
+        self.path = path
+        self.id = path[-1]
+
+    def collection(self, name):
+        return FakeCollection(self.db, self.path + (name,))
+
+    def get(self):
+        self.db.reads += 1
+        self.db.round_trips += 1
+        return FakeSnapshot(self.id, self.db.docs.get(self.path))
+
+    def set(self, data, merge=False):
+        self.db.docs[self.path] = {**(self.db.docs.get(self.path) or {}), **data} if merge else dict(data)
+
+class FakeCollection:
+    def __init__(self, db, path, filters=()):
+        self.db = db
+        self.path = path
+        self.filters = filters
+
+    def document(self, doc_id):
+        return FakeDocument(self.db, self.path + (doc_id,))
+
+    def where(self, field, op, value):
+        assert op == '=='
+        return FakeCollection(self.db, self.path, self.filters + ((field, value),))
+
+    def get(self):
+        self.db.round_trips += 1
+        matches = [FakeSnapshot(path[-1], data) for path, data in sorted(self.db.docs.items())
+                   if path[:-1] == self.path and all(data.get(f) == v for f, v in self.filters)]
+        self.db.reads += max(1, len(matches)) # Firestore bills an empty query as one read
+        return matches
+
+class FakeFirestore:
+    """Counts billed document reads and round trips."""
+    def __init__(self):
+        self.docs = {}
+        self.reads = 0
+        self.round_trips = 0
+
+    def collection(self, name):
+        return FakeCollection(self, (name,))
+
+    def get_all(self, refs):
+        self.round_trips += 1
+        self.reads += len(refs)
+        return [FakeSnapshot(ref.id, self.docs.get(ref.path)) for ref in refs]
+
+def add_receipts(db, user, count):
+    for i in range(count):
+        session_id = f'{user}-{i}'
+        date_str = f'2025-01-{i % 28 + 1:02d}'
+        db.collection('SESSIONS').document(session_id).set({'timestamp': f'{date_str}T10:00:00', 'main_user': user, 'source': 'WEB'})
+        db.collection('DATA').document('SUMMARISED_DATA').collection(date_str).document(session_id).set({
+            'categories': [{'category': 'Groceries', 'items': ['Milk'], 'total_price': '2.50'}]})
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeFirestore()
+    store = FirestoreStorage()
+    store._client = db
+    monkeypatch.setattr(firebase_store, 'store', store)
+    return db
+
+def reads_for(db, user):
+    db.reads = db.round_trips = 0
+    df = firebase_store.get_all_summarised_data_as_df(USERNAME=user)
+    return db.reads, db.round_trips, df
+
+def test_reads_grow_with_the_users_sessions(db):
+    add_receipts(db, 'alice', 10)
+    reads_10, _, df = reads_for(db, 'alice')
+    assert len(df) == 10 and set(df['user_id']) == {'alice'}
+    add_receipts(db, 'alice', 20)
+    reads_20, _, df = reads_for(db, 'alice')
+    assert len(df) == 20
+    assert reads_10 == 10 + 10 # sessions query + one summary per session
+    assert reads_20 == 20 + 20
+
+def test_reads_stay_flat_as_other_tenants_grow(db):
+    add_receipts(db, 'alice', 5)
+    baseline = reads_for(db, 'alice')[:2]
+    for tenant in ('bob', 'carol', 'dave'):
+        add_receipts(db, tenant, 50)
+    assert reads_for(db, 'alice')[:2] == baseline
+
+def test_summaries_are_fetched_in_batches(db, monkeypatch):
+    monkeypatch.setattr('storage.SUMMARY_READ_BATCH_SIZE', 4)
+    add_receipts(db, 'alice', 10)
+    _, round_trips, df = reads_for(db, 'alice')
+    assert len(df) == 10
+    assert round_trips == 1 + 3 # sessions query + ceil(10 / 4) get_all calls
@@ -0,0 +1,105 @@
+"""UploadJobQueue: stage failures, a full queue, per-stage concurrency limits, history eviction and status updates."""
+import threading
+import time
+import pytest
+from upload_jobs import UploadJobQueue, QueueFullError
+
+def wait_for(queue, session_id, timeout=5):
+    """The job status once it finished (done or failed)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = queue.get(session_id)
+        if status and status['status'] in ('done', 'failed'):
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {session_id} did not finish: {queue.get(session_id)}")
+
+def test_stages_run_in_order_and_share_the_job():
+    def ocr(job):
+        job['text'] = 'ok'
+    def persist(job):
+        job['saved'] = job['text']
+    job = {}
+    queue = UploadJobQueue([('ocr', ocr), ('persist', persist)], workers=1)
+    queue.submit('s1', job)
+    status = wait_for(queue, 's1')
+    assert status['status'] == 'done' and status['stage'] is None
+    assert {name: stage['status'] for name, stage in status['stages'].items()} == {'ocr': 'done', 'persist': 'done'}
+    assert job == {'text': 'ok', 'saved': 'ok'}
+
+def test_stage_failure_marks_the_stage_and_job_failed():
+    ran = []
+    def fail(job):
+        raise RuntimeError("no summary saved")
+    queue = UploadJobQueue([('ocr', lambda job: ran.append('ocr')), ('classify', fail), ('notify', lambda job: ran.append('notify'))], workers=1)
+    queue.submit('s1', {})
+    status = wait_for(queue, 's1')
+    assert status['status'] == 'failed' and status['error'] == 'classify: no summary saved'
+    assert {name: stage['status'] for name, stage in status['stages'].items()} == \
+        {'ocr': 'done', 'classify': 'failed', 'notify': 'pending'}
+    assert ran == ['ocr'] and 'finished_at' in status
+
+def test_full_queue_rejects_and_forgets_the_job():
+    release = threading.Event()
+    started = threading.Event()
+    def block(job):
+        started.set()
+        release.wait(5)
+    queue = UploadJobQueue([('ocr', block)], workers=1, max_queue=1)
+    queue.submit('running', {})
+    assert started.wait(5)
+    queue.submit('queued', {})
+    with pytest.raises(QueueFullError):
+        queue.submit('rejected', {})
+    assert queue.get('rejected') is None
+    assert queue.stats()['queued'] == 1
+    release.set()
+    assert wait_for(queue, 'queued')['status'] == 'done'
+
+def test_stage_limits_bound_concurrency_per_stage():
+    lock = threading.Lock()
+    active = {'ocr': 0, 'classify': 0}
+    peak = {'ocr': 0, 'classify': 0}
+    def stage(name):
+        def run(job):
+            with lock:
+                active[name] += 1
+                peak[name] = max(peak[name], active[name])
+            time.sleep(0.05)
+            with lock:
+                active[name] -= 1
+        return run
+    queue = UploadJobQueue([('ocr', stage('ocr')), ('classify', stage('classify'))], workers=6, stage_limits={'classify': 2})
+    for i in range(6):
+        queue.submit(f's{i}', {})
+    for i in range(6):
+        assert wait_for(queue, f's{i}')['status'] == 'done'
+    assert peak['classify'] == 2 # limited
+    assert peak['ocr'] > 2 # bounded by the workers only
+
+def test_history_keeps_the_latest_jobs():
+    queue = UploadJobQueue([('ocr', lambda job: None)], workers=1, history=3)
+    for i in range(5):
+        queue.submit(f's{i}', {})
+    assert queue.get('s0') is None and queue.get('s1') is None
+    assert all(wait_for(queue, f's{i}')['status'] == 'done' for i in range(2, 5))
+
+def test_on_update_publishes_every_change_and_survives_errors():
+    updates = []
+    def on_update(session_id, status):
+        updates.append((session_id, status['status'], status['stage']))
+        raise ConnectionError("status store down") # must not fail the job
+    def classify(job):
+        queue.report_progress('s1', 'classify', {'author': 'Validator'})
+    queue = UploadJobQueue([('ocr', lambda job: None), ('classify', classify)], workers=1, on_update=on_update)
+    queue.submit('s1', {})
+    status = wait_for(queue, 's1')
+    deadline = time.time() + 5
+    while updates[-1][1] != 'done' and time.time() < deadline: # published right after the status changes
+        time.sleep(0.01)
+    assert status['status'] == 'done'
+    assert status['stages']['classify']['progress'] == {'author': 'Validator'}
+    assert updates[0] == ('s1', 'queued', None)
+    assert ('s1', 'running', 'classify') in updates # the progress report
+    assert updates[-1] == ('s1', 'done', None)
+    assert len(updates) == 5 # queued, ocr done, progress, classify done, job done
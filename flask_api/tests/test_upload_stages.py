@@ -0,0 +1,94 @@
+"""
+classify_stage failures reach the job status, and /upload answers 503 on a full queue,
+500 when OCR fails and 200 when only classification failed. main_api runs on a temporary
+SQLite database; OCR and the ADK pipeline are replaced by the test's own stages.
+"""
+import importlib
+import io
+import threading
+import time
+import pytest
+import firebase_store
+from storage import SQLiteStorage
+from upload_jobs import UploadJobQueue
+from test_upload_jobs import wait_for
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    credentials = tmp_path / 'gcp_service_account.json'
+    credentials.write_text('{}')
+    monkeypatch.setenv('GOOGLE_APPLICATION_PATH', str(credentials)) # read by gcp_docai at import
+    monkeypatch.setenv('UPLOAD_ARCHIVE', 'False')
+    main_api = importlib.import_module('main_api')
+    store = SQLiteStorage(str(tmp_path / 'spendify.db'))
+    store.merge_user('p1', {'WEB': 'web-1'})
+    monkeypatch.setattr(firebase_store, 'store', store)
+    monkeypatch.setattr(main_api, 'upload_archive', None)
+    monkeypatch.setattr(main_api, 'item_cache', None)
+    monkeypatch.setattr(main_api, 'classification_batcher', None)
+    return main_api
+
+def classify_job():
+    grouped = {'line_item': ['1 Tea 2.00'], 'total_amount': ['2.00']}
+    return {'session_id': 's1', 'timestamp': '2025-03-01T10:00:00', 'grouped': grouped}
+
+def test_nothing_saved_fails_the_classify_stage(api, monkeypatch):
+    monkeypatch.setattr(api, 'run_classification', lambda job, session_id, prompt: None)
+    with pytest.raises(RuntimeError, match='saved no summary'):
+        api.classify_stage(classify_job())
+
+def test_pipeline_errors_fail_the_job(api, monkeypatch):
+    def no_session(job, session_id, prompt):
+        raise RuntimeError(f"Could not create the ADK session for session {session_id}")
+    monkeypatch.setattr(api, 'run_classification', no_session)
+    queue = UploadJobQueue([('classify', api.classify_stage)], workers=1)
+    queue.submit('s1', classify_job())
+    status = wait_for(queue, 's1')
+    assert status['status'] == 'failed' and status['stages']['classify']['status'] == 'failed'
+    assert 'Could not create the ADK session' in status['error']
+
+def upload(api, run_async):
+    data = {'file': (io.BytesIO(b'image'), 'receipt.jpg'), 'session_id': 's1', 'identifier': 'web-1',
+            'source': 'WEB', 'timestamp': '2025-03-01T10:00:00', 'async': str(run_async)}
+    return api.app.test_client().post('/upload', data=data, content_type='multipart/form-data')
+
+def test_sync_upload_status_codes(api, monkeypatch):
+    def fail(job):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(api, 'persist_stage', lambda job: None)
+    monkeypatch.setattr(api, 'ocr_stage', lambda job: None)
+    monkeypatch.setattr(api, 'classify_stage', fail)
+    response = upload(api, False)
+    assert response.status_code == 200 and response.get_json()['status'] == 'processing'
+    monkeypatch.setattr(api, 'ocr_stage', fail)
+    response = upload(api, False)
+    assert response.status_code == 500 and response.get_json()['error'] == 'GCP failed'
+
+def test_full_upload_queue_answers_503(api, monkeypatch):
+    release = threading.Event()
+    queue = UploadJobQueue([('ocr', lambda job: release.wait(5))], workers=1, max_queue=1)
+    monkeypatch.setattr(api, 'upload_jobs', queue)
+    try:
+        assert upload(api, True).status_code == 202
+        deadline = time.time() + 5
+        while queue.stats()['queued'] and time.time() < deadline: # until the worker takes the first job
+            time.sleep(0.01)
+        assert upload(api, True).status_code == 202
+        response = upload(api, True)
+        assert response.status_code == 503 and 'retry later' in response.get_json()['error']
+    finally:
+        release.set()
+
+class NoSessionClient:
+    def get_or_create_session(self, method="POST", payload={}, custom_session=False):
+        return None # what ADKClient returns after logging a failed request
+
+    def iter_sse(self, *args, **kwargs):
+        raise AssertionError("no run without a session")
+
+def test_missing_adk_session_fails_the_run_and_the_batch(api, monkeypatch):
+    monkeypatch.setattr(api, 'create_adk_client', lambda session_id: NoSessionClient())
+    with pytest.raises(RuntimeError, match='Could not create the ADK session for session s1'):
+        api.run_classification(classify_job(), 's1', '{}')
+    with pytest.raises(RuntimeError, match='Could not create the ADK session for batch'):
+        api.run_classification_batch([('s1', '{}'), ('s2', '{}')])
@@ -0,0 +1,92 @@
+"""
+Background archiving of uploaded receipt images.
+
+The upload path hands the in-memory bytes straight to OCR; writing a copy to
+disk happens on a background thread and the archive directory is kept bounded
+by age, file count and total size.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.utils import secure_filename
+
+class UploadArchive:
+    def __init__(self, directory='uploads', retention_days=30, max_files=5000, max_bytes=1024 * 1024 * 1024):
+        self.directory = directory
+        self.retention_seconds = retention_days * 24 * 3600 if retention_days else None
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.archived = 0
+        self.evicted = 0
+
+    def _pool(self):
+        # One writer thread per process (recreated after a gunicorn fork)
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-archive')
+                self._pid = os.getpid()
+            return self._executor
+
+    def path_for(self, session_id, filename):
+        return os.path.join(self.directory, f'{session_id}_{secure_filename(filename or "receipt")}')
+
+    def archive_async(self, session_id, filename, image_data):
+        """Queue a copy of the upload for writing; returns the future."""
+        return self._pool().submit(self.archive, session_id, filename, image_data)
+
+    def archive(self, session_id, filename, image_data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(session_id, filename)
+        with open(path, 'wb') as f:
+            f.write(image_data)
+        self.archived += 1
+        logging.info(f"Archived upload to {path}")
+        self.evict()
+        return path
+
+    def evict(self):
+        """Delete archived files past the retention period, then the oldest beyond the count/size limits."""
+        if not os.path.isdir(self.directory):
+            return
+        now = time.time()
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue # keep .gitkeep and friends
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        while files:
+            mtime, size, path = files[0]
+            expired = self.retention_seconds and now - mtime > self.retention_seconds
+            if not (expired or len(files) > self.max_files or total > self.max_bytes):
+                break
+            files.pop(0)
+            try:
+                os.remove(path)
+                self.evicted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stats(self):
+        return {'archived': self.archived, 'evicted': self.evicted}
+
+def create_upload_archive():
+    """Build the archive configured by UPLOAD_ARCHIVE*; returns None when archiving is disabled."""
+    if os.getenv('UPLOAD_ARCHIVE', 'True').lower() != 'true':
+        logging.info("Upload archiving disabled")
+        return None
+    return UploadArchive(
+        directory=os.getenv('UPLOAD_ARCHIVE_DIR', 'uploads'),
+        retention_days=int(os.getenv('UPLOAD_ARCHIVE_RETENTION_DAYS', 30)),
+        max_files=int(os.getenv('UPLOAD_ARCHIVE_MAX_FILES', 5000)),
+        max_bytes=int(os.getenv('UPLOAD_ARCHIVE_MAX_MB', 1024)) * 1024 * 1024,
+    )
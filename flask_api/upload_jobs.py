@@ -0,0 +1,140 @@
+"""
+Background job queue for /upload.
+
+A bounded queue feeds a fixed pool of worker threads. Every job runs the same
+ordered stages (e.g. OCR -> persist -> classify); each stage has its own
+concurrency limit so a slow stage (classification) cannot starve the others of
+external quota. Per-stage timings are kept for the /jobs/<session_id> endpoint.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+class QueueFullError(Exception):
+    pass
+
+class UploadJobQueue:
+    def __init__(self, stages, workers=4, max_queue=100, stage_limits=None, history=1000, on_update=None):
+        """
+        stages: ordered list of (name, fn); fn(job) receives the job context dict and may mutate it.
+        workers: number of worker threads pulling jobs from the queue.
+        max_queue: maximum number of queued (not yet started) jobs.
+        stage_limits: {stage_name: max concurrent executions}; stages not listed are bounded by `workers`.
+        history: number of job statuses kept in memory.
+        on_update: optional callback(session_id, status_dict) called whenever a job changes state.
+        """
+        self.stages = list(stages)
+        self.workers = workers
+        self.history = history
+        self.on_update = on_update
+        stage_limits = stage_limits or {}
+        self._limits = {name: threading.BoundedSemaphore(max(1, stage_limits.get(name) or workers)) for name, _ in self.stages}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self):
+        # Threads are started lazily so each (forked) gunicorn worker gets its own pool.
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                t = threading.Thread(target=self._worker, name=f"upload-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, session_id, job):
+        """Queue a job. Raises QueueFullError when the queue is at capacity."""
+        self._ensure_workers()
+        status = {
+            'session_id': session_id,
+            'status': 'queued',
+            'stage': None,
+            'submitted_at': datetime.now().isoformat(),
+            'stages': {name: {'status': 'pending'} for name, _ in self.stages},
+        }
+        with self._lock:
+            self._jobs[session_id] = status
+            self._jobs.move_to_end(session_id)
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        try:
+            self._queue.put_nowait((session_id, job, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(session_id, None)
+            raise QueueFullError(f"Upload queue is full ({self._queue.maxsize} jobs)")
+        self._notify(session_id)
+        return status
+
+    def get(self, session_id):
+        """Return a copy of the job status or None if the job is unknown to this process."""
+        with self._lock:
+            status = self._jobs.get(session_id)
+            return None if status is None else {**status, 'stages': {k: dict(v) for k, v in status['stages'].items()}}
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for status in self._jobs.values():
+                counts[status['status']] = counts.get(status['status'], 0) + 1
+        return {'queued': self._queue.qsize(), 'workers': len(self._threads), 'jobs': counts}
+
+    def report_progress(self, session_id, stage, progress):
+        """Attach progress details to a running stage and publish them (no-op for jobs not queued here)."""
+        with self._lock:
+            if session_id not in self._jobs:
+                return
+            self._jobs[session_id]['stages'][stage]['progress'] = progress
+        self._notify(session_id)
+
+    def _notify(self, session_id):
+        if self.on_update:
+            try:
+                self.on_update(session_id, self.get(session_id))
+            except Exception as e:
+                logging.error(f"Failed to publish job status for {session_id}: {e}")
+
+    def _set_job(self, session_id, **fields):
+        with self._lock:
+            if session_id in self._jobs:
+                self._jobs[session_id].update(fields)
+
+    def _set_stage(self, session_id, stage, **fields):
+        with self._lock:
+            if session_id in self._jobs:
+                self._jobs[session_id]['stages'][stage].update(fields)
+
+    def _worker(self):
+        while True:
+            session_id, job, queued_at = self._queue.get()
+            try:
+                self._run(session_id, job, queued_at)
+            except Exception:
+                logging.exception(f"Upload worker crashed on job {session_id}")
+            finally:
+                self._queue.task_done()
+
+    def _run(self, session_id, job, queued_at):
+        self._set_job(session_id, status='running', queue_seconds=round(time.perf_counter() - queued_at, 3))
+        for name, fn in self.stages:
+            self._set_job(session_id, stage=name)
+            self._set_stage(session_id, name, status='waiting')
+            with self._limits[name]:
+                self._set_stage(session_id, name, status='running', started_at=datetime.now().isoformat())
+                start = time.perf_counter()
+                try:
+                    fn(job)
+                except Exception as e:
+                    logging.exception(f"Job {session_id} failed in stage {name}")
+                    self._set_stage(session_id, name, status='failed', seconds=round(time.perf_counter() - start, 3))
+                    self._set_job(session_id, status='failed', error=f"{name}: {e}", finished_at=datetime.now().isoformat())
+                    self._notify(session_id)
+                    return
+                self._set_stage(session_id, name, status='done', seconds=round(time.perf_counter() - start, 3))
+            self._notify(session_id)
+        self._set_job(session_id, status='done', stage=None, finished_at=datetime.now().isoformat())
+        self._notify(session_id)